@@ -0,0 +1,42 @@
+"""
+Micro-benchmarks of the environments, the maze and the model inference. They run in
+a single process, without Ray workers.
+
+Usage:
+    PYTHONPATH=. python -m benchmarks --output bench.json
+    PYTHONPATH=. python -m benchmarks --compare bench.json
+"""
+
+import argparse
+
+from benchmarks import bench_env, bench_maze, bench_model
+from benchmarks.common import compare, write_results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--output", help="Path of the JSON file to store the results in."
+    )
+    parser.add_argument(
+        "--compare", help="Path of the JSON file with results to compare against."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--steps", type=int, default=10_000)
+    parser.add_argument("--resets", type=int, default=1_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 256])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = bench_env.run(args.steps, args.resets, args.repeat)
+    results += bench_maze.run(args.sizes, args.repeat)
+    results += bench_model.run(args.batch_sizes, args.repeat)
+
+    if args.output:
+        write_results(args.output, results)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import tempfile
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from benchmarks.common import Result, measure
+from maze.agent.motion import MotionAgent
+from maze.agent.strategy import StrategyAgent
+from maze.env import MazeEnv
+from maze.env_config import DEFAULTS
+from maze.generator import generate_map
+from maze_procedure.env import MazeProcedureEnv
+
+from hrl.env import HierarchicalEnv
+from hrl.recording import EpisodeRecorder
+from hrl.sampler import LocalSampler
+from hrl.spaces import stack
+from hrl.vector_env import VectorHierarchicalEnv
+
+AGENT_CONFIGS = {
+    StrategyAgent.NAME: StrategyAgent.DEFAULTS | {"max_steps": 50},
+    MotionAgent.NAME: MotionAgent.DEFAULTS | {"max_steps": 20},
+}
+
+SAMPLER_NUM_ENVS = [1, 64]
+VECTOR_NUM_ENVS = [1, 64]
+STEP_MODES = ["checked", "trusted"]
+VECTOR_ENVS: List[Tuple[str, Callable[[], HierarchicalEnv[Any, Any, Any]]]] = [
+    ("MazeEnv", lambda: MazeEnv(DEFAULTS | {}, AGENT_CONFIGS)),
+    ("MazeProcedureEnv", lambda: MazeProcedureEnv(DEFAULTS | {}, AGENT_CONFIGS)),
+]
+
+LARGE_MAP = generate_map(500, 500, seed=0)
+
+ENVS: List[Tuple[str, Callable[[], HierarchicalEnv[Any, Any, Any]]]] = [
+    ("MazeEnv", lambda: MazeEnv(DEFAULTS | {}, AGENT_CONFIGS)),
+    (
+        "MazeEnv[observation_buffers]",
+        lambda: MazeEnv(DEFAULTS | {}, AGENT_CONFIGS, {"observation_buffers": True}),
+    ),
+    (
+        "MazeEnv[info=none]",
+        lambda: MazeEnv(DEFAULTS | {}, AGENT_CONFIGS, {"info": "none"}),
+    ),
+    (
+        "MazeEnv[autopilot]",
+        lambda: MazeEnv(DEFAULTS | {}, AGENT_CONFIGS, {"autopilot": True}),
+    ),
+    (
+        "MazeEnv[map_observation=id]",
+        lambda: MazeEnv(DEFAULTS | {"map_observation": "id"}, AGENT_CONFIGS),
+    ),
+    ("MazeEnv", lambda: MazeEnv(DEFAULTS | {"map": LARGE_MAP}, AGENT_CONFIGS)),
+    (
+        "MazeEnv[map_observation=window]",
+        lambda: MazeEnv(
+            DEFAULTS | {"map": LARGE_MAP, "map_observation": "window"}, AGENT_CONFIGS
+        ),
+    ),
+    ("MazeProcedureEnv", lambda: MazeProcedureEnv(DEFAULTS | {}, AGENT_CONFIGS)),
+    (
+        "MazeProcedureEnv[procedure_cache]",
+        lambda: MazeProcedureEnv(
+            DEFAULTS | {"procedure_cache_size": 4096}, AGENT_CONFIGS
+        ),
+    ),
+]
+
+
+def run(steps: int, resets: int, repeat: int, seed: int = 0) -> List[Result]:
+    results = []
+    for name, make_env in ENVS:
+        env = make_env()
+        params = {"size": len(env._config["map"])}
+        rng = np.random.default_rng(seed)
+
+        def step() -> int:
+            obs = env.reset()
+            for _ in range(steps):
+                # A random policy, which only chooses legal actions.
+                agent_id = env._current_agent_id
+                mask = obs[agent_id]["directions_mask"]
+                action = rng.choice(np.flatnonzero(mask))
+                obs, _, done, _ = env.step({agent_id: action})
+                if done["__all__"]:
+                    obs = env.reset()
+            return steps
+
+        def reset() -> int:
+            for _ in range(resets):
+                env.reset()
+            return resets
+
+        def fork() -> int:
+            env.reset()
+            for _ in range(resets):
+                env.restore_snapshot(env.get_snapshot())
+            return resets
+
+        results += [
+            measure(f"{name}.step", params, step, repeat),
+            measure(f"{name}.reset", params, reset, repeat),
+            measure(f"{name}.fork", params, fork, repeat),
+        ]
+
+    rng = np.random.default_rng(seed)
+
+    def random_policy(obs: Dict[str, np.ndarray]) -> np.ndarray:
+        # A random policy, which only chooses legal actions.
+        return np.argmax(
+            obs["directions_mask"] * rng.random(obs["directions_mask"].shape), axis=1
+        )
+
+    for num_envs in SAMPLER_NUM_ENVS:
+        sampler = LocalSampler(
+            lambda _: MazeEnv(DEFAULTS | {}, AGENT_CONFIGS),
+            num_envs,
+            {StrategyAgent.NAME: random_policy, MotionAgent.NAME: random_policy},
+        )
+        params = {"size": len(DEFAULTS["map"]), "num_envs": num_envs}
+
+        def sample() -> int:
+            sampler.sample(steps)
+            return -(-steps // num_envs) * num_envs
+
+        results.append(measure("LocalSampler.sample", params, sample, repeat))
+
+    # The same legal actions replayed in each step mode, so the policy doesn't dilute
+    # the difference.
+    actions = _legal_actions(MazeEnv(DEFAULTS | {}, AGENT_CONFIGS), steps, seed)
+    for step_mode in STEP_MODES:
+        env = MazeEnv(DEFAULTS | {}, AGENT_CONFIGS, {"step_mode": step_mode})
+        params = {"size": len(DEFAULTS["map"]), "step_mode": step_mode}
+        results.append(
+            measure(
+                "MazeEnv.step[replay]", params, partial(_replay, env, actions), repeat
+            )
+        )
+    # The overhead of recording, compared to the checked step mode above.
+    with tempfile.TemporaryDirectory() as directory:
+        with EpisodeRecorder(MazeEnv(DEFAULTS | {}, AGENT_CONFIGS), directory) as env:
+            params = {"size": len(DEFAULTS["map"]), "step_mode": "checked"}
+            results.append(
+                measure(
+                    "EpisodeRecorder[MazeEnv].step[replay]",
+                    params,
+                    partial(_replay, env, actions),
+                    repeat,
+                )
+            )
+
+    for name, make_env in VECTOR_ENVS:
+        for num_envs in VECTOR_NUM_ENVS:
+            params = {"size": len(DEFAULTS["map"]), "num_envs": num_envs}
+            results += [
+                measure(
+                    f"{name}.step[loop]",
+                    params,
+                    partial(_step_loop, make_env, num_envs, steps, random_policy),
+                    repeat,
+                ),
+                measure(
+                    f"VectorHierarchicalEnv[{name}].batch_step",
+                    params,
+                    partial(_batch_step, make_env, num_envs, steps, random_policy),
+                    repeat,
+                ),
+            ]
+    return results
+
+
+def _legal_actions(
+    env: HierarchicalEnv[Any, Any, Any], steps: int, seed: int
+) -> List[Optional[Dict[str, Any]]]:
+    # Action dicts of a random policy choosing legal actions, `None` marks a reset.
+    rng = np.random.default_rng(seed)
+    actions: List[Optional[Dict[str, Any]]] = []
+    obs = env.reset()
+    for _ in range(steps):
+        agent_id = env._current_agent_id
+        action = int(rng.choice(np.flatnonzero(obs[agent_id]["directions_mask"])))
+        actions.append({agent_id: action})
+        obs, _, done, _ = env.step({agent_id: action})
+        if done["__all__"]:
+            actions.append(None)
+            obs = env.reset()
+    return actions
+
+
+def _replay(
+    env: Union[HierarchicalEnv[Any, Any, Any], EpisodeRecorder],
+    actions: List[Optional[Dict[str, Any]]],
+) -> int:
+    env.reset()
+    for action_dict in actions:
+        if action_dict is None:
+            env.reset()
+        else:
+            env.step(action_dict)
+    return len(actions)
+
+
+def _step_loop(
+    make_env: Callable[[], HierarchicalEnv[Any, Any, Any]],
+    num_envs: int,
+    steps: int,
+    policy: Callable[[Dict[str, np.ndarray]], np.ndarray],
+) -> int:
+    # The baseline of `_batch_step`: standalone environments stepped one by one, with
+    # a policy call per step.
+    envs = [make_env() for _ in range(num_envs)]
+    observations = [env.reset() for env in envs]
+    rounds = -(-steps // num_envs)
+    for _ in range(rounds):
+        for index, env in enumerate(envs):
+            agent_id = env._current_agent_id
+            action = policy(stack([observations[index][agent_id]]))[0]
+            obs, _, done, _ = env.step({agent_id: action})
+            observations[index] = env.reset() if done["__all__"] else obs
+    return rounds * num_envs
+
+
+def _batch_step(
+    make_env: Callable[[], HierarchicalEnv[Any, Any, Any]],
+    num_envs: int,
+    steps: int,
+    policy: Callable[[Dict[str, np.ndarray]], np.ndarray],
+) -> int:
+    env = VectorHierarchicalEnv(lambda _: make_env(), num_envs)
+    obs = env.batch_reset()
+    rounds = -(-steps // num_envs)
+    for _ in range(rounds):
+        _, _, obs = env.batch_step({name: policy(obs[name]) for name in obs})
+    return rounds * num_envs
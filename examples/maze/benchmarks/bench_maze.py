@@ -0,0 +1,156 @@
+from typing import List
+
+import numpy as np
+from benchmarks.common import Result, measure
+from maze.generator import generate_map
+from maze.maze import CORRIDOR, DEFAULT_MAP, GOAL, START, WALL, Direction, Map, Maze
+from maze_procedure.action import GoDirection
+from maze_procedure.env_state import MazeEnvState
+from maze_procedure.procedure.motion import MotionProcedure
+
+from hrl.procedure import CachedProcedure
+
+NUM_QUERIES = 10_000
+NUM_GOAL_QUERIES = 100
+
+
+def tiled_map(size: int) -> Map:
+    """
+    Builds a `size` x `size` map by tiling the default one. Only the first tile keeps
+    its start and goal.
+    """
+    tile = np.array(DEFAULT_MAP, dtype=np.uint8)
+    assert size >= len(tile), f"The map should be at least {len(tile)} tiles wide."
+    repeats = -(-size // len(tile))
+    map = np.tile(tile, (repeats, repeats))[:size, :size]
+    is_start_or_goal = np.isin(map, (START, GOAL))
+    is_start_or_goal[: len(tile), : len(tile)] = False
+    map[is_start_or_goal] = CORRIDOR
+    return map.tolist()
+
+
+def run(sizes: List[int], repeat: int, seed: int = 0) -> List[Result]:
+    results = []
+    rng = np.random.default_rng(seed)
+    for size in sizes:
+        maze = Maze(tiled_map(size))
+        walkable = np.argwhere(maze.map != WALL)
+        positions = [
+            (int(x), int(y))
+            for x, y in walkable[rng.integers(len(walkable), size=NUM_QUERIES)]
+        ]
+        directions = [Direction(value) for value in rng.integers(4, size=NUM_QUERIES)]
+        walkable_moves = [
+            (position, direction)
+            for position, direction in zip(positions, directions)
+            if maze.is_direction_walkable(position, direction)
+        ]
+        params = {"size": size}
+
+        def is_intersection() -> int:
+            for position in positions:
+                maze.is_intersection(position)
+            return len(positions)
+
+        def walkable_directions() -> int:
+            for position in positions:
+                maze.walkable_directions(position)
+            return len(positions)
+
+        position_array = np.array(positions)
+        direction_array = np.array([direction.value for direction in directions])
+
+        def is_direction_walkable_batch() -> int:
+            maze.is_direction_walkable_batch(position_array, direction_array)
+            return len(positions)
+
+        def next_position() -> int:
+            for position, direction in walkable_moves:
+                maze.next_position(position, direction)
+            return len(walkable_moves)
+
+        def travel() -> int:
+            for position, direction in walkable_moves:
+                maze.travel(position, direction)
+            return len(walkable_moves)
+
+        def build_tables() -> int:
+            Maze(map)._travel_steps
+            return 1
+
+        def build_graph() -> int:
+            Maze(map).graph
+            return 1
+
+        def goal() -> int:
+            for _ in range(NUM_GOAL_QUERIES):
+                maze.goal
+            return NUM_GOAL_QUERIES
+
+        def generate() -> int:
+            generate_map(size, size, seed)
+            return 1
+
+        def construct() -> int:
+            Maze(map)
+            return 1
+
+        procedure = MotionProcedure()
+        requests = [
+            (MazeEnvState(maze, position), GoDirection(direction))
+            for position, direction in walkable_moves
+        ]
+        states = [state for state, _ in requests]
+        actions = [action for _, action in requests]
+
+        def execute() -> int:
+            for state, action in requests:
+                procedure.execute(state, action)
+            return len(requests)
+
+        cached_procedure = CachedProcedure(
+            procedure, MotionProcedure.cache_key, len(requests)
+        )
+
+        def execute_cached() -> int:
+            for state, action in requests:
+                cached_procedure.execute(state, action)
+            return len(requests)
+
+        # Holds a single result, so all the distinct requests miss.
+        missing_procedure = CachedProcedure(procedure, MotionProcedure.cache_key, 1)
+
+        def execute_cached_miss() -> int:
+            for state, action in requests:
+                missing_procedure.execute(state, action)
+            return len(requests)
+
+        def execute_batch() -> int:
+            procedure.execute_batch(states, actions)
+            return len(requests)
+
+        map = tiled_map(size)
+        results += [
+            measure("maze.goal", params, goal, repeat),
+            measure("maze.is_intersection", params, is_intersection, repeat),
+            measure("maze.walkable_directions", params, walkable_directions, repeat),
+            measure("maze.next_position", params, next_position, repeat),
+            measure(
+                "maze.is_direction_walkable_batch",
+                params,
+                is_direction_walkable_batch,
+                repeat,
+            ),
+            measure("maze.construct", params, construct, repeat),
+            measure("maze.generate", params, generate, repeat),
+            measure("maze.travel", params, travel, repeat),
+            measure("maze.build_tables", params, build_tables, repeat),
+            measure("maze.build_graph", params, build_graph, repeat),
+            measure("procedure.execute", params, execute, repeat),
+            measure("procedure.execute_batch", params, execute_batch, repeat),
+            measure("procedure.execute_cached", params, execute_cached, repeat),
+            measure(
+                "procedure.execute_cached_miss", params, execute_cached_miss, repeat
+            ),
+        ]
+    return results
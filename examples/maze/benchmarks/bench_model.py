@@ -0,0 +1,66 @@
+from typing import List
+
+import numpy as np
+import torch
+from benchmarks.common import Result, measure
+from maze.agent.strategy import StrategyAgent
+from maze.env_config import DEFAULTS
+from maze.export import export_policy, pack_observations
+from maze.maze import DEFAULT_MAP, Direction
+from maze.model import MazeModel
+
+NUM_CALLS = 1_000
+
+
+def run(batch_sizes: List[int], repeat: int, seed: int = 0) -> List[Result]:
+    """
+    Latencies of single-threaded CPU inference of the strategy policy, through the
+    RLlib model and through the exported policy.
+    """
+    num_threads = torch.get_num_threads()
+    torch.set_num_threads(1)
+    agent_config = StrategyAgent.DEFAULTS
+    torch.manual_seed(seed)
+    model = MazeModel(
+        StrategyAgent.observation_space(agent_config, DEFAULTS),
+        StrategyAgent.action_space(agent_config, DEFAULTS),
+        len(Direction),
+        {},
+        "model",
+        map=DEFAULT_MAP,
+        num_actions=len(Direction),
+    )
+    policy = export_policy(model)
+    rng = np.random.default_rng(seed)
+
+    results = []
+    for batch_size in batch_sizes:
+        observations = {
+            "map": np.tile(np.array(DEFAULT_MAP, dtype=np.float32), (batch_size, 1, 1)),
+            "position": rng.integers(10, size=(batch_size, 2)).astype(np.float32),
+            "directions_mask": np.ones((batch_size, len(Direction)), dtype=np.float32),
+        }
+        params = {"batch_size": batch_size}
+
+        def forward() -> int:
+            with torch.no_grad():
+                for _ in range(NUM_CALLS):
+                    obs = {
+                        key: torch.from_numpy(value)
+                        for key, value in observations.items()
+                    }
+                    model({"obs": obs}, [], None)
+            return NUM_CALLS
+
+        def forward_exported() -> int:
+            with torch.no_grad():
+                for _ in range(NUM_CALLS):
+                    policy(*pack_observations(observations))
+            return NUM_CALLS
+
+        results += [
+            measure("MazeModel.forward", params, forward, repeat),
+            measure("MazePolicy.forward", params, forward_exported, repeat),
+        ]
+    torch.set_num_threads(num_threads)
+    return results
@@ -0,0 +1,108 @@
+import json
+import platform
+import subprocess
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+Params = Dict[str, Any]
+
+
+@dataclass
+class Result:
+    name: str
+    params: Params
+    ops: int
+    seconds: float
+
+    @property
+    def ops_per_sec(self) -> float:
+        return self.ops / self.seconds if self.seconds else float("inf")
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.name, json.dumps(self.params, sort_keys=True)
+
+
+def measure(
+    name: str,
+    params: Params,
+    run: Callable[[], int],
+    repeat: int = 3,
+    setup: Optional[Callable[[], None]] = None,
+) -> Result:
+    """
+    Calls `run` (which returns the number of performed operations) `repeat` times
+    and keeps the fastest run, as it's the least disturbed by the rest of the system.
+    """
+    best: Optional[Tuple[int, float]] = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        ops = run()
+        seconds = time.perf_counter() - start
+        if best is None or seconds / ops < best[1] / best[0]:
+            best = ops, seconds
+    assert best is not None
+    ops, seconds = best
+    result = Result(name, params, ops, seconds)
+    print(f"{name:<40} {_format_params(params):<24} {result.ops_per_sec:>14,.0f} ops/s")
+    return result
+
+
+def write_results(path: str, results: List[Result]) -> None:
+    data = {
+        "meta": _metadata(),
+        "results": [
+            asdict(result) | {"ops_per_sec": result.ops_per_sec} for result in results
+        ],
+    }
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2)
+
+
+def compare(path: str, results: List[Result]) -> None:
+    """
+    Prints the speedup of `results` over the ones stored in `path`.
+    """
+    with open(path) as file:
+        data = json.load(file)
+    baseline = {
+        (result["name"], json.dumps(result["params"], sort_keys=True)): result
+        for result in data["results"]
+    }
+    print(f"\nCompared to {path} ({data['meta'].get('commit', 'unknown commit')}):")
+    for result in results:
+        previous = baseline.get(result.key)
+        if previous is None:
+            continue
+        speedup = result.ops_per_sec / previous["ops_per_sec"]
+        print(f"{result.name:<40} {_format_params(result.params):<24} {speedup:>8.2f}x")
+
+
+def _metadata() -> Dict[str, Any]:
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, check=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _format_params(params: Params) -> str:
+    return " ".join(f"{key}={value}" for key, value in params.items())
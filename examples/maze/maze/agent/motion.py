@@ -11,7 +11,9 @@ from maze.env_config import MazeEnvConfig
 from maze.env_state import MazeEnvState
 from maze.exceptions import DirectionNonWalkable
 from maze.maze import Direction
+from maze.observation import MapObs, MapWriter, encode_map, map_spaces
 
+from hrl.action import ActionTable
 from hrl.agent import Agent, AgentObs
 from hrl.exceptions import UnknownAgentAction
 
@@ -21,10 +23,9 @@ MotionAgentRawAction = int
 MotionAgentSwitchAgentAction = SetDirection
 
 
-class MotionAgentObs(TypedDict):
-    map: npt.NDArray[np.float32]
+class MotionAgentObs(MapObs):
     position: npt.NDArray[np.float32]
-    directions_mask: npt.NDArray[np.float32]
+    directions_mask: npt.NDArray[np.int8]
 
 
 class MotionAgentConfig(TypedDict):
@@ -56,6 +57,10 @@ class MotionAgent(
     def __init__(self, config: MotionAgentConfig, env_config: MazeEnvConfig):
         super().__init__(config, env_config)
         self._elapsed_steps: Optional[int] = None
+        self._map_writer = MapWriter(env_config)
+        self._actions: ActionTable[MotionAgentAction] = ActionTable(
+            [MoveBackward(), MoveForward()]
+        )
 
     @staticmethod
     def observation_space(
@@ -67,7 +72,7 @@ class MotionAgent(
         return Dict(
             OrderedDict(
                 [
-                    ("map", Box(low=0, high=3, shape=(rows, cols))),
+                    *map_spaces(env_config),
                     ("position", Box(low=0, high=max(rows, cols), shape=(2,))),
                     ("directions_mask", MultiBinary(2)),
                 ]
@@ -83,34 +88,44 @@ class MotionAgent(
         return state
 
     def encode_observation(self, state: MotionAgentState) -> AgentObs:
-        available_directions = [
-            state.maze.is_direction_walkable(
-                state.position, Direction.opposite(state.direction)
-            ),
-            state.maze.is_direction_walkable(state.position, state.direction),
-        ]
-        encoded_available_directions = np.array(available_directions)
+        # The dtype of the `MultiBinary` space.
+        encoded_available_directions = state.maze.backward_forward_mask(
+            state.position, state.direction
+        ).astype(np.int8)
         return OrderedDict(
             [
-                ("map", state.maze.map.astype(dtype=np.float32)),
+                *encode_map(state.maze, state.position, self.env_config),
                 ("position", np.array(state.position, dtype=np.float32)),
                 ("directions_mask", encoded_available_directions),
             ]
         )  # type: ignore
 
+    def encode_observation_into(
+        self, state: MotionAgentState, observation: MotionAgentObs
+    ) -> None:
+        self._map_writer.write(observation, state.maze, state.position)
+        observation["position"][:] = state.position
+        observation["directions_mask"][:] = state.maze.backward_forward_mask(
+            state.position, state.direction
+        )
+
+    def action_mask(self, state: MotionAgentState) -> npt.NDArray[np.float32]:
+        return state.maze.backward_forward_mask(state.position, state.direction)
+
     def decode_action(
         self, state: MotionAgentState, action: MotionAgentRawAction
     ) -> MotionAgentAction:
-        if action == 0:
-            direction = Direction.opposite(state.direction)
+        decoded_action = self._actions.get(action)
+        if decoded_action is None:
+            raise UnknownAgentAction(self, action)
+        if self.validate_actions:
+            if isinstance(decoded_action, MoveBackward):
+                direction = Direction.opposite(state.direction)
+            else:
+                direction = state.direction
             if not state.maze.is_direction_walkable(state.position, direction):
                 raise DirectionNonWalkable(direction)
-            return MoveBackward()
-        elif action == 1:
-            if not state.maze.is_direction_walkable(state.position, state.direction):
-                raise DirectionNonWalkable(state.direction)
-            return MoveForward()
-        raise UnknownAgentAction(self, action)
+        return decoded_action
 
     def has_done(self, state: MotionAgentState) -> bool:
         return any(
@@ -144,3 +159,9 @@ class MotionAgent(
 
     def on_step(self, action: MotionAgentAction) -> None:
         self._elapsed_steps += 1
+
+    def snapshot(self) -> Optional[int]:
+        return self._elapsed_steps
+
+    def restore(self, snapshot: Optional[int]) -> None:
+        self._elapsed_steps = snapshot
@@ -10,8 +10,9 @@ from maze.env_config import MazeEnvConfig
 from maze.env_state import MazeEnvState
 from maze.exceptions import DirectionNonWalkable
 from maze.maze import Direction
+from maze.observation import MapObs, MapWriter, encode_map, map_spaces
 
-from hrl.action import NoSwitchAction
+from hrl.action import ActionTable, NoSwitchAction
 from hrl.agent import Agent, AgentConfig
 from hrl.exceptions import UnknownAgentAction
 
@@ -21,10 +22,9 @@ StrategyAgentRawAction = int
 StrategySwitchAgentAction = NoSwitchAction
 
 
-class StrategyAgentObs(TypedDict):
-    map: npt.NDArray[np.float32]
+class StrategyAgentObs(MapObs):
     position: npt.NDArray[np.float32]
-    directions_mask: npt.NDArray[np.float32]
+    directions_mask: npt.NDArray[np.int8]
 
 
 class StrategyAgentConfig(TypedDict):
@@ -51,6 +51,10 @@ class StrategyAgent(
     def __init__(self, config: StrategyAgentConfig, env_config: MazeEnvConfig):
         super().__init__(config, env_config)
         self._elapsed_steps: Optional[int] = None
+        self._map_writer = MapWriter(env_config)
+        self._actions = ActionTable(
+            [SetDirection(Direction(value)) for value in range(len(Direction))]
+        )
 
     @staticmethod
     def observation_space(config: AgentConfig, env_config: MazeEnvConfig) -> Space:
@@ -60,7 +64,7 @@ class StrategyAgent(
         return Dict(
             OrderedDict(
                 [
-                    ("map", Box(low=0, high=3, shape=(rows, cols))),
+                    *map_spaces(env_config),
                     ("position", Box(low=0, high=max(rows, cols), shape=(2,))),
                     ("directions_mask", MultiBinary(len(Direction))),
                 ]
@@ -75,35 +79,39 @@ class StrategyAgent(
         return state
 
     def encode_observation(self, state: StrategyAgentState) -> StrategyAgentObs:
-        available_directions = state.maze.walkable_directions(state.position)
-        encoded_available_directions = np.zeros(
-            shape=(
-                len(
-                    Direction,
-                )
-            ),
-            dtype=np.float32,
-        )
-        for direction in available_directions:
-            encoded_available_directions[direction.value] = 1.0
+        # The dtype of the `MultiBinary` space.
+        encoded_available_directions = state.maze.directions_mask(
+            state.position
+        ).astype(np.int8)
         return OrderedDict(
             [
-                ("map", state.maze.map.astype(dtype=np.float32)),
+                *encode_map(state.maze, state.position, self.env_config),
                 ("position", np.array(state.position, dtype=np.float32)),
                 ("directions_mask", encoded_available_directions),
             ]
         )  # type: ignore
 
+    def encode_observation_into(
+        self, state: StrategyAgentState, observation: StrategyAgentObs
+    ) -> None:
+        self._map_writer.write(observation, state.maze, state.position)
+        observation["position"][:] = state.position
+        observation["directions_mask"][:] = state.maze.directions_mask(state.position)
+
+    def action_mask(self, state: StrategyAgentState) -> npt.NDArray[np.float32]:
+        return state.maze.directions_mask(state.position)
+
     def decode_action(
         self, state: StrategyAgentState, action: StrategyAgentRawAction
     ) -> StrategyAgentAction:
-        try:
-            direction = Direction(action)
-        except ValueError:
+        decoded_action = self._actions.get(action)
+        if decoded_action is None:
             raise UnknownAgentAction(self, action)
-        if not state.maze.is_direction_walkable(state.position, direction):
-            raise DirectionNonWalkable(direction)
-        return SetDirection(direction)
+        if self.validate_actions and not state.maze.is_direction_walkable(
+            state.position, decoded_action.direction
+        ):
+            raise DirectionNonWalkable(decoded_action.direction)
+        return decoded_action
 
     def has_done(self, state: StrategyAgentState) -> bool:
         return any(
@@ -129,3 +137,9 @@ class StrategyAgent(
 
     def on_step(self, action: StrategyAgentAction) -> None:
         self._elapsed_steps += 1
+
+    def snapshot(self) -> Optional[int]:
+        return self._elapsed_steps
+
+    def restore(self, snapshot: Optional[int]) -> None:
+        self._elapsed_steps = snapshot
@@ -7,21 +7,25 @@ from maze.agent.motion import MotionAgent
 from maze.agent.strategy import StrategyAgent
 from maze.env_config import MazeEnvConfig
 from maze.env_state import MazeEnvState
-from maze.maze import Direction, Maze
+from maze.maze import Direction, shared_maze
 
 from hrl.action import Action
-from hrl.agent import Agent, AgentConfig, AgentName, AgentTrigger
+from hrl.agent import ActionTrigger, Agent, AgentConfig, AgentName, AgentTrigger
 from hrl.env import HierarchicalEnv
+from hrl.env_options import EnvOptions
 from hrl.exceptions import UnknownAction
 
 
 class MazeEnv(HierarchicalEnv[MazeEnvConfig, MazeEnvState, dict[str, Any]]):
     def __init__(
-        self, config: MazeEnvConfig, agent_configs: Dict[AgentName, AgentConfig]
+        self,
+        config: MazeEnvConfig,
+        agent_configs: Dict[AgentName, AgentConfig],
+        options: Optional[EnvOptions] = None,
     ):
-        super().__init__(config, agent_configs)
+        super().__init__(config, agent_configs, options)
 
-        self._maze = Maze()
+        self._maze = shared_maze(config["map"])
 
     @cached_property
     def agents(
@@ -46,11 +50,7 @@ class MazeEnv(HierarchicalEnv[MazeEnvConfig, MazeEnvState, dict[str, Any]]):
     @cached_property
     def transitions_on_action(self) -> List[Tuple[AgentTrigger[Action], AgentName]]:
         return [
-            (
-                lambda name, action: name == StrategyAgent.NAME
-                and isinstance(action, SetDirection),
-                MotionAgent.NAME,
-            ),
+            (ActionTrigger(StrategyAgent.NAME, SetDirection), MotionAgent.NAME),
         ]
 
     def initial_state(self) -> MazeEnvState:
@@ -59,7 +59,10 @@ class MazeEnv(HierarchicalEnv[MazeEnvConfig, MazeEnvState, dict[str, Any]]):
     def env_step(self, state: MazeEnvState, action: Action) -> MazeEnvState:
         # TODO TWr This could be nicely refactored with structural pattern matching.
         if isinstance(action, MoveForward):
-            new_position = state.maze.next_position(state.position, state.direction)
+            # In the trusted step mode, the policy moves in walkable directions only.
+            new_position = state.maze.next_position(
+                state.position, state.direction, check=self._checked
+            )
             state = replace(state, position=new_position)
         elif isinstance(action, MoveBackward):
             if state.maze.is_intersection(state.position):
@@ -2,9 +2,40 @@ from typing import TypedDict
 
 from maze.maze import DEFAULT_MAP, Map
 
+# Observations carry the whole map.
+MAP_OBSERVATION_FULL = "full"
+# Observations carry only the `map_id`, models look the map up (see `MazeModel`).
+MAP_OBSERVATION_ID = "id"
+# Observations carry a window of the map around the position (see `window_radius`)
+# and optionally a coarse overview of the whole map (see `context_size`), so their
+# size doesn't depend on the size of the map.
+MAP_OBSERVATION_WINDOW = "window"
+MAP_OBSERVATIONS = (MAP_OBSERVATION_FULL, MAP_OBSERVATION_ID, MAP_OBSERVATION_WINDOW)
+
 
 class MazeEnvConfig(TypedDict, total=False):
+    # Environments with equal maps share a single `Maze` (see `shared_maze`).
     map: Map
+    # The number of results of procedures (see `MazeProcedureEnv`) to memoize,
+    # zero disables the caching. It's only worth it when most of the motions are
+    # repeated (see `hrl.procedure.CachedProcedure`).
+    procedure_cache_size: int
+    # How observations carry the map, one of `MAP_OBSERVATIONS`.
+    map_observation: str
+    # The index of the map in the `maps` of `MazeModel`, observed in the "id" mode.
+    map_id: int
+    # The number of tiles visible in each direction in the "window" mode.
+    window_radius: int
+    # The number of rows and columns of the overview in the "window" mode, zero
+    # disables it.
+    context_size: int
 
 
-DEFAULTS: MazeEnvConfig = {"map": DEFAULT_MAP}
+DEFAULTS: MazeEnvConfig = {
+    "map": DEFAULT_MAP,
+    "procedure_cache_size": 0,
+    "map_observation": MAP_OBSERVATION_FULL,
+    "map_id": 0,
+    "window_radius": 5,
+    "context_size": 0,
+}
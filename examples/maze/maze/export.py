@@ -0,0 +1,80 @@
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from maze.model import MazeModel
+
+# The logit of masked actions.
+MASKED_LOGIT = -float(torch.finfo(torch.float32).max)
+
+PackedObs = Tuple[torch.Tensor, torch.Tensor, torch.Tensor]
+
+
+class MazePolicy(nn.Module):
+    """
+    The inference-only policy of a trained `MazeModel`. It takes the observation
+    packed into plain tensors (see `pack_observations`), skips the value head and
+    masks the logits of illegal actions in place.
+    """
+
+    def __init__(self, model: MazeModel):
+        super().__init__()
+        self.fc1 = _copy_linear(model.fc1)
+        self.fc2 = _copy_linear(model.fc2)
+        self.policy_head = _copy_linear(model.policy_head)
+        self.masked_logit = MASKED_LOGIT
+        obs_space = getattr(model.obs_space, "original_space", model.obs_space)
+        self.map_ids = "map_id" in obs_space.spaces
+        maps = model._maps if self.map_ids else torch.empty(0)
+        self.register_buffer("maps", maps.detach().clone())
+
+    def forward(
+        self, map: torch.Tensor, position: torch.Tensor, mask: torch.Tensor
+    ) -> torch.Tensor:
+        """
+        Returns the masked logits. The `map` holds the flattened map part of the
+        observations (the map, the window and the context, or the map id), one row
+        per observation.
+        """
+        if self.map_ids:
+            map = self.maps[map.long().reshape(-1)]
+        x = F.relu(self.fc1(torch.cat((map, position), dim=-1)))
+        x = F.relu(self.fc2(x))
+        return self.policy_head(x).masked_fill(mask == 0, self.masked_logit)
+
+
+def export_policy(model: MazeModel, path: Optional[str] = None) -> Any:
+    """
+    Converts a trained `MazeModel` into a TorchScript `MazePolicy` in evaluation
+    mode, which is saved at the `path` if given.
+    """
+    policy = torch.jit.script(MazePolicy(model).eval())
+    policy = torch.jit.freeze(policy)
+    if path is not None:
+        torch.jit.save(policy, path)
+    return policy
+
+
+def pack_observations(observations: Dict[str, np.ndarray]) -> PackedObs:
+    """
+    Packs a batch of observations (arrays of shape (batch, ...) keyed like agent
+    observations) into the inputs of `MazePolicy`.
+    """
+    map_parts = [
+        observations[key].reshape(len(observations["position"]), -1)
+        for key in ("map", "map_id", "window", "context")
+        if key in observations
+    ]
+    return (
+        torch.from_numpy(np.concatenate(map_parts, axis=1, dtype=np.float32)),
+        torch.from_numpy(np.asarray(observations["position"], dtype=np.float32)),
+        torch.from_numpy(np.asarray(observations["directions_mask"], dtype=np.float32)),
+    )
+
+
+def _copy_linear(layer: nn.Linear) -> nn.Linear:
+    copy = nn.Linear(layer.in_features, layer.out_features)
+    copy.load_state_dict(layer.state_dict())
+    return copy
@@ -0,0 +1,173 @@
+from typing import Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+from maze.maze import CORRIDOR, GOAL, START, WALL, Maze
+
+
+def generate_map(
+    rows: int,
+    cols: int,
+    seed: Optional[int] = None,
+    density: float = 0.5,
+    loops: float = 0.0,
+    intersections: Optional[int] = None,
+) -> npt.NDArray[np.uint8]:
+    """
+    Generates a random `rows` x `cols` map with exactly one start and one goal.
+
+    The maze is carved on a grid of cells surrounded by walls, each cell linked to
+    its upper or right neighbour (a binary tree maze), so all corridors are
+    connected. Cells are `round(1 / density)` tiles apart, so the `density` is
+    roughly the fraction of the tiles which are corridors (at most 0.5). Each
+    remaining wall between two adjacent cells is removed with the probability
+    `loops`, which adds cycles and intersections.
+
+    Alternatively, the exact number of `intersections` (walkable tiles with more
+    than two walkable neighbours) can be requested instead of the `loops`. Extra
+    walls are then removed in a random order until it's reached, like with
+    the `loops` but stopping at a count instead of a probability. It can't be lower
+    than the number of intersections of the binary tree maze (about a quarter of
+    the cells), and it's one higher in the rare case only walls whose removal adds
+    two intersections are left.
+
+    All steps are vectorized, so a 2000 x 2000 map is generated in a fraction of
+    a second. The same `seed` always yields the same map.
+    """
+    assert 0.0 < density <= 0.5, "The density should be in (0, 0.5]."
+    assert 0.0 <= loops <= 1.0, "The loops should be a probability."
+    assert (
+        intersections is None or loops == 0.0
+    ), "The loops and the intersections are exclusive."
+    spacing = max(2, round(1 / density))
+    cell_rows = np.arange(1, rows - 1, spacing)
+    cell_cols = np.arange(1, cols - 1, spacing)
+    assert (
+        len(cell_rows) * len(cell_cols) >= 2
+    ), "The map is too small to have a start and a goal."
+    rng = np.random.default_rng(seed)
+
+    map = np.full((rows, cols), WALL, dtype=np.uint8)
+    map[np.ix_(cell_rows, cell_cols)] = CORRIDOR
+    # Every cell except the upper right one is linked either up or right. Cells in
+    # the top row can only be linked right, the ones in the last column only up.
+    shape = (len(cell_rows), len(cell_cols))
+    up = rng.random(shape) < 0.5
+    up[0, :] = False
+    up[:, -1] = True
+    right = ~up
+    up[0, :] = False
+    right[:, -1] = False
+    if intersections is None:
+        up |= (rng.random(shape) < loops) & _can_link_up(shape)
+        right |= (rng.random(shape) < loops) & _can_link_right(shape)
+    else:
+        _link_intersections(up, right, intersections, rng)
+    for offset in range(1, spacing):
+        up_rows, up_cols = np.nonzero(up)
+        map[cell_rows[up_rows] - offset, cell_cols[up_cols]] = CORRIDOR
+        right_rows, right_cols = np.nonzero(right)
+        map[cell_rows[right_rows], cell_cols[right_cols] + offset] = CORRIDOR
+
+    start, goal = rng.choice(len(cell_rows) * len(cell_cols), size=2, replace=False)
+    for cell, value in ((start, START), (goal, GOAL)):
+        row, col = np.unravel_index(cell, shape)
+        map[cell_rows[row], cell_cols[col]] = value
+    return map
+
+
+def _can_link_up(shape: Tuple[int, int]) -> npt.NDArray[np.bool_]:
+    can_link = np.ones(shape, dtype=np.bool_)
+    can_link[0, :] = False
+    return can_link
+
+
+def _can_link_right(shape: Tuple[int, int]) -> npt.NDArray[np.bool_]:
+    can_link = np.ones(shape, dtype=np.bool_)
+    can_link[:, -1] = False
+    return can_link
+
+
+def _degrees(
+    up: npt.NDArray[np.bool_], right: npt.NDArray[np.bool_]
+) -> npt.NDArray[np.int64]:
+    degrees = up.astype(np.int64) + right
+    degrees[:-1, :] += up[1:, :]
+    degrees[:, 1:] += right[:, :-1]
+    return degrees
+
+
+def _link_intersections(
+    up: npt.NDArray[np.bool_],
+    right: npt.NDArray[np.bool_],
+    intersections: int,
+    rng: np.random.Generator,
+) -> None:
+    """
+    Links more cells in place (see `generate_map`), until exactly `intersections`
+    cells are linked to more than two others.
+    """
+    shape = up.shape
+    degrees = _degrees(up, right).ravel()
+    initial = int((degrees > 2).sum())
+    assert intersections >= initial, (
+        f"The map has at least {initial} intersections "
+        f"(for the seed), {intersections} requested."
+    )
+    # The walls left between adjacent cells, in a random order, as the cell
+    # they're up or right of and the flat indices of both cells.
+    up_cells = np.flatnonzero(~up & _can_link_up(shape))
+    right_cells = np.flatnonzero(~right & _can_link_right(shape))
+    cells = np.concatenate([up_cells, right_cells])
+    is_up = np.arange(len(cells)) < len(up_cells)
+    order = rng.permutation(len(cells))
+    cells, is_up = cells[order], is_up[order]
+    ends = np.stack([cells, np.where(is_up, cells - shape[1], cells + 1)], axis=1)
+
+    # The number of removed walls after which each cell becomes an intersection: it
+    # needs `3 - degree` more links, counted over the ends in the removal order.
+    flat_ends = ends.ravel()
+    by_cell = np.argsort(flat_ends, kind="stable")
+    sorted_cells = flat_ends[by_cell]
+    group_starts = np.searchsorted(sorted_cells, sorted_cells)
+    ranks = np.arange(len(sorted_cells)) - group_starts
+    crossing = ranks == 2 - degrees[sorted_cells]
+    crossings = np.sort(by_cell[crossing] // 2 + 1)
+    missing = intersections - initial
+    assert missing <= len(crossings), (
+        f"The map has at most {initial + len(crossings)} intersections "
+        f"(for the seed), {intersections} requested."
+    )
+    if missing == 0:
+        return
+    count = crossings[missing - 1]
+    selected = np.zeros(len(cells), dtype=np.bool_)
+    selected[:count] = True
+    if missing < len(crossings) and crossings[missing] == count:
+        # The last removed wall adds two intersections, it's replaced by a later one
+        # adding only one, if there's any.
+        selected[count - 1] = False
+        degrees = degrees + np.bincount(
+            ends[: count - 1].ravel(), minlength=len(degrees)
+        )
+        adds_one = (degrees[ends[count:]] == 2).sum(axis=1) == 1
+        if adds_one.any():
+            selected[count + int(np.argmax(adds_one))] = True
+        else:
+            selected[count - 1] = True
+    up.ravel()[cells[selected & is_up]] = True
+    right.ravel()[cells[selected & ~is_up]] = True
+
+
+def generate_maze(
+    rows: int,
+    cols: int,
+    seed: Optional[int] = None,
+    density: float = 0.5,
+    loops: float = 0.0,
+    intersections: Optional[int] = None,
+) -> Maze:
+    """
+    Generates a random `Maze`, see `generate_map`.
+    """
+    return Maze(generate_map(rows, cols, seed, density, loops, intersections))
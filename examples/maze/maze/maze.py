@@ -1,5 +1,10 @@
+import hashlib
+import heapq
+from dataclasses import dataclass
 from enum import Enum
-from typing import List, Optional, Set, Tuple
+from functools import cached_property
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple, Union
+from weakref import WeakValueDictionary
 
 import numpy as np
 import numpy.typing as npt
@@ -12,6 +17,8 @@ GOAL = 3
 Map = List[List[Value]]
 
 Position = Tuple[int, int]
+# An array of positions of shape (n, 2).
+Positions = npt.NDArray[np.int64]
 
 DEFAULT_MAP = [
     [0, 0, 1, 0, 3, 0, 0, 0, 0, 0],
@@ -38,13 +45,85 @@ class Direction(Enum):
         return Direction((direction.value + 2) % len(cls))
 
 
+# Offsets of the adjacent tiles indexed by `Direction.value`.
+DIRECTION_OFFSETS = np.array([(-1, 0), (0, 1), (1, 0), (0, -1)], dtype=np.int64)
+_OFFSETS: List[Position] = [(int(row), int(col)) for row, col in DIRECTION_OFFSETS]
+
+_WALKABLE_VALUES = np.zeros(256, dtype=np.bool_)
+_WALKABLE_VALUES[[CORRIDOR, START, GOAL]] = True
+
+# Bits of the tile flags.
+_INTERSECTION = 1
+_BOUNDARY = 2
+
+# Walkable directions, their number and masks indexed by a bitmask of
+# `Direction.value`s.
+_DIRECTION_SETS: List[FrozenSet[Direction]] = [
+    frozenset(direction for direction in Direction if mask >> direction.value & 1)
+    for mask in range(1 << len(Direction))
+]
+_DIRECTION_COUNTS = np.array(
+    [len(directions) for directions in _DIRECTION_SETS], dtype=np.uint8
+)
+_DIRECTION_MASKS = np.array(
+    [
+        [direction in directions for direction in Direction]
+        for directions in _DIRECTION_SETS
+    ],
+    dtype=np.float32,
+)
+_DIRECTION_MASKS.flags.writeable = False
+# Masks of going backward and forward indexed by a bitmask of the walkable directions
+# and the `Direction.value` of the forward direction.
+_BACKWARD_FORWARD_MASKS = np.stack(
+    [
+        _DIRECTION_MASKS[:, [(value + 2) % len(Direction), value]]
+        for value in range(len(Direction))
+    ],
+    axis=1,
+)
+_BACKWARD_FORWARD_MASKS.flags.writeable = False
+
+
 class Maze:
-    def __init__(self, map: Optional[Map] = None):
+    """
+    A maze built from a map of tile values. Neighbourhood queries are answered by
+    lookups into tables precomputed at construction. The tables are padded with
+    walls, so positions next to the map are outside of the maze (instead of
+    wrapping around as negative indices would).
+    """
+
+    def __init__(self, map: Optional[Union[Map, npt.NDArray[np.uint8]]] = None):
         if map is None:
             map = DEFAULT_MAP
         self._map = np.array(map, dtype=np.uint8)
-        self._rows = len(map)
-        self._cols = len(map[0])
+        # Mazes are shared by environments (see `shared_maze`).
+        self._map.flags.writeable = False
+        self._rows, self._cols = self._map.shape
+        self._start = _unique_position(self._map, START)
+        self._goal = _unique_position(self._map, GOAL)
+        # Maps padded with walls and coarse maps, built on demand (see `window` and
+        # `context`).
+        self._padded_maps: Dict[int, npt.NDArray[np.uint8]] = {}
+        self._contexts: Dict[int, npt.NDArray[np.float32]] = {}
+
+        padded_shape = (self._rows + 2, self._cols + 2)
+        self._walkable = np.zeros(padded_shape, dtype=np.bool_)
+        self._walkable[1:-1, 1:-1] = _WALKABLE_VALUES[self._map]
+        # Bitmasks of the walkable directions from each tile.
+        self._directions = np.zeros(padded_shape, dtype=np.uint8)
+        for direction in Direction:
+            d_row, d_col = _OFFSETS[direction.value]
+            adjacent = self._walkable[
+                1 + d_row : self._rows + 1 + d_row, 1 + d_col : self._cols + 1 + d_col
+            ]
+            self._directions[1:-1, 1:-1] |= adjacent.astype(np.uint8) << direction.value
+        self._flags = np.full(padded_shape, _BOUNDARY, dtype=np.uint8)
+        self._flags[2:-2, 2:-2] = 0
+        flags = self._flags[1:-1, 1:-1]
+        max_corridor_tiles = np.where(flags & _BOUNDARY, 1, 2)
+        adjacent_tile_counts = _DIRECTION_COUNTS[self._directions[1:-1, 1:-1]]
+        flags[adjacent_tile_counts > max_corridor_tiles] |= _INTERSECTION
 
     @property
     def map(self) -> npt.NDArray[np.float32]:
@@ -60,67 +139,364 @@ class Maze:
 
     @property
     def start(self) -> Position:
-        rows, cols = np.where(self._map == START)
-        assert (
-            len(rows) == len(cols) == 1
-        ), "There should be exactly one starting position."
-        return rows[0], cols[0]
+        assert self._start is not None, "There should be exactly one starting position."
+        return self._start
 
     @property
     def goal(self) -> Position:
-        rows, cols = np.where(self._map == GOAL)
-        assert len(rows) == len(cols) == 1, "The should be exactly one goal position."
-        return rows[0], cols[0]
+        assert self._goal is not None, "There should be exactly one goal position."
+        return self._goal
 
     def is_intersection(self, position: Position) -> bool:
-        adjacent_tiles = self._adjacent_tiles(position)
-        if self._is_boundary(position):
-            return len(adjacent_tiles) > 1
-        return len(adjacent_tiles) > 2
+        row, col = position
+        return bool(self._flags[row + 1, col + 1] & _INTERSECTION)
 
     def is_direction_walkable(self, position: Position, direction: Direction) -> bool:
-        tile_position = self._next_position_at_direction(position, direction)
-        return self._is_walkable(tile_position)
-
-    def walkable_directions(self, position: Position) -> Set[Direction]:
-        return {
-            direction
-            for direction in Direction
-            if self.is_direction_walkable(position, direction)
-        }
+        row, col = position
+        return bool(self._directions[row + 1, col + 1] >> direction.value & 1)
 
-    def next_position(self, position: Position, direction: Direction) -> Position:
-        tile_position = self._next_position_at_direction(position, direction)
-        assert self._is_walkable(tile_position)
-        return tile_position
+    def walkable_directions(self, position: Position) -> FrozenSet[Direction]:
+        row, col = position
+        return _DIRECTION_SETS[self._directions[row + 1, col + 1]]
 
-    def _adjacent_tiles(self, position: Position) -> List[Position]:
-        tiles = []
-        for direction in Direction:
-            next_position = self._next_position_at_direction(position, direction)
-            if self._is_walkable(next_position):
-                tiles.append(next_position)
-        return tiles
+    def next_position(
+        self, position: Position, direction: Direction, check: bool = True
+    ) -> Position:
+        """
+        The adjacent position in the `direction`, which has to be walkable. Pass
+        `check=False` to skip asserting it, when it's known already.
+        """
+        if check:
+            assert self.is_direction_walkable(position, direction)
+        row, col = position
+        d_row, d_col = _OFFSETS[direction.value]
+        return row + d_row, col + d_col
 
-    def _next_position_at_direction(
+    def directions_mask(self, position: Position) -> npt.NDArray[np.float32]:
+        """
+        A read-only mask of the walkable directions indexed by `Direction.value`.
+        """
+        row, col = position
+        return _DIRECTION_MASKS[self._directions[row + 1, col + 1]]
+
+    def backward_forward_mask(
         self, position: Position, direction: Direction
-    ) -> Position:
-        x, y = position
-        adjacent_indices = {
-            Direction.UP: (x - 1, y),
-            Direction.RIGHT: (x, y + 1),
-            Direction.DOWN: (x + 1, y),
-            Direction.LEFT: (x, y - 1),
-        }
-        return adjacent_indices[direction]
+    ) -> npt.NDArray[np.float32]:
+        """
+        A read-only mask whether going backward and forward is walkable, when facing
+        the `direction`.
+        """
+        row, col = position
+        return _BACKWARD_FORWARD_MASKS[
+            self._directions[row + 1, col + 1], direction.value
+        ]
+
+    def is_walkable_batch(self, positions: Positions) -> npt.NDArray[np.bool_]:
+        """
+        Vectorized check whether the tiles at the `positions` are walkable. Tiles
+        outside of the map aren't.
+        """
+        return self._walkable[self._padded_index(positions)]
+
+    def is_intersection_batch(self, positions: Positions) -> npt.NDArray[np.bool_]:
+        """
+        Vectorized `is_intersection`.
+        """
+        return self._flags[self._padded_index(positions)] & _INTERSECTION != 0
+
+    def is_direction_walkable_batch(
+        self, positions: Positions, directions: npt.NDArray[np.int64]
+    ) -> npt.NDArray[np.bool_]:
+        """
+        Vectorized `is_direction_walkable` for an array of positions and an array of
+        direction values.
+        """
+        return self._directions[self._padded_index(positions)] >> directions & 1 != 0
+
+    def directions_mask_batch(self, positions: Positions) -> npt.NDArray[np.float32]:
+        """
+        Vectorized `directions_mask`, one row per position.
+        """
+        return _DIRECTION_MASKS[self._directions[self._padded_index(positions)]]
+
+    def next_position_batch(
+        self, positions: Positions, directions: npt.NDArray[np.int64]
+    ) -> Positions:
+        """
+        Vectorized `next_position` for an array of positions and an array of
+        direction values.
+        """
+        assert self.is_direction_walkable_batch(positions, directions).all()
+        return positions + DIRECTION_OFFSETS[directions]
+
+    def travel(self, position: Position, direction: Direction) -> Tuple[Position, int]:
+        """
+        Where the agent ends up going straight in the `direction` until it reaches
+        an intersection or a wall (like `MotionProcedure`), and the number of steps.
+        Returns the `position` and zero steps if the direction isn't walkable.
+        """
+        row, col = position
+        steps = int(self._travel_steps[direction.value, row, col])
+        d_row, d_col = _OFFSETS[direction.value]
+        return (row + d_row * steps, col + d_col * steps), steps
+
+    def travel_batch(
+        self, positions: Positions, directions: npt.NDArray[np.int64]
+    ) -> Tuple[Positions, npt.NDArray[np.int32]]:
+        """
+        Vectorized `travel` for an array of positions and an array of direction
+        values.
+        """
+        steps = self._travel_steps[directions, positions[:, 0], positions[:, 1]]
+        return positions + DIRECTION_OFFSETS[directions] * steps[:, None], steps
+
+    def window(self, position: Position, radius: int) -> npt.NDArray[np.uint8]:
+        """
+        The square of tiles within the `radius` around the `position`, where tiles
+        outside of the map are walls. It's a read-only view into a padded copy of
+        the map, which is built once per radius.
+        """
+        padded = self._padded_maps.get(radius)
+        if padded is None:
+            padded = np.pad(self._map, radius, constant_values=WALL)
+            padded.flags.writeable = False
+            self._padded_maps[radius] = padded
+        row, col = position
+        size = 2 * radius + 1
+        return padded[row : row + size, col : col + size]
+
+    def context(self, size: int) -> npt.NDArray[np.float32]:
+        """
+        A coarse `size` x `size` overview of the maze, the fraction of walkable tiles
+        in each block of the map. It's built once per size.
+        """
+        context = self._contexts.get(size)
+        if context is None:
+            assert (
+                size <= self._rows and size <= self._cols
+            ), "The context can't be finer than the map."
+            row_starts = np.linspace(0, self._rows, size + 1).astype(np.int64)
+            col_starts = np.linspace(0, self._cols, size + 1).astype(np.int64)
+            walkable = self._walkable[1:-1, 1:-1].astype(np.float32)
+            sums = np.add.reduceat(
+                np.add.reduceat(walkable, row_starts[:-1], axis=0),
+                col_starts[:-1],
+                axis=1,
+            )
+            areas = np.outer(np.diff(row_starts), np.diff(col_starts))
+            context = (sums / areas).astype(np.float32)
+            context.flags.writeable = False
+            self._contexts[size] = context
+        return context
+
+    @cached_property
+    def graph(self) -> "MazeGraph":
+        """
+        The corridor graph of the maze. It's built on the first access, as it takes
+        seconds for large maps and the environments don't need it.
+        """
+        return MazeGraph(self)
+
+    @cached_property
+    def _intersections(self) -> npt.NDArray[np.bool_]:
+        return self._flags[1:-1, 1:-1] & _INTERSECTION != 0
+
+    @cached_property
+    def _travel_steps(self) -> npt.NDArray[np.int32]:
+        """
+        Numbers of steps of `travel` indexed by (direction, row, column), the ends
+        follow from them as the runs are straight. Built once per maze by sweeping
+        the map against each direction, so a run continues the already known run of
+        the next tile.
+        """
+        steps = np.zeros((len(Direction), self._rows, self._cols), dtype=np.int32)
+        walkable = self._walkable[1:-1, 1:-1]
+        intersections = self._intersections
+        for direction in Direction:
+            # All directions are reduced to going up by flipping and transposing.
+            transpose = direction in (Direction.LEFT, Direction.RIGHT)
+            flip = direction in (Direction.DOWN, Direction.RIGHT)
+            views = [walkable, intersections, steps[direction.value]]
+            if transpose:
+                views = [view.T for view in views]
+            if flip:
+                views = [view[::-1] for view in views]
+            line_walkable, line_intersections, line_steps = views
+            for line in range(1, len(line_walkable)):
+                next_line = line - 1
+                moves = line_walkable[next_line]
+                if next_line > 0:
+                    continues = (
+                        moves
+                        & ~line_intersections[next_line]
+                        & line_walkable[next_line - 1]
+                    )
+                    line_steps[line] = np.where(
+                        continues, line_steps[next_line] + 1, moves
+                    )
+                else:
+                    line_steps[line] = moves
+        return steps
 
     def _is_walkable(self, position: Position) -> bool:
+        row, col = position
+        return bool(self._walkable[row + 1, col + 1])
+
+    def _padded_index(
+        self, positions: Positions
+    ) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+        # Positions further outside of the map are moved onto the padding.
+        rows = np.clip(positions[:, 0], -1, self._rows) + 1
+        cols = np.clip(positions[:, 1], -1, self._cols) + 1
+        return rows, cols
+
+
+# Mazes alive in the process, keyed by the shape and the hash of their maps.
+_shared_mazes: "WeakValueDictionary[Tuple[Tuple[int, ...], bytes], Maze]" = (
+    WeakValueDictionary()
+)
+
+
+def shared_maze(map: Union[Map, npt.NDArray[np.uint8]]) -> Maze:
+    """
+    Returns a `Maze` of the `map`, shared by all environments of the process using
+    an equal map, so its tables are built only once. A maze is kept only as long as
+    somebody uses it.
+    """
+    array = np.asarray(map, dtype=np.uint8)
+    key = array.shape, hashlib.blake2b(array.tobytes(), digest_size=16).digest()
+    maze = _shared_mazes.get(key)
+    if maze is None:
+        maze = _shared_mazes[key] = Maze(array)
+    return maze
+
+
+@dataclass(frozen=True)
+class Corridor:
+    """
+    A corridor of `MazeGraph` leaving a node in some direction.
+    """
+
+    # The node at the other end of the corridor.
+    end: Position
+    length: int
+    # The direction of the last step into the `end`.
+    arrival: Direction
+
+
+class MazeGraph:
+    """
+    A graph of the maze, whose nodes are the intersections, dead ends, the start and
+    the goal, and whose edges are the (possibly bending) corridors between them.
+    It's built once per maze on demand (see `Maze.graph`) and answers where
+    a corridor leads and how long it is with a single lookup.
+    """
+
+    def __init__(self, maze: Maze):
+        walkable = maze._walkable[1:-1, 1:-1]
+        dead_ends = _DIRECTION_COUNTS[maze._directions[1:-1, 1:-1]] <= 1
+        nodes = walkable & (maze._intersections | dead_ends)
+        special_nodes = [maze.start, maze.goal]
+        for special_node in special_nodes:
+            nodes[special_node] = True
+        self.nodes: Set[Position] = {
+            (int(row), int(col)) for row, col in np.argwhere(nodes)
+        }
+        self.corridors: Dict[Position, Dict[Direction, Corridor]] = {
+            node: {} for node in self.nodes
+        }
+        for node in self.nodes:
+            for direction in Direction:
+                corridor = self._follow(maze, node, direction, special_nodes)
+                if corridor is not None:
+                    self.corridors[node][direction] = corridor
+        self._distances: Dict[Position, Dict[Position, int]] = {}
+
+    def corridor(self, node: Position, direction: Direction) -> Optional[Corridor]:
+        return self.corridors[node].get(direction)
+
+    def distances(self, source: Position) -> Dict[Position, int]:
+        """
+        Shortest distances (in steps) from the `source` node to all reachable nodes.
+        They're computed once per source.
+        """
         try:
-            value = int(self._map[position])
-        except IndexError:
-            return False
-        return value in (CORRIDOR, START, GOAL)
-
-    def _is_boundary(self, position: Position) -> bool:
-        x, y = position
-        return not (0 < x < self.rows - 1 and 0 < y < self.cols - 1)
+            return self._distances[source]
+        except KeyError:
+            pass
+        distances = {source: 0}
+        queue = [(0, source)]
+        while queue:
+            distance, node = heapq.heappop(queue)
+            if distance > distances[node]:
+                continue
+            for corridor in self.corridors[node].values():
+                end_distance = distance + corridor.length
+                if end_distance < distances.get(corridor.end, end_distance + 1):
+                    distances[corridor.end] = end_distance
+                    heapq.heappush(queue, (end_distance, corridor.end))
+        self._distances[source] = distances
+        return distances
+
+    def _follow(
+        self,
+        maze: Maze,
+        node: Position,
+        direction: Direction,
+        special_nodes: List[Position],
+    ) -> Optional[Corridor]:
+        # Corridors are followed by straight runs of `Maze.travel`, which stop
+        # at intersections and bends. The start and the goal are found separately,
+        # as they can lie in the middle of a run.
+        walkable = maze._walkable
+        position = node
+        length = 0
+        while True:
+            end, steps = maze.travel(position, direction)
+            if steps == 0:
+                if length == 0:
+                    return None
+                # A bend, the corridor continues in the only other direction except
+                # the one it came from.
+                row, col = position
+                (direction,) = [
+                    other
+                    for other in Direction
+                    if other != Direction.opposite(direction)
+                    and walkable[
+                        row + _OFFSETS[other.value][0] + 1,
+                        col + _OFFSETS[other.value][1] + 1,
+                    ]
+                ]
+                continue
+            for special_node in special_nodes:
+                distance = _distance_along(position, special_node, direction)
+                if 0 < distance <= steps:
+                    return Corridor(special_node, length + distance, direction)
+            position = end
+            length += steps
+            if position in self.nodes:
+                return Corridor(position, length, direction)
+
+
+def _distance_along(source: Position, target: Position, direction: Direction) -> int:
+    """
+    The number of steps from the `source` to the `target` in the `direction`, or -1
+    if the target doesn't lie in that direction.
+    """
+    d_row, d_col = _OFFSETS[direction.value]
+    row_steps = target[0] - source[0]
+    col_steps = target[1] - source[1]
+    if d_row == 0 and row_steps == 0 and col_steps * d_col > 0:
+        return col_steps * d_col
+    if d_col == 0 and col_steps == 0 and row_steps * d_row > 0:
+        return row_steps * d_row
+    return -1
+
+
+def _unique_position(map: npt.NDArray[np.uint8], value: Value) -> Optional[Position]:
+    positions = np.argwhere(map == value)
+    if len(positions) != 1:
+        return None
+    row, col = positions[0]
+    return int(row), int(col)
@@ -4,11 +4,17 @@ import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from maze.maze import DEFAULT_MAP, GOAL
 from ray.rllib.models import ModelV2
 from ray.rllib.models.torch.torch_modelv2 import TorchModelV2
 from ray.rllib.utils import override
 from ray.rllib.utils.typing import TensorType
 
+# Tiles of a map, from WALL to GOAL.
+NUM_TILE_VALUES = GOAL + 1
+# The number of rows and columns the map features of `ConvMazeModel` are pooled to.
+POOLED_MAP_SIZE = 4
+
 
 class MazeModel(TorchModelV2, nn.Module):
     def __init__(
@@ -26,11 +32,32 @@ class MazeModel(TorchModelV2, nn.Module):
         )
         self._custom_model_config = custom_model_config
 
-        map = self._custom_model_config["map"]
-        rows, cols = len(map), len(map[0])
-        self._map_size = rows * cols
+        original_space = getattr(obs_space, "original_space", obs_space)
+        # In the "window" mode, the map features are the window and the context, so
+        # their number doesn't depend on the size of the map.
+        self._window_keys = [
+            key for key in ("window", "context") if key in original_space.spaces
+        ]
+        if self._window_keys:
+            map_features = sum(
+                int(np.prod(original_space[key].shape)) for key in self._window_keys
+            )
+        else:
+            map = self._custom_model_config["map"]
+            rows, cols = len(map), len(map[0])
+            self._map_size = map_features = rows * cols
+            # Maps indexed by the observed `map_id`s, when the environment doesn't
+            # send the maps themselves (see `MazeEnvConfig.map_observation`).
+            maps = self._custom_model_config.get("maps", [map])
+            self.register_buffer(
+                "_maps",
+                torch.tensor(np.array(maps), dtype=torch.float32).reshape(
+                    len(maps), self._map_size
+                ),
+                persistent=False,
+            )
         position_size = 2
-        input_features = self._map_size + position_size
+        input_features = map_features + position_size
 
         num_actions = self._custom_model_config["num_actions"]
 
@@ -52,7 +79,15 @@ class MazeModel(TorchModelV2, nn.Module):
         seq_lens: TensorType,
     ) -> (TensorType, List[TensorType]):
         obs = input_dict["obs"]
-        map_flatten = torch.reshape(obs["map"], [-1, self._map_size])
+        if self._window_keys:
+            map_flatten = torch.cat(
+                [torch.flatten(obs[key], start_dim=1) for key in self._window_keys],
+                dim=-1,
+            )
+        elif "map_id" in obs:
+            map_flatten = self._maps[obs["map_id"].long().reshape(-1)]
+        else:
+            map_flatten = torch.reshape(obs["map"], [-1, self._map_size])
         features = torch.cat((map_flatten, obs["position"]), dim=-1)
 
         x = F.relu(self.fc1(features))
@@ -61,14 +96,162 @@ class MazeModel(TorchModelV2, nn.Module):
         self._last_value = self.value_head(x)
 
         policy_logits = self.policy_head(x)
-        mask = obs["directions_mask"].bool()
-        filtered_policy_logits = torch.where(
-            mask,
-            policy_logits,
-            torch.tensor(-torch.finfo(torch.float32).max, device=policy_logits.device),
+        return _mask_logits(policy_logits, obs["directions_mask"]), state
+
+    def value_function(self) -> TensorType:
+        return torch.reshape(self._last_value, [-1])
+
+
+class ConvMazeModel(TorchModelV2, nn.Module):
+    """
+    Like `MazeModel`, but encodes the map with convolutions pooled to a fixed size,
+    so the number of parameters doesn't depend on the size of the map and the same
+    weights work for maps of any size.
+
+    Samples of a batch usually share the map, so the map embedding is computed once
+    per unique map (or `map_id`) and gathered for the samples. The position is
+    normalized by the size of the map. In the "window" mode, the window is encoded
+    instead of the map, the context is appended to the embedding and the position
+    is normalized by the bound of its space.
+    """
+
+    def __init__(
+        self,
+        obs_space,
+        action_space,
+        num_outputs,
+        model_config,
+        name,
+        **custom_model_config,
+    ):
+        nn.Module.__init__(self)
+        TorchModelV2.__init__(
+            self, obs_space, action_space, num_outputs, model_config, name
         )
+        self._custom_model_config = custom_model_config
 
-        return filtered_policy_logits, state
+        original_space = getattr(obs_space, "original_space", obs_space)
+        self._window = "window" in original_space.spaces
+        context_size = 0
+        if "context" in original_space.spaces:
+            context_size = int(np.prod(original_space["context"].shape))
+        self._position_scale = float(np.max(original_space["position"].high))
+
+        # Maps indexed by the observed `map_id`s (see `MazeModel`). They may differ
+        # in size, so they're padded to a common shape and cropped back when encoded.
+        maps = [
+            np.asarray(map, dtype=np.float32)
+            for map in self._custom_model_config.get(
+                "maps", [self._custom_model_config.get("map", DEFAULT_MAP)]
+            )
+        ]
+        shapes = np.array([map.shape for map in maps])
+        padded = np.zeros((len(maps), *shapes.max(axis=0)), dtype=np.float32)
+        for index, map in enumerate(maps):
+            padded[index, : map.shape[0], : map.shape[1]] = map
+        self.register_buffer("_maps", torch.from_numpy(padded), persistent=False)
+        self.register_buffer(
+            "_map_shapes", torch.from_numpy(shapes).float(), persistent=False
+        )
+
+        # Tiles are one-hot encoded into channels.
+        self.encoder = nn.Sequential(
+            nn.Conv2d(NUM_TILE_VALUES, 16, kernel_size=3, padding=1),
+            nn.ReLU(),
+            nn.Conv2d(16, 32, kernel_size=3, padding=1),
+            nn.ReLU(),
+            nn.AdaptiveMaxPool2d(POOLED_MAP_SIZE),
+            nn.Flatten(),
+        )
+        self._embedding_size = 32 * POOLED_MAP_SIZE * POOLED_MAP_SIZE
+        position_size = 2
+
+        num_actions = self._custom_model_config["num_actions"]
+
+        self.fc1 = nn.Linear(self._embedding_size + context_size + position_size, 128)
+        self.fc2 = nn.Linear(128, 128)
+        self.policy_head = nn.Linear(128, num_actions)
+        self.value_head = nn.Linear(128, 1)
+
+        self._last_value: Optional[torch.Tensor] = None
+
+    @override(ModelV2)
+    def get_initial_state(self) -> List[np.ndarray]:
+        return []
+
+    def forward(
+        self,
+        input_dict: Dict[str, TensorType],
+        state: List[TensorType],
+        seq_lens: TensorType,
+    ) -> (TensorType, List[TensorType]):
+        obs = input_dict["obs"]
+        if self._window:
+            embeddings = self._encode_unique(obs["window"])
+            positions = obs["position"] / self._position_scale
+        elif "map_id" in obs:
+            map_ids = obs["map_id"].long().reshape(-1)
+            embeddings = self._encode_map_ids(map_ids)
+            positions = obs["position"] / self._map_shapes[map_ids]
+        else:
+            maps = obs["map"]
+            embeddings = self._encode_unique(maps)
+            positions = obs["position"] / torch.tensor(
+                maps.shape[1:], dtype=torch.float32, device=maps.device
+            )
+        features = [embeddings]
+        if "context" in obs:
+            features.append(torch.flatten(obs["context"], start_dim=1))
+        features.append(positions)
+
+        x = F.relu(self.fc1(torch.cat(features, dim=-1)))
+        x = F.relu(self.fc2(x))
+
+        self._last_value = self.value_head(x)
+
+        policy_logits = self.policy_head(x)
+        return _mask_logits(policy_logits, obs["directions_mask"]), state
 
     def value_function(self) -> TensorType:
         return torch.reshape(self._last_value, [-1])
+
+    def encode_maps(self, maps: TensorType) -> TensorType:
+        """
+        Embeddings of a batch of maps of shape (batch, rows, columns).
+        """
+        tiles = F.one_hot(maps.long(), NUM_TILE_VALUES).permute(0, 3, 1, 2)
+        return self.encoder(tiles.float())
+
+    def _encode_unique(self, maps: TensorType) -> TensorType:
+        # Encodes each unique map (or window) of the batch once.
+        batch_size = maps.shape[0]
+        # Most often all samples share the map, which is cheaper to check than
+        # finding the unique ones.
+        if bool((maps == maps[:1]).all()):
+            return self.encode_maps(maps[:1]).expand(batch_size, -1)
+        unique_maps, inverse = torch.unique(
+            maps.reshape(batch_size, -1), dim=0, return_inverse=True
+        )
+        return self.encode_maps(unique_maps.reshape(-1, *maps.shape[1:]))[inverse]
+
+    def _encode_map_ids(self, map_ids: TensorType) -> TensorType:
+        # Encodes each unique map of the batch once, maps of the same size together.
+        unique_ids, inverse = torch.unique(map_ids, return_inverse=True)
+        shapes, shape_inverse = torch.unique(
+            self._map_shapes[unique_ids], dim=0, return_inverse=True
+        )
+        embeddings = self._maps.new_empty(len(unique_ids), self._embedding_size)
+        for index, (rows, cols) in enumerate(shapes.long().tolist()):
+            selected = shape_inverse == index
+            embeddings[selected] = self.encode_maps(
+                self._maps[unique_ids[selected], :rows, :cols]
+            )
+        return embeddings[inverse]
+
+
+def _mask_logits(policy_logits: TensorType, mask: TensorType) -> TensorType:
+    return torch.where(
+        mask.bool(),
+        policy_logits,
+        torch.tensor(-torch.finfo(torch.float32).max, device=policy_logits.device),
+    )
@@ -0,0 +1,112 @@
+from typing import Any, Dict, List, Tuple, TypedDict
+
+import numpy as np
+import numpy.typing as npt
+from gym import Space  # type: ignore
+from gym.spaces import Box  # type: ignore
+from maze.env_config import (
+    MAP_OBSERVATION_FULL,
+    MAP_OBSERVATION_ID,
+    MAP_OBSERVATION_WINDOW,
+    MAP_OBSERVATIONS,
+    MazeEnvConfig,
+)
+from maze.maze import Maze, Position
+
+MAX_MAP_ID = np.iinfo(np.int32).max
+
+
+class MapObs(TypedDict, total=False):
+    # Only some of them are present, depending on `MazeEnvConfig.map_observation`.
+    map: npt.NDArray[np.float32]
+    map_id: npt.NDArray[np.float32]
+    window: npt.NDArray[np.float32]
+    context: npt.NDArray[np.float32]
+
+
+def _map_observation(env_config: MazeEnvConfig) -> str:
+    map_observation = env_config.get("map_observation", MAP_OBSERVATION_FULL)
+    assert (
+        map_observation in MAP_OBSERVATIONS
+    ), f"Unknown map observation `{map_observation}`."
+    return map_observation
+
+
+def map_spaces(env_config: MazeEnvConfig) -> List[Tuple[str, Space]]:
+    """
+    Spaces of the map part of agent observations.
+    """
+    map_observation = _map_observation(env_config)
+    if map_observation == MAP_OBSERVATION_ID:
+        return [("map_id", Box(low=0, high=MAX_MAP_ID, shape=(1,)))]
+    if map_observation == MAP_OBSERVATION_WINDOW:
+        size = 2 * env_config.get("window_radius", 5) + 1
+        spaces = [("window", Box(low=0, high=3, shape=(size, size)))]
+        context_size = env_config.get("context_size", 0)
+        if context_size > 0:
+            spaces.append(
+                ("context", Box(low=0, high=1, shape=(context_size, context_size)))
+            )
+        return spaces
+    map = env_config["map"]
+    return [("map", Box(low=0, high=3, shape=(len(map), len(map[0]))))]
+
+
+def encode_map(
+    maze: Maze, position: Position, env_config: MazeEnvConfig
+) -> List[Tuple[str, npt.NDArray[np.float32]]]:
+    """
+    The map part of agent observations.
+    """
+    map_observation = _map_observation(env_config)
+    if map_observation == MAP_OBSERVATION_ID:
+        map_id = env_config.get("map_id", 0)
+        return [("map_id", np.array([map_id], dtype=np.float32))]
+    if map_observation == MAP_OBSERVATION_WINDOW:
+        window = maze.window(position, env_config.get("window_radius", 5))
+        encoded = [("window", window.astype(np.float32))]
+        context_size = env_config.get("context_size", 0)
+        if context_size > 0:
+            encoded.append(("context", maze.context(context_size).copy()))
+        return encoded
+    return [("map", maze.map.astype(dtype=np.float32))]
+
+
+class MapWriter:
+    """
+    Writes the map part of observations into long-lived observation buffers. As
+    the map (and the context) doesn't change within an episode, it's skipped for
+    buffers which already hold it. Windows are copied straight from the views into
+    the maze, without intermediate arrays.
+    """
+
+    def __init__(self, env_config: MazeEnvConfig) -> None:
+        self._map_observation = _map_observation(env_config)
+        self._map_id = env_config.get("map_id", 0)
+        self._window_radius = env_config.get("window_radius", 5)
+        self._context_size = env_config.get("context_size", 0)
+        # Buffers are stored alongside the mazes, so their ids can't be reused.
+        self._written: Dict[int, Tuple[npt.NDArray[np.float32], Maze]] = {}
+
+    def write(
+        self, observation: Dict[str, Any], maze: Maze, position: Position
+    ) -> None:
+        if self._map_observation == MAP_OBSERVATION_ID:
+            observation["map_id"][0] = self._map_id
+        elif self._map_observation == MAP_OBSERVATION_WINDOW:
+            np.copyto(observation["window"], maze.window(position, self._window_radius))
+            if self._context_size > 0:
+                self._write_static(
+                    observation["context"], maze, maze.context(self._context_size)
+                )
+        else:
+            self._write_static(observation["map"], maze, maze.map)
+
+    def _write_static(
+        self, out: npt.NDArray[np.float32], maze: Maze, data: npt.NDArray[Any]
+    ) -> None:
+        written = self._written.get(id(out))
+        if written is not None and written[0] is out and written[1] is maze:
+            return
+        np.copyto(out, data)
+        self._written[id(out)] = (out, maze)
@@ -1,27 +1,31 @@
 from functools import cached_property
-from typing import Any, Dict, List, Tuple, Type
+from typing import Any, Dict, List, Optional, Tuple, Type
 
 from maze.env_config import MazeEnvConfig
-from maze.maze import Maze
+from maze.maze import shared_maze
 from maze_procedure.action import GoDirection
 from maze_procedure.agent.strategy import StrategyAgent
 from maze_procedure.env_state import MazeEnvState
 from maze_procedure.procedure.motion import MotionProcedure
 
 from hrl.action import Action
-from hrl.agent import Agent, AgentConfig, AgentName, AgentTrigger
+from hrl.agent import ActionTrigger, Agent, AgentConfig, AgentName, AgentTrigger
 from hrl.env import HierarchicalEnv
+from hrl.env_options import EnvOptions
 from hrl.exceptions import UnknownAction
-from hrl.procedure import Procedure, ProcedureName
+from hrl.procedure import CachedProcedure, Procedure, ProcedureName
 
 
 class MazeProcedureEnv(HierarchicalEnv[MazeEnvConfig, MazeEnvState, dict[str, Any]]):
     def __init__(
-        self, config: MazeEnvConfig, agent_configs: Dict[AgentName, AgentConfig]
+        self,
+        config: MazeEnvConfig,
+        agent_configs: Dict[AgentName, AgentConfig],
+        options: Optional[EnvOptions] = None,
     ):
-        super().__init__(config, agent_configs)
+        super().__init__(config, agent_configs, options)
 
-        self._maze = Maze()
+        self._maze = shared_maze(config["map"])
 
     @cached_property
     def agents(
@@ -34,7 +38,13 @@ class MazeProcedureEnv(HierarchicalEnv[MazeEnvConfig, MazeEnvState, dict[str, An
 
     @cached_property
     def procedures(self) -> Dict[ProcedureName, Procedure[MazeEnvState, Any]]:
-        return {MotionProcedure.NAME: MotionProcedure()}
+        procedure: Procedure[MazeEnvState, Any] = MotionProcedure()
+        cache_size = self._config.get("procedure_cache_size", 0)
+        if cache_size > 0:
+            procedure = CachedProcedure(
+                procedure, MotionProcedure.cache_key, cache_size
+            )
+        return {MotionProcedure.NAME: procedure}
 
     @property
     def initial_agent(self) -> AgentName:
@@ -43,11 +53,7 @@ class MazeProcedureEnv(HierarchicalEnv[MazeEnvConfig, MazeEnvState, dict[str, An
     @cached_property
     def procedures_on_action(self) -> List[Tuple[AgentTrigger[Action], ProcedureName]]:
         return [
-            (
-                lambda name, action: name == StrategyAgent.NAME
-                and isinstance(action, GoDirection),
-                MotionProcedure.NAME,
-            ),
+            (ActionTrigger(StrategyAgent.NAME, GoDirection), MotionProcedure.NAME),
         ]
 
     def initial_state(self) -> MazeEnvState:
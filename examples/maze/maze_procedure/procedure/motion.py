@@ -1,6 +1,7 @@
 from dataclasses import replace
+from typing import Dict, Hashable, List, Sequence
 
-from maze.maze import Direction
+import numpy as np
 from maze_procedure.action import GoDirection
 from maze_procedure.env_state import MazeEnvState
 
@@ -8,19 +9,46 @@ from hrl.procedure import Procedure
 
 
 class MotionProcedure(Procedure[MazeEnvState, GoDirection]):
+    """
+    Goes straight in the requested direction until it reaches an intersection or
+    a wall. The runs are precomputed by the maze (see `Maze.travel`).
+    """
+
     NAME = "motion"
 
+    @property
+    def batch_key(self) -> Hashable:
+        # There's no state, requests of all environments can be batched.
+        return MotionProcedure
+
+    @staticmethod
+    def cache_key(state: MazeEnvState, action: GoDirection) -> Hashable:
+        """
+        The procedure only depends on the maze, the position and the direction (see
+        `hrl.procedure.CachedProcedure`).
+        """
+        return state.maze, state.position, action.direction
+
     def execute(self, state: MazeEnvState, action: GoDirection) -> MazeEnvState:
-        direction = action.direction
-        state = self._step(state, direction)
-        while not state.maze.is_intersection(
-            state.position
-        ) and state.maze.is_direction_walkable(state.position, direction):
-            state = self._step(state, direction)
-        return state
-
-    def _step(self, state: MazeEnvState, direction: Direction) -> MazeEnvState:
-        state = replace(
-            state, position=state.maze.next_position(state.position, direction)
-        )
-        return state
+        position, steps = state.maze.travel(state.position, action.direction)
+        assert steps > 0, f"The direction `{action.direction}` is not walkable."
+        return replace(state, position=position)
+
+    def execute_batch(
+        self, states: Sequence[MazeEnvState], actions: Sequence[GoDirection]
+    ) -> List[MazeEnvState]:
+        requests: Dict[int, List[int]] = {}
+        for index, state in enumerate(states):
+            requests.setdefault(id(state.maze), []).append(index)
+
+        new_states = list(states)
+        for indices in requests.values():
+            maze = states[indices[0]].maze
+            positions, steps = maze.travel_batch(
+                np.array([states[index].position for index in indices]),
+                np.array([actions[index].direction.value for index in indices]),
+            )
+            assert (steps > 0).all(), "Some of the directions are not walkable."
+            for index, position in zip(indices, positions.tolist()):
+                new_states[index] = replace(states[index], position=tuple(position))
+        return new_states
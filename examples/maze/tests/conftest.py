@@ -0,0 +1,35 @@
+from typing import Any, Callable, Dict, Optional
+
+import pytest
+from maze.agent.motion import MotionAgent
+from maze.agent.strategy import StrategyAgent
+from maze.env import MazeEnv
+from maze.env_config import DEFAULTS
+
+from hrl.agent import AgentName
+from hrl.env_options import EnvOptions
+
+AGENT_CONFIGS: Dict[AgentName, Any] = {
+    StrategyAgent.NAME: StrategyAgent.DEFAULTS | {"max_steps": 10},
+    MotionAgent.NAME: MotionAgent.DEFAULTS | {"max_steps": 5},
+}
+
+
+def _make_env(
+    index: int = 0,
+    agent_configs: Optional[Dict[AgentName, Any]] = None,
+    options: Optional[EnvOptions] = None,
+) -> MazeEnv:
+    # Defined at the module level, so it can be pickled as an env creator of
+    # subprocesses.
+    return MazeEnv(DEFAULTS | {}, agent_configs or AGENT_CONFIGS, options)
+
+
+@pytest.fixture
+def agent_configs() -> Dict[AgentName, Any]:
+    return {name: config | {} for name, config in AGENT_CONFIGS.items()}
+
+
+@pytest.fixture
+def make_env() -> Callable[..., MazeEnv]:
+    return _make_env
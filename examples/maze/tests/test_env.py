@@ -1,15 +1,21 @@
-from typing import Any, List, Optional
+import pickle
+from typing import Any, Dict, List, Optional, Set
 
+import numpy as np
 import pytest
+from maze.action import SetDirection
 from maze.agent.motion import MotionAgent
 from maze.agent.strategy import StrategyAgent
 from maze.env import MazeEnv
-from maze.env_config import DEFAULTS
+from maze.env_config import DEFAULTS, MAP_OBSERVATION_ID, MAP_OBSERVATION_WINDOW
 from maze.exceptions import DirectionNonWalkable
-from maze.maze import Direction
+from maze.generator import generate_map
+from maze.maze import Direction, Maze
 from ray.rllib.utils.typing import MultiAgentDict
 
-from hrl.env import HierarchicalEnv
+from hrl.action import intern_action
+from hrl.env import AUTOPILOT_STEPS, HierarchicalEnv
+from hrl.exceptions import UnknownAgentAction
 
 
 @pytest.fixture
@@ -44,6 +50,50 @@ def test_maze_env_strategy_raises_on_invalid_direction(env: MazeEnv) -> None:
         pass
 
 
+def test_maze_env_trusts_actions_in_trusted_mode(env: MazeEnv) -> None:
+    trusted_env = MazeEnv(
+        DEFAULTS | {}, dict(env._agent_configs), {"step_mode": "trusted"}
+    )
+    trusted_env.reset()
+    # The legality of the direction isn't checked.
+    _, _, done, _ = trusted_env.step({"strategy_0": Direction.RIGHT.value})
+    # The motion agent faces a wall, so it's done right away.
+    assert done["motion_0"]
+    assert not trusted_env._agents[MotionAgent.NAME].validate_actions
+
+
+def test_maze_env_steps_legal_actions_alike_in_both_modes(env: MazeEnv) -> None:
+    trusted_env = MazeEnv(
+        DEFAULTS | {}, dict(env._agent_configs), {"step_mode": "trusted"}
+    )
+    env.reset()
+    trusted_env.reset()
+    for action_dict in [
+        {"strategy_0": Direction.LEFT.value},
+        {"motion_0": 1},
+        {"strategy_0": Direction.DOWN.value},
+        {"motion_1": 1},
+    ]:
+        obs, reward, done, _ = env.step(action_dict)
+        trusted_obs, trusted_reward, trusted_done, _ = trusted_env.step(action_dict)
+        assert (trusted_reward, trusted_done) == (reward, done)
+        for agent_id, agent_obs in obs.items():
+            for key, value in agent_obs.items():
+                np.testing.assert_array_equal(trusted_obs[agent_id][key], value)
+
+
+def test_maze_env_decodes_interned_actions(env: MazeEnv) -> None:
+    env.reset()
+    env.step({"strategy_0": Direction.LEFT.value})
+    first_action = env._last_action
+    env.step({"motion_0": 1})
+    env.step({"strategy_0": np.int64(Direction.LEFT.value)})
+    assert env._last_action is first_action
+    assert env._last_action is intern_action(SetDirection(Direction.LEFT))
+    with pytest.raises(UnknownAgentAction):
+        env.step({"motion_1": 2})
+
+
 def test_maze_env_motion_directions_mask(env: MazeEnv) -> None:
     env.reset()
     obs, _, _, _ = env.step({"strategy_0": Direction.UP.value})
@@ -94,6 +144,173 @@ def test_maze_env_motion_times_out(env: MazeEnv) -> None:
     assert done["motion_2"]
 
 
+def test_maze_env_translates_each_state_once(
+    env: MazeEnv, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    translated = []
+
+    def translate_state(self: StrategyAgent, state: Any) -> Any:
+        translated.append(state)
+        return state
+
+    monkeypatch.setattr(StrategyAgent, "translate_state", translate_state)
+    env.reset()
+    env.step({"strategy_0": Direction.LEFT.value})
+    env.step({"motion_0": 1})
+    env.step({"strategy_0": Direction.DOWN.value})
+    assert len(translated) == len({id(state) for state in translated}) == 3
+
+
+def test_maze_env_profiles_callbacks() -> None:
+    env = MazeEnv(
+        DEFAULTS | {},
+        {
+            StrategyAgent.NAME: StrategyAgent.DEFAULTS,
+            MotionAgent.NAME: MotionAgent.DEFAULTS,
+        },
+        {"profile": True},
+    )
+    env.reset()
+    env.step({"strategy_0": Direction.LEFT.value})
+    env.step({"motion_0": 1})
+
+    stats = env.stats()
+    assert stats["agents"]["strategy"]["decode_action"].calls == 1
+    assert stats["agents"]["motion"]["decode_action"].calls == 1
+    assert stats["env"]["MazeEnv"]["env_step"].calls == 1
+    assert stats["env"]["MazeEnv"]["env_step"].total_time > 0.0
+
+    env.reset_stats()
+    assert env.stats()["env"]["MazeEnv"]["env_step"].calls == 0
+
+
+def test_maze_env_has_no_stats_without_profiling(env: MazeEnv) -> None:
+    env.reset()
+    env.step({"strategy_0": Direction.LEFT.value})
+    assert env.stats() == {}
+
+
+def test_maze_env_fills_observation_buffers(env: MazeEnv) -> None:
+    buffered_env = MazeEnv(
+        DEFAULTS | {}, dict(env._agent_configs), {"observation_buffers": True}
+    )
+    buffered_obs = buffered_env.reset()
+    obs = env.reset()
+    buffers = set()
+    for action_dict in [
+        {"strategy_0": Direction.LEFT.value},
+        {"motion_0": 1},
+        {"strategy_0": Direction.DOWN.value},
+        {"motion_1": 1},
+    ]:
+        for agent_id, agent_obs in obs.items():
+            name = env._agent_name(agent_id)
+            space = env._agents[name].observation_space(
+                env._agent_configs[name], env._config
+            )
+            for key, value in agent_obs.items():
+                assert np.array_equal(buffered_obs[agent_id][key], value)
+                assert buffered_obs[agent_id][key].dtype == value.dtype
+                assert value.dtype == space[key].dtype
+            buffers.add(id(buffered_obs[agent_id]))
+        buffered_obs, *_ = buffered_env.step(action_dict)
+        obs, *_ = env.step(action_dict)
+    # Two buffers per agent.
+    assert len(buffers) == 4
+
+
+def test_maze_env_computes_info_lazily(
+    env: MazeEnv, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    calls = []
+
+    def info(self: StrategyAgent, *args: Any) -> Dict[str, Any]:
+        calls.append(args)
+        return {"calls": len(calls)}
+
+    monkeypatch.setattr(StrategyAgent, "info", info)
+    env = MazeEnv(DEFAULTS | {}, env._agent_configs, {"lazy_info": True})
+    env.reset()
+    env.step({"strategy_0": Direction.LEFT.value})
+    _, _, _, info = env.step({"motion_0": 1})
+    assert set(info) == {"motion_0", "strategy_0", "__common__"}
+    assert calls == []
+    assert info["strategy_0"]["calls"] == 1
+    assert dict(info["strategy_0"]) == {"calls": 1}
+    assert pickle.loads(pickle.dumps(info)) == {
+        "motion_0": {},
+        "strategy_0": {"calls": 1},
+        "__common__": {},
+    }
+    assert len(calls) == 1
+
+
+def test_maze_env_computes_info_during_step_by_default(
+    env: MazeEnv, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def info(self: StrategyAgent, *args: Any) -> Dict[str, Any]:
+        # Reads the mutable state of the agent.
+        return {"elapsed_steps": self._elapsed_steps}
+
+    monkeypatch.setattr(StrategyAgent, "info", info)
+    env.reset()
+    env.step({"strategy_0": Direction.LEFT.value})
+    _, _, _, first_info = env.step({"motion_0": 1})
+    env.step({"strategy_0": Direction.DOWN.value})
+    assert env._agents[StrategyAgent.NAME]._elapsed_steps == 2
+    assert type(first_info["strategy_0"]) is dict
+    assert first_info["strategy_0"] == {"elapsed_steps": 1}
+
+
+@pytest.mark.parametrize(
+    "mode,keys",
+    [("none", set()), ("agents", {"motion_0"}), ("full", {"motion_0", "__common__"})],
+)
+def test_maze_env_info_modes(mode: str, keys: Set[str]) -> None:
+    env = MazeEnv(
+        DEFAULTS | {},
+        {
+            StrategyAgent.NAME: StrategyAgent.DEFAULTS,
+            MotionAgent.NAME: MotionAgent.DEFAULTS,
+        },
+        {"info": mode},  # type: ignore
+    )
+    env.reset()
+    _, _, _, info = env.step({"strategy_0": Direction.LEFT.value})
+    assert set(info) == keys
+
+
+def test_maze_env_restores_snapshot(env: MazeEnv) -> None:
+    env.reset()
+    env.step({"strategy_0": Direction.LEFT.value})
+    env.step({"motion_0": 1})
+    snapshot = env.get_snapshot()
+
+    branch = [{"strategy_0": Direction.DOWN.value}, {"motion_1": 1}, {"motion_1": 1}]
+
+    def play_branch() -> List[Any]:
+        results = []
+        for action_dict in branch:
+            obs, reward, done, _ = env.step(action_dict)
+            positions = {key: list(value["position"]) for key, value in obs.items()}
+            results.append((positions, reward, done))
+        return results
+
+    expected = play_branch()
+
+    env.restore_snapshot(snapshot)
+    env.step({"strategy_0": Direction.LEFT.value})
+    _, _, done, _ = env.step({"motion_1": 1})
+    # Hit a wall.
+    assert done["motion_1"]
+    assert env._current_agent_id == "strategy_0"
+
+    # The same snapshot can be restored many times.
+    env.restore_snapshot(snapshot)
+    assert play_branch() == expected
+    assert env._agents[MotionAgent.NAME]._elapsed_steps == 2
+
+
 def test_maze_env_on_successful_path(env: MazeEnv) -> None:
     obs = env.reset()
     assert_agent("strategy_0", env, obs)
@@ -227,3 +444,146 @@ def assert_agents(
             assert agent in info
             assert "__common__" in info
             assert isinstance(info[agent], dict)
+
+
+def test_maze_env_uses_the_map_from_config(env: MazeEnv) -> None:
+    map = generate_map(15, 21, seed=0)
+    agent_configs = env._agent_configs
+    custom_env = MazeEnv(DEFAULTS | {"map": map.tolist()}, agent_configs)
+    obs = custom_env.reset()
+    assert obs["strategy_0"]["map"].tolist() == map.tolist()
+    assert tuple(obs["strategy_0"]["position"]) == Maze(map).start
+
+    # Environments with equal maps share the maze.
+    other_env = MazeEnv(DEFAULTS | {"map": map}, agent_configs)
+    assert other_env._maze is custom_env._maze
+    assert env._maze is not custom_env._maze
+
+
+@pytest.mark.parametrize("observation_buffers", [False, True])
+def test_maze_env_observes_map_id(env: MazeEnv, observation_buffers: bool) -> None:
+    id_env = MazeEnv(
+        DEFAULTS | {"map_observation": MAP_OBSERVATION_ID, "map_id": 3},
+        env._agent_configs,
+        {"observation_buffers": observation_buffers},
+    )
+    obs = id_env.reset()
+    assert set(obs["strategy_0"]) == {"map_id", "position", "directions_mask"}
+    assert obs["strategy_0"]["map_id"].tolist() == [3.0]
+    obs, _, _, _ = id_env.step({"strategy_0": Direction.LEFT.value})
+    assert set(obs["motion_0"]) == {"map_id", "position", "directions_mask"}
+    assert obs["motion_0"] in id_env.observation_space
+
+
+def test_maze_env_observes_window(env: MazeEnv) -> None:
+    config = DEFAULTS | {
+        "map_observation": MAP_OBSERVATION_WINDOW,
+        "window_radius": 2,
+        "context_size": 2,
+    }
+    window_env = MazeEnv(config, env._agent_configs)
+    buffered_env = MazeEnv(config, env._agent_configs, {"observation_buffers": True})
+    actions = [
+        {"strategy_0": Direction.LEFT.value},
+        {"motion_0": 1},
+        {"strategy_0": Direction.DOWN.value},
+        {"motion_1": 1},
+    ]
+    obs = window_env.reset()
+    buffered_obs = buffered_env.reset()
+    for action_dict in [None, *actions]:
+        if action_dict is not None:
+            obs, _, _, _ = window_env.step(action_dict)
+            buffered_obs, _, _, _ = buffered_env.step(action_dict)
+        for agent_id, agent_obs in obs.items():
+            assert set(agent_obs) == {
+                "window",
+                "context",
+                "position",
+                "directions_mask",
+            }
+            row, col = agent_obs["position"].astype(int)
+            assert agent_obs["window"].shape == (5, 5)
+            assert agent_obs["window"][2, 2] != 0
+            assert agent_obs["window"].tolist() == (
+                window_env._maze.window((row, col), 2).tolist()
+            )
+            for key, value in agent_obs.items():
+                np.testing.assert_array_equal(buffered_obs[agent_id][key], value)
+
+
+def _first_legal_action(agent_obs: Dict[str, Any]) -> int:
+    return int(np.argmax(agent_obs["directions_mask"]))
+
+
+def _autopilot_results(env: MazeEnv, discount: float) -> List[Any]:
+    # Plays an episode with the first legal actions and merges the results of the
+    # steps with a single legal action, as the autopilot should.
+    results = []
+    obs = env.reset()
+    returned: Set[str] = set(obs)
+    rewards: Dict[str, float] = {}
+    steps: Dict[str, int] = {}
+    done = {"__all__": False}
+    while True:
+        agent_id = env._current_agent_id
+        if not done["__all__"] and obs[agent_id]["directions_mask"].sum() == 1:
+            returned.discard(agent_id)
+            steps[agent_id] = steps.get(agent_id, 0) + 1
+        else:
+            results.append(
+                (
+                    {key: rewards.pop(key, 0.0) for key in sorted(returned)},
+                    {key: steps.pop(key, 0) for key in sorted(returned)},
+                    done["__all__"],
+                )
+            )
+            if done["__all__"]:
+                return results[1:]
+            returned = set()
+        obs, reward, done, _ = env.step({agent_id: _first_legal_action(obs[agent_id])})
+        returned.update(obs)
+        for key, value in reward.items():
+            rewards[key] = rewards.get(key, 0.0) + discount ** steps.get(key, 0) * value
+
+
+@pytest.mark.parametrize("discount", [1.0, 0.5])
+def test_maze_env_autopilot_skips_single_choices(env: MazeEnv, discount: float) -> None:
+    autopilot_env = MazeEnv(
+        DEFAULTS | {},
+        env._agent_configs,
+        {"autopilot": True, "autopilot_discount": discount},
+    )
+    expected = _autopilot_results(env, discount)
+
+    results = []
+    obs = autopilot_env.reset()
+    done = {"__all__": False}
+    while not done["__all__"]:
+        agent_id = autopilot_env._current_agent_id
+        # The policy is only asked at decision points.
+        assert obs[agent_id]["directions_mask"].sum() > 1
+        obs, reward, done, info = autopilot_env.step(
+            {agent_id: _first_legal_action(obs[agent_id])}
+        )
+        assert reward.keys() == obs.keys()
+        # RLlib only accepts the agent ids and "__common__" as the keys of infos.
+        assert info.keys() == obs.keys() | {"__common__"}
+        results.append(
+            (
+                {key: reward[key] for key in sorted(reward)},
+                {key: info[key][AUTOPILOT_STEPS] for key in sorted(obs)},
+                done["__all__"],
+            )
+        )
+
+    assert len(results) == len(expected)
+    assert sum(sum(steps.values()) for _, steps, _ in expected) > 0
+    for (rewards, steps, done), (
+        expected_rewards,
+        expected_steps,
+        expected_done,
+    ) in zip(results, expected):
+        assert rewards == pytest.approx(expected_rewards)
+        assert steps == expected_steps
+        assert done == expected_done
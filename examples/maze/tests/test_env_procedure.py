@@ -1,15 +1,21 @@
 from typing import Any, List, Optional
 
+import numpy as np
 import pytest
 from maze.agent.motion import MotionAgent
 from maze.agent.strategy import StrategyAgent
 from maze.env import MazeEnv
 from maze.env_config import DEFAULTS
-from maze.maze import Direction
+from maze.maze import Direction, Maze
+from maze_procedure.action import GoDirection
 from maze_procedure.env import MazeProcedureEnv
+from maze_procedure.env_state import MazeEnvState
+from maze_procedure.procedure.motion import MotionProcedure
 from ray.rllib.utils.typing import MultiAgentDict
 
 from hrl.env import HierarchicalEnv
+from hrl.procedure import CachedProcedure
+from hrl.vector_env import VectorHierarchicalEnv
 
 
 @pytest.fixture
@@ -30,6 +36,140 @@ def env() -> MazeProcedureEnv:
     )
 
 
+def test_env_doesnt_build_maze_graph(env: MazeProcedureEnv) -> None:
+    env.reset()
+    env.step({"strategy_0": Direction.LEFT.value})
+    # The graph is built only when it's accessed (see `Maze.graph`).
+    assert "graph" not in vars(env._maze)
+
+
+def test_env_fills_observation_buffers_with_space_dtypes(
+    env: MazeProcedureEnv,
+) -> None:
+    buffered_env = MazeProcedureEnv(
+        env._config, env._agent_configs, {"observation_buffers": True}
+    )
+    obs = env.reset()
+    buffered_obs = buffered_env.reset()
+    for action_dict in [
+        None,
+        {"strategy_0": Direction.LEFT.value},
+        {"strategy_0": Direction.DOWN.value},
+    ]:
+        if action_dict is not None:
+            obs, *_ = env.step(action_dict)
+            buffered_obs, *_ = buffered_env.step(action_dict)
+        for agent_id, agent_obs in obs.items():
+            name = env._agent_name(agent_id)
+            space = env._agents[name].observation_space(
+                env._agent_configs[name], env._config
+            )
+            for key, value in agent_obs.items():
+                assert np.array_equal(buffered_obs[agent_id][key], value)
+                assert buffered_obs[agent_id][key].dtype == value.dtype
+                assert value.dtype == space[key].dtype
+
+
+def test_motion_procedure_executes_batch_like_single_requests() -> None:
+    maze = Maze()
+    procedure = MotionProcedure()
+    states, actions, expected = [], [], []
+    for row in range(maze.rows):
+        for col in range(maze.cols):
+            if not maze._is_walkable((row, col)):
+                continue
+            for direction in maze.walkable_directions((row, col)):
+                states.append(MazeEnvState(maze, (row, col)))
+                actions.append(GoDirection(direction))
+                # Walk tile by tile.
+                position = maze.next_position((row, col), direction)
+                while not maze.is_intersection(position) and maze.is_direction_walkable(
+                    position, direction
+                ):
+                    position = maze.next_position(position, direction)
+                expected.append(MazeEnvState(maze, position))
+    assert [
+        procedure.execute(state, action) for state, action in zip(states, actions)
+    ] == expected
+    assert procedure.execute_batch(states, actions) == expected
+
+
+def test_cached_procedure_memoizes_results() -> None:
+    maze = Maze()
+    procedure = CachedProcedure(MotionProcedure(), MotionProcedure.cache_key, 2)
+    left = MazeEnvState(maze, (4, 9)), GoDirection(Direction.LEFT)
+    down = MazeEnvState(maze, (4, 8)), GoDirection(Direction.DOWN)
+    right = MazeEnvState(maze, (4, 8)), GoDirection(Direction.RIGHT)
+
+    new_state = procedure.execute(*left)
+    assert new_state == MotionProcedure().execute(*left)
+    assert procedure.execute(*left) is new_state
+    assert (procedure.stats.hits, procedure.stats.misses) == (1, 1)
+
+    procedure.execute(*down)
+    procedure.execute(*right)
+    # The least recently used result was evicted.
+    assert len(procedure) == 2
+    procedure.execute(*left)
+    assert (procedure.stats.hits, procedure.stats.misses) == (1, 4)
+
+    states, actions = zip(left, down, left)
+    assert procedure.execute_batch(states, actions) == [
+        MotionProcedure().execute(state, action)
+        for state, action in zip(states, actions)
+    ]
+    assert (procedure.stats.hits, procedure.stats.misses) == (3, 5)
+
+
+def test_maze_env_with_procedure_cache_matches_uncached(env: MazeProcedureEnv) -> None:
+    cached_env = MazeProcedureEnv(
+        env._config | {"procedure_cache_size": 16}, env._agent_configs
+    )
+    procedure = cached_env.procedures[MotionProcedure.NAME]
+    assert isinstance(procedure, CachedProcedure)
+    for _ in range(2):
+        env.reset()
+        cached_env.reset()
+        for direction in [Direction.LEFT, Direction.DOWN, Direction.LEFT]:
+            action_dict = {"strategy_0": direction.value}
+            obs, reward, done, _ = env.step(action_dict)
+            cached_obs, cached_reward, cached_done, _ = cached_env.step(action_dict)
+            assert cached_obs["strategy_0"]["position"].tolist() == (
+                obs["strategy_0"]["position"].tolist()
+            )
+            assert (cached_reward, cached_done) == (reward, done)
+    assert (procedure.stats.hits, procedure.stats.misses) == (3, 3)
+
+
+def test_vector_env_batches_procedure_requests(
+    env: MazeProcedureEnv, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    batches = []
+    execute_batch = MotionProcedure.execute_batch
+
+    def counting_execute_batch(self: MotionProcedure, *args: Any) -> Any:
+        batches.append(len(args[0]))
+        return execute_batch(self, *args)
+
+    monkeypatch.setattr(MotionProcedure, "execute_batch", counting_execute_batch)
+    vector_env = VectorHierarchicalEnv(
+        lambda _: MazeProcedureEnv(env._config, env._agent_configs), 3
+    )
+    vector_env.vector_reset()
+    env.reset()
+    for direction in [Direction.LEFT, Direction.DOWN, Direction.LEFT]:
+        action_dict = {"strategy_0": direction.value}
+        obs, reward, done, _ = env.step(action_dict)
+        results = vector_env.vector_step([action_dict] * 3)
+        for index in range(3):
+            assert results[0][index]["strategy_0"]["position"].tolist() == (
+                obs["strategy_0"]["position"].tolist()
+            )
+            assert results[1][index] == reward
+            assert results[2][index] == done
+    assert batches == [3, 3, 3]
+
+
 def test_maze_env_on_successful_path(env: MazeEnv) -> None:
     obs = env.reset()
     assert_agent("strategy_0", env, obs)
@@ -126,3 +266,33 @@ def assert_agents(
             assert agent in info
             assert "__common__" in info
             assert isinstance(info[agent], dict)
+
+
+def test_vector_env_keeps_procedure_caches_per_environment(
+    env: MazeProcedureEnv,
+) -> None:
+    vector_env = VectorHierarchicalEnv(
+        lambda index: MazeProcedureEnv(
+            env._config | {"procedure_cache_size": 16 if index < 2 else 0},
+            env._agent_configs,
+        ),
+        4,
+    )
+    vector_env.vector_reset()
+    env.reset()
+    for direction in [Direction.LEFT, Direction.DOWN, Direction.LEFT]:
+        action_dict = {"strategy_0": direction.value}
+        obs, reward, _, _ = env.step(action_dict)
+        results = vector_env.vector_step([action_dict] * 4)
+        for index in range(4):
+            assert results[0][index]["strategy_0"]["position"].tolist() == (
+                obs["strategy_0"]["position"].tolist()
+            )
+            assert results[1][index] == reward
+
+    # Each cached environment executed its own requests with its own cache.
+    for sub_env in vector_env.get_sub_environments()[:2]:
+        procedure = sub_env.procedures[MotionProcedure.NAME]
+        assert isinstance(procedure, CachedProcedure)
+        assert (procedure.stats.hits, procedure.stats.misses) == (0, 3)
+        assert len(procedure) == 3
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+from maze.agent.motion import MotionAgent
+from maze.agent.strategy import StrategyAgent
+from maze.env import MazeEnv
+from maze.env_config import (
+    DEFAULTS,
+    MAP_OBSERVATION_FULL,
+    MAP_OBSERVATION_ID,
+    MAP_OBSERVATION_WINDOW,
+)
+from maze.export import export_policy, pack_observations
+from maze.maze import DEFAULT_MAP, Direction
+from maze.model import MazeModel
+
+
+@pytest.mark.parametrize(
+    "map_observation",
+    [MAP_OBSERVATION_FULL, MAP_OBSERVATION_ID, MAP_OBSERVATION_WINDOW],
+)
+def test_exported_policy_matches_model(map_observation: str, tmp_path: Path) -> None:
+    env_config = DEFAULTS | {"map_observation": map_observation}
+    agent_config = StrategyAgent.DEFAULTS
+    torch.manual_seed(0)
+    model = MazeModel(
+        StrategyAgent.observation_space(agent_config, env_config),
+        StrategyAgent.action_space(agent_config, env_config),
+        len(Direction),
+        {},
+        "model",
+        map=DEFAULT_MAP,
+        num_actions=len(Direction),
+    )
+    path = str(tmp_path / "policy.pt")
+    export_policy(model, path)
+    policy = torch.jit.load(path)
+
+    env = MazeEnv(
+        env_config,
+        {StrategyAgent.NAME: agent_config, MotionAgent.NAME: MotionAgent.DEFAULTS},
+    )
+    obs = env.reset()["strategy_0"]
+    batch = {key: np.stack([value, value]) for key, value in obs.items()}
+    batch["position"][1] = (1, 7)
+    batch["directions_mask"][1] = (0, 1, 0, 1)
+
+    with torch.no_grad():
+        expected, _ = model(
+            {"obs": {key: torch.tensor(value) for key, value in batch.items()}},
+            [],
+            None,
+        )
+        logits = policy(*pack_observations(batch))
+    assert torch.allclose(logits, expected)
+    assert logits[1, Direction.UP.value] < -1e38
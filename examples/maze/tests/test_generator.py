@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from maze.generator import generate_map, generate_maze
+from maze.maze import GOAL, START, WALL
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_generated_map_has_one_start_and_goal(seed: int) -> None:
+    map = generate_map(31, 17, seed=seed)
+    assert (map == START).sum() == 1
+    assert (map == GOAL).sum() == 1
+
+
+def test_generated_map_is_deterministic_for_a_seed() -> None:
+    assert np.array_equal(generate_map(50, 50, seed=1), generate_map(50, 50, seed=1))
+    assert not np.array_equal(
+        generate_map(50, 50, seed=1), generate_map(50, 50, seed=2)
+    )
+
+
+@pytest.mark.parametrize("loops", [0.0, 0.3])
+def test_generated_maze_is_connected(loops: float) -> None:
+    maze = generate_maze(41, 37, seed=0, loops=loops)
+    reached = {maze.start}
+    queue = [maze.start]
+    for position in queue:
+        for direction in maze.walkable_directions(position):
+            next_position = maze.next_position(position, direction)
+            if next_position not in reached:
+                reached.add(next_position)
+                queue.append(next_position)
+    assert maze.goal in reached
+    assert len(reached) == (maze.map != WALL).sum()
+
+
+def test_generated_map_follows_density_and_loops() -> None:
+    sparse = generate_map(200, 200, seed=0, density=0.25)
+    dense = generate_map(200, 200, seed=0, density=0.5)
+    assert (sparse != WALL).mean() == pytest.approx(0.25, abs=0.02)
+    assert (dense != WALL).mean() == pytest.approx(0.5, abs=0.02)
+    assert (
+        generate_maze(200, 200, seed=0, loops=0.5)._intersections.sum()
+        > generate_maze(200, 200, seed=0)._intersections.sum()
+    )
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("intersections", [100, 200, 300])
+def test_generated_map_has_requested_intersections(
+    seed: int, intersections: int
+) -> None:
+    maze = generate_maze(41, 37, seed=seed, intersections=intersections)
+    walkable = maze.map != WALL
+    assert (maze._intersections & walkable).sum() == intersections
+    assert (maze.map == START).sum() == 1
+    assert (maze.map == GOAL).sum() == 1
+
+
+def test_generated_map_rejects_unreachable_intersections() -> None:
+    with pytest.raises(AssertionError, match="at least"):
+        generate_map(41, 37, seed=0, intersections=10)
+    with pytest.raises(AssertionError, match="at most"):
+        generate_map(41, 37, seed=0, intersections=1000)
@@ -1,5 +1,6 @@
+import numpy as np
 import pytest
-from maze.maze import Direction, Maze, Position
+from maze.maze import CORRIDOR, GOAL, START, Corridor, Direction, Maze, Position
 
 
 @pytest.fixture
@@ -87,8 +88,139 @@ def test_maze_next_tile(maze: Maze) -> None:
     assert maze.next_position((1, 3), Direction.RIGHT) == (1, 4)
 
 
+def test_maze_does_not_wrap_around_edges() -> None:
+    maze = Maze([[START, CORRIDOR, GOAL]])
+    assert maze.walkable_directions((0, 0)) == {Direction.RIGHT}
+    assert maze.walkable_directions((0, 2)) == {Direction.LEFT}
+    assert not maze.is_direction_walkable((0, 0), Direction.LEFT)
+    assert maze.is_walkable_batch(np.array([(0, -1), (0, 3), (-5, 0)])).tolist() == [
+        False,
+        False,
+        False,
+    ]
+
+
 def test_direction_opposite() -> None:
     assert Direction.opposite(Direction.LEFT) == Direction.RIGHT
     assert Direction.opposite(Direction.RIGHT) == Direction.LEFT
     assert Direction.opposite(Direction.UP) == Direction.DOWN
     assert Direction.opposite(Direction.DOWN) == Direction.UP
+
+
+def test_maze_vectorized_queries_match_scalar_ones(maze: Maze) -> None:
+    positions = [
+        (row, col)
+        for row in range(-1, maze.rows + 1)
+        for col in range(-1, maze.cols + 1)
+    ]
+    array = np.array(positions)
+    assert maze.is_walkable_batch(array).tolist() == [
+        maze._is_walkable(position) for position in positions
+    ]
+    walkable = [position for position in positions if maze._is_walkable(position)]
+    assert maze.is_intersection_batch(np.array(walkable)).tolist() == [
+        maze.is_intersection(position) for position in walkable
+    ]
+
+
+@pytest.mark.parametrize(
+    "position,direction,end,steps",
+    [
+        ((4, 9), Direction.LEFT, (4, 8), 1),
+        ((4, 8), Direction.DOWN, (6, 8), 2),
+        ((6, 8), Direction.LEFT, (6, 5), 3),
+        ((1, 5), Direction.RIGHT, (1, 8), 3),
+        ((3, 2), Direction.UP, (2, 2), 1),
+        ((4, 9), Direction.RIGHT, (4, 9), 0),
+    ],
+)
+def test_maze_travel(
+    maze: Maze, position: Position, direction: Direction, end: Position, steps: int
+) -> None:
+    assert maze.travel(position, direction) == (end, steps)
+
+
+def test_maze_graph_follows_bending_corridors(maze: Maze) -> None:
+    graph = maze.graph
+    assert (4, 9) in graph.nodes and (0, 4) in graph.nodes
+    # A dead end.
+    assert (3, 9) in graph.nodes
+    # Tiles within corridors aren't nodes.
+    assert (9, 1) in graph.nodes and (7, 1) not in graph.nodes
+    assert graph.corridor((4, 9), Direction.UP) == Corridor((3, 9), 1, Direction.UP)
+    assert graph.corridor((4, 9), Direction.RIGHT) is None
+    assert graph.corridor((2, 1), Direction.RIGHT) == Corridor(
+        (2, 2), 1, Direction.RIGHT
+    )
+
+
+def test_maze_graph_distances_match_breadth_first_search(maze: Maze) -> None:
+    start = tuple(int(value) for value in maze.start)
+    distances = {start: 0}
+    queue = [start]
+    for position in queue:
+        for direction in maze.walkable_directions(position):
+            next_position = maze.next_position(position, direction)
+            if next_position not in distances:
+                distances[next_position] = distances[position] + 1
+                queue.append(next_position)
+    graph_distances = maze.graph.distances(start)
+    assert graph_distances == {
+        node: distance
+        for node, distance in distances.items()
+        if node in maze.graph.nodes
+    }
+
+
+def test_maze_direction_batch_queries_match_scalar_ones(maze: Maze) -> None:
+    positions = [(row, col) for row in range(maze.rows) for col in range(maze.cols)]
+    array = np.repeat(np.array(positions), len(Direction), axis=0)
+    directions = np.tile(np.arange(len(Direction)), len(positions))
+    walkable = maze.is_direction_walkable_batch(array, directions)
+    assert walkable.tolist() == [
+        maze.is_direction_walkable(position, direction)
+        for position in positions
+        for direction in Direction
+    ]
+    assert maze.directions_mask_batch(np.array(positions)).tolist() == [
+        maze.directions_mask(position).tolist() for position in positions
+    ]
+    assert [
+        tuple(position)
+        for position in maze.next_position_batch(
+            array[walkable], directions[walkable]
+        ).tolist()
+    ] == [
+        maze.next_position(tuple(position), Direction(direction))
+        for position, direction in zip(array[walkable], directions[walkable])
+    ]
+
+
+def test_maze_backward_forward_mask_matches_directions_mask(maze: Maze) -> None:
+    for row in range(maze.rows):
+        for col in range(maze.cols):
+            mask = maze.directions_mask((row, col))
+            for direction in Direction:
+                backward_forward = maze.backward_forward_mask((row, col), direction)
+                assert not backward_forward.flags.writeable
+                assert backward_forward.tolist() == [
+                    mask[Direction.opposite(direction).value],
+                    mask[direction.value],
+                ]
+
+
+def test_maze_window_is_padded_with_walls(maze: Maze) -> None:
+    window = maze.window((0, 4), 1)
+    assert window.tolist() == [[0, 0, 0], [0, 3, 0], [1, 1, 1]]
+    assert maze.window((9, 9), 2).shape == (5, 5)
+    assert not window.flags.writeable
+
+
+def test_maze_context_averages_walkable_tiles(maze: Maze) -> None:
+    context = maze.context(2)
+    walkable = (maze.map != 0).astype(np.float32)
+    assert context.tolist() == [
+        [walkable[:5, :5].mean(), walkable[:5, 5:].mean()],
+        [walkable[5:, :5].mean(), walkable[5:, 5:].mean()],
+    ]
+    assert maze.context(1).tolist() == [[walkable.mean()]]
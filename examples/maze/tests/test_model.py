@@ -0,0 +1,180 @@
+import numpy as np
+import torch
+from maze.agent.strategy import StrategyAgent
+from maze.env_config import DEFAULTS, MAP_OBSERVATION_WINDOW
+from maze.generator import generate_map
+from maze.maze import DEFAULT_MAP, Direction
+from maze.model import ConvMazeModel, MazeModel
+
+
+def _model(
+    config: dict, env_config: dict = DEFAULTS, model_cls: type = MazeModel
+) -> MazeModel:
+    torch.manual_seed(0)
+    agent_config = StrategyAgent.DEFAULTS
+    return model_cls(
+        StrategyAgent.observation_space(agent_config, env_config),
+        StrategyAgent.action_space(agent_config, env_config),
+        len(Direction),
+        {},
+        "model",
+        **config,
+    )
+
+
+def test_maze_model_looks_up_maps_by_id() -> None:
+    maps = [DEFAULT_MAP, generate_map(10, 10, seed=0).tolist()]
+    config = {"map": DEFAULT_MAP, "num_actions": len(Direction)}
+    full_model = _model(config)
+    id_model = _model(config | {"maps": maps})
+    position = torch.tensor([[4.0, 9.0], [1.0, 1.0]])
+    mask = torch.ones(2, len(Direction))
+    full_logits, _ = full_model(
+        {
+            "obs": {
+                "map": torch.tensor(np.array(maps), dtype=torch.float32),
+                "position": position,
+                "directions_mask": mask,
+            }
+        },
+        [],
+        None,
+    )
+    id_logits, _ = id_model(
+        {
+            "obs": {
+                "map_id": torch.tensor([[0.0], [1.0]]),
+                "position": position,
+                "directions_mask": mask,
+            }
+        },
+        [],
+        None,
+    )
+    assert torch.allclose(full_logits, id_logits)
+
+
+def test_maze_model_size_does_not_depend_on_map_in_window_mode() -> None:
+    config = {"num_actions": len(Direction)}
+    models = [
+        _model(
+            config,
+            DEFAULTS
+            | {
+                "map": generate_map(size, size, seed=0).tolist(),
+                "map_observation": MAP_OBSERVATION_WINDOW,
+                "window_radius": 3,
+                "context_size": 4,
+            },
+        )
+        for size in (10, 100)
+    ]
+    assert models[0].fc1.in_features == models[1].fc1.in_features == 7 * 7 + 16 + 2
+    logits, _ = models[1](
+        {
+            "obs": {
+                "window": torch.zeros(5, 7, 7),
+                "context": torch.zeros(5, 4, 4),
+                "position": torch.zeros(5, 2),
+                "directions_mask": torch.ones(5, len(Direction)),
+            }
+        },
+        [],
+        None,
+    )
+    assert logits.shape == (5, len(Direction))
+
+
+def _conv_obs(maps: list, positions: list) -> dict:
+    return {
+        "obs": {
+            "map": torch.tensor(np.array(maps), dtype=torch.float32),
+            "position": torch.tensor(positions, dtype=torch.float32),
+            "directions_mask": torch.ones(len(maps), len(Direction)),
+        }
+    }
+
+
+def test_conv_maze_model_encodes_unique_maps_once() -> None:
+    model = _model({"num_actions": len(Direction)}, model_cls=ConvMazeModel)
+    maps = [DEFAULT_MAP, generate_map(10, 10, seed=0).tolist()]
+    batch_maps = [maps[0], maps[1], maps[0], maps[0]]
+    positions = [[4, 9], [1, 1], [1, 2], [6, 0]]
+    calls = []
+    model.encoder.register_forward_hook(
+        lambda _, inputs, __: calls.append(len(inputs[0]))
+    )
+    logits, _ = model(_conv_obs(batch_maps, positions), [], None)
+    assert calls == [2]
+    for index in range(len(batch_maps)):
+        sample_logits, _ = model(
+            _conv_obs(batch_maps[index : index + 1], positions[index : index + 1]),
+            [],
+            None,
+        )
+        assert torch.allclose(logits[index], sample_logits[0], atol=1e-6)
+
+    # The same weights work for other sizes of maps.
+    large_map = generate_map(40, 30, seed=0).tolist()
+    logits, _ = model(_conv_obs([large_map] * 3, [[1, 1]] * 3), [], None)
+    assert logits.shape == (3, len(Direction))
+    assert calls[-1] == 1
+
+    id_model = _model(
+        {"num_actions": len(Direction), "maps": maps}, model_cls=ConvMazeModel
+    )
+    obs = _conv_obs(batch_maps, positions)["obs"]
+    del obs["map"]
+    obs["map_id"] = torch.tensor([[0.0], [1.0], [0.0], [0.0]])
+    id_logits, _ = id_model({"obs": obs}, [], None)
+    full_logits, _ = id_model(_conv_obs(batch_maps, positions), [], None)
+    assert torch.allclose(id_logits, full_logits)
+
+
+def test_conv_maze_model_looks_up_maps_of_different_sizes() -> None:
+    maps = [DEFAULT_MAP, generate_map(40, 30, seed=0).tolist()]
+    model = _model(
+        {"num_actions": len(Direction), "maps": maps}, model_cls=ConvMazeModel
+    )
+    positions = [[4, 9], [1, 1], [21, 3]]
+    map_ids = [0, 1, 1]
+    obs = {
+        "map_id": torch.tensor([[map_id] for map_id in map_ids], dtype=torch.float32),
+        "position": torch.tensor(positions, dtype=torch.float32),
+        "directions_mask": torch.ones(len(map_ids), len(Direction)),
+    }
+    logits, _ = model({"obs": obs}, [], None)
+    # Each map is encoded like when it's observed.
+    for index, map_id in enumerate(map_ids):
+        expected, _ = model(_conv_obs([maps[map_id]], [positions[index]]), [], None)
+        assert torch.allclose(logits[index], expected[0], atol=1e-6)
+
+
+def test_conv_maze_model_encodes_windows() -> None:
+    env_config = DEFAULTS | {
+        "map": generate_map(100, 100, seed=0).tolist(),
+        "map_observation": MAP_OBSERVATION_WINDOW,
+        "window_radius": 3,
+        "context_size": 4,
+    }
+    model = _model({"num_actions": len(Direction)}, env_config, model_cls=ConvMazeModel)
+    windows = torch.randint(0, 4, (5, 7, 7)).float()
+    windows[3] = windows[0]
+    calls = []
+    model.encoder.register_forward_hook(
+        lambda _, inputs, __: calls.append(len(inputs[0]))
+    )
+    logits, _ = model(
+        {
+            "obs": {
+                "window": windows,
+                "context": torch.rand(5, 4, 4),
+                "position": torch.full((5, 2), 50.0),
+                "directions_mask": torch.ones(5, len(Direction)),
+            }
+        },
+        [],
+        None,
+    )
+    assert logits.shape == (5, len(Direction))
+    assert calls == [4]
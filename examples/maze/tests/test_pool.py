@@ -0,0 +1,109 @@
+import multiprocessing as mp
+from functools import partial
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, Iterator, List
+
+import numpy as np
+import pytest
+from maze.agent.motion import MotionAgent
+from maze.env import MazeEnv
+from maze.env_config import DEFAULTS
+from maze.maze import Direction
+
+import hrl.pool
+from hrl.exceptions import EnvWorkerError
+from hrl.pool import SubprocessEnvPool
+
+
+def make_env_failing_at_1(index: int, make_env: Callable[..., MazeEnv]) -> MazeEnv:
+    if index == 1:
+        raise ValueError("Failed to create the environment.")
+    return make_env(index)
+
+
+@pytest.fixture
+def pool(make_env: Callable[..., MazeEnv]) -> Iterator[SubprocessEnvPool]:
+    with SubprocessEnvPool(make_env, num_envs=2) as pool:
+        yield pool
+
+
+def test_pool_matches_standalone_env(
+    pool: SubprocessEnvPool, make_env: Callable[..., MazeEnv]
+) -> None:
+    standalone = make_env()
+    expected_obs = standalone.reset()
+    obs = pool.vector_reset()
+    assert pool.current_agent_ids == ["strategy_0", "strategy_0"]
+
+    for action_dict in [
+        {"strategy_0": Direction.LEFT.value},
+        {"motion_0": 1},
+        {"strategy_0": Direction.DOWN.value},
+    ]:
+        for env_obs in obs:
+            assert env_obs.keys() == expected_obs.keys()
+            for agent_id, agent_obs in expected_obs.items():
+                for key, value in agent_obs.items():
+                    assert np.array_equal(env_obs[agent_id][key], value)
+
+        expected_obs, expected_reward, expected_done, _ = standalone.step(action_dict)
+        obs, rewards, dones, _ = pool.vector_step([action_dict] * pool.num_envs)
+        assert rewards == [expected_reward] * pool.num_envs
+        assert dones == [expected_done] * pool.num_envs
+
+
+def test_pool_returns_observations_in_observation_space(
+    pool: SubprocessEnvPool, agent_configs: Dict[str, Any]
+) -> None:
+    pool.vector_reset()
+    obs, _, _, _ = pool.vector_step([{"strategy_0": Direction.LEFT.value}] * 2)
+    space = MotionAgent.observation_space(agent_configs[MotionAgent.NAME], DEFAULTS)
+    assert space.contains(obs[0]["motion_0"])
+
+
+def test_pool_raises_worker_errors(pool: SubprocessEnvPool) -> None:
+    pool.vector_reset()
+    with pytest.raises(EnvWorkerError):
+        pool.vector_step([{"strategy_0": Direction.RIGHT.value}] * 2)
+
+
+def test_pool_stays_in_sync_after_worker_error(pool: SubprocessEnvPool) -> None:
+    pool.vector_reset()
+    with pytest.raises(EnvWorkerError) as error:
+        pool.vector_step(
+            [
+                {"strategy_0": Direction.RIGHT.value},
+                {"strategy_0": Direction.LEFT.value},
+            ]
+        )
+    assert "worker 0 " in str(error.value)
+
+    # The reply of the healthy worker to the step has been received, so it isn't
+    # mistaken for the reply to the reset.
+    obs = pool.reset_at(1)
+    assert obs.keys() == {"strategy_0"}
+    assert pool.current_agent_ids[1] == "strategy_0"
+    with pytest.raises(EnvWorkerError):
+        pool.reset_at(0)
+
+
+def test_pool_cleans_up_after_failed_start(
+    monkeypatch: pytest.MonkeyPatch, make_env: Callable[..., MazeEnv]
+) -> None:
+    created: List[str] = []
+
+    class RecordingSharedMemory(SharedMemory):
+        def __init__(self, *args: Any, **kwargs: Any):
+            super().__init__(*args, **kwargs)
+            if kwargs.get("create"):
+                created.append(self.name)
+
+    monkeypatch.setattr(hrl.pool, "SharedMemory", RecordingSharedMemory)
+    with pytest.raises(EnvWorkerError):
+        SubprocessEnvPool(partial(make_env_failing_at_1, make_env=make_env), num_envs=3)
+
+    assert created
+    for name in created:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
+    assert not mp.active_children()
@@ -0,0 +1,132 @@
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+import numpy as np
+import pytest
+from maze.agent.motion import MotionAgent
+from maze.env import MazeEnv
+from maze.env_config import DEFAULTS
+from maze.maze import Direction
+from maze_procedure.env import MazeProcedureEnv
+
+from hrl.recording import (
+    AGENT_DONE,
+    AGENT_SWITCH,
+    EPISODE_DONE,
+    NO_PROCEDURE,
+    PROCEDURE_CALL,
+    EpisodeRecorder,
+    EpisodeReplayer,
+)
+
+EPISODES = [
+    [
+        {"strategy_0": Direction.LEFT.value},
+        {"motion_0": 1},
+        {"strategy_0": Direction.DOWN.value},
+        {"motion_1": 1},
+    ],
+    [
+        {"strategy_0": Direction.UP.value},
+        {"motion_0": 1},
+    ],
+    [
+        {"strategy_0": Direction.LEFT.value},
+    ],
+]
+
+
+def record(env: MazeEnv, path: Path, steps_per_shard: int = 1_000_000) -> None:
+    with EpisodeRecorder(env, str(path), steps_per_shard, buffer_size=2) as recorder:
+        for actions in EPISODES:
+            recorder.reset()
+            for action_dict in actions:
+                recorder.step(action_dict)
+
+
+@pytest.mark.parametrize("steps_per_shard", [1, 1_000_000])
+def test_replayer_reads_recorded_episodes(
+    tmp_path: Path, steps_per_shard: int, make_env: Callable[..., MazeEnv]
+) -> None:
+    record(make_env(), tmp_path, steps_per_shard)
+    replayer = EpisodeReplayer(str(tmp_path))
+    assert replayer.num_episodes == len(EPISODES)
+
+    episode = replayer.episode(0)
+    assert [replayer.agents[code] for code in episode["agent"]] == [
+        "strategy",
+        "motion",
+        "strategy",
+        "motion",
+    ]
+    assert episode["agent_index"].tolist() == [0, 0, 0, 1]
+    assert episode["action"].tolist() == [Direction.LEFT.value, 1, 2, 1]
+    assert episode["flags"][0] == AGENT_SWITCH
+    assert episode["flags"][1] == AGENT_DONE
+    assert episode["reward"][1] == MotionAgent.DEFAULTS["reward_for_right_direction"]
+    assert episode["next_reward"][1] == 0.0
+    assert np.isnan(episode["reward"][0])
+    assert episode["next_reward"][0] == pytest.approx(
+        MotionAgent.DEFAULTS["reward_for_wrong_direction"]
+    )
+
+    assert len(replayer.episode(2)["agent"]) == 1
+
+
+def test_replayer_replays_episode(
+    tmp_path: Path, make_env: Callable[..., MazeEnv]
+) -> None:
+    record(make_env(), tmp_path, steps_per_shard=1)
+    replayer = EpisodeReplayer(str(tmp_path))
+    env = make_env()
+
+    expected_env = make_env()
+    expected_env.reset()
+    for result, action_dict in zip(replayer.replay(env, 1), EPISODES[1]):
+        _, expected_reward, expected_done, _ = expected_env.step(action_dict)
+        _, reward, done, _ = result
+        assert reward == expected_reward
+        assert done == expected_done
+
+
+def test_recorder_records_procedure_calls(
+    tmp_path: Path, agent_configs: Dict[str, Any]
+) -> None:
+    env = MazeProcedureEnv(DEFAULTS | {}, agent_configs)
+    with EpisodeRecorder(env, str(tmp_path)) as recorder:
+        recorder.reset()
+        recorder.step({"strategy_0": Direction.LEFT.value})
+
+    replayer = EpisodeReplayer(str(tmp_path))
+    episode = replayer.episode(0)
+    assert episode["flags"][0] & PROCEDURE_CALL
+    assert not episode["flags"][0] & EPISODE_DONE
+    assert replayer.procedures[episode["procedure"][0]] == "motion"
+    assert episode["procedure"][0] != NO_PROCEDURE
+
+
+def test_recorder_records_decisions_with_autopilot(
+    tmp_path: Path, make_env: Callable[..., MazeEnv]
+) -> None:
+    options = {"autopilot": True, "autopilot_discount": 0.9}
+    env = make_env(options=options)
+    with EpisodeRecorder(env, str(tmp_path)) as recorder:
+        recorder.reset()
+        # The motion agent can only move forward, which is done automatically.
+        recorder.step({"strategy_0": Direction.LEFT.value})
+        assert env._current_agent_id != "motion_0"
+
+    replayer = EpisodeReplayer(str(tmp_path))
+    assert replayer.options == {
+        "autopilot": True,
+        "autopilot_discount": 0.9,
+        "info": "full",
+        "step_mode": "checked",
+    }
+    episode = replayer.episode(0)
+    assert episode["flags"].tolist() == [AGENT_SWITCH]
+
+    with pytest.raises(AssertionError):
+        next(replayer.replay(make_env(), 0))
+    replay_env = make_env(options=options)
+    assert len(list(replayer.replay(replay_env, 0))) == 1
@@ -0,0 +1,57 @@
+from typing import Any, Callable, Dict
+
+import numpy as np
+from maze.agent.motion import MotionAgent
+from maze.agent.strategy import StrategyAgent
+from maze.env import MazeEnv
+
+from hrl.sampler import LocalSampler
+
+
+def _first_legal_action(obs: Dict[str, Any]) -> np.ndarray:
+    return np.argmax(obs["directions_mask"], axis=1)
+
+
+def _sampler(make_env: Callable[..., MazeEnv], num_envs: int) -> LocalSampler:
+    return LocalSampler(
+        make_env,
+        num_envs,
+        {
+            StrategyAgent.NAME: _first_legal_action,
+            MotionAgent.NAME: _first_legal_action,
+        },
+    )
+
+
+def test_local_sampler_batches_transitions_per_policy(
+    make_env: Callable[..., MazeEnv],
+) -> None:
+    sampler = _sampler(make_env, num_envs=1)
+    batches = sampler.sample(200)
+    strategy, motion = batches[StrategyAgent.NAME], batches[MotionAgent.NAME]
+    assert len(strategy) + len(motion) + len(sampler._pending) == 200
+    assert set(strategy.obs) == {"map", "position", "directions_mask"}
+    assert strategy.obs["position"].shape == (len(strategy), 2)
+    assert {agent_id.split("_")[0] for agent_id in motion.agent_ids} == {"motion"}
+    # Each motion agent acts until it's done.
+    agent_ids = np.array(motion.agent_ids)
+    for episode, agent_id in set(zip(motion.episodes, motion.agent_ids)):
+        dones = motion.dones[(motion.episodes == episode) & (agent_ids == agent_id)]
+        assert dones[:-1].tolist() == [False] * (len(dones) - 1)
+
+    # The policies are deterministic, so all episodes look the same.
+    first, second = (strategy.episodes == episode for episode in (0, 1))
+    assert strategy.actions[first].tolist() == strategy.actions[second].tolist()
+    assert strategy.rewards[first].tolist() == strategy.rewards[second].tolist()
+    assert strategy.dones[first][-1] and strategy.dones[second][-1]
+
+
+def test_local_sampler_steps_environments_in_lock_step(
+    make_env: Callable[..., MazeEnv],
+) -> None:
+    single = _sampler(make_env, num_envs=1).sample(40)
+    batches = _sampler(make_env, num_envs=4).sample(160)
+    for name, batch in batches.items():
+        # Every environment follows the same deterministic episode.
+        assert len(batch) == 4 * len(single[name])
+        assert batch.rewards.sum() == 4 * single[name].rewards.sum()
@@ -0,0 +1,201 @@
+from typing import Any, Callable, Dict
+
+import numpy as np
+import pytest
+from maze.agent.strategy import StrategyAgent
+from maze.env import MazeEnv
+from maze.env_config import DEFAULTS
+from maze.exceptions import DirectionNonWalkable
+from maze.maze import Direction
+
+from hrl.vector_env import VectorHierarchicalEnv
+
+
+@pytest.fixture
+def env(make_env: Callable[..., MazeEnv]) -> VectorHierarchicalEnv:
+    return VectorHierarchicalEnv(make_env, num_envs=3)
+
+
+def test_vector_env_resets_all_sub_environments(env: VectorHierarchicalEnv) -> None:
+    obs = env.vector_reset()
+    assert len(obs) == 3
+    assert all(list(env_obs) == ["strategy_0"] for env_obs in obs)
+    assert env.current_agent_ids == ["strategy_0"] * 3
+
+
+def test_vector_env_switches_agents_per_sub_environment(
+    env: VectorHierarchicalEnv,
+) -> None:
+    env.vector_reset()
+    obs, _, _, _ = env.vector_step([{"strategy_0": Direction.LEFT.value}] * 3)
+    assert env.current_agent_ids == ["motion_0"] * 3
+    assert obs[1]["motion_0"]["directions_mask"].tolist() == [0.0, 1.0]
+
+    env.vector_step([{"motion_0": 1}] * 3)
+    assert env.current_agent_ids == ["strategy_0"] * 3
+
+    env.vector_step(
+        [
+            {"strategy_0": Direction.DOWN.value},
+            {"strategy_0": Direction.LEFT.value},
+            {"strategy_0": Direction.DOWN.value},
+        ]
+    )
+    obs, _, dones, _ = env.vector_step([{"motion_1": 1}] * 3)
+    # Sub-environment 1 hit a wall, the others are still in a corridor.
+    assert set(obs[0]) == {"motion_1"}
+    assert set(obs[1]) == {"motion_1", "strategy_0"}
+    assert not dones[0]["motion_1"] and dones[1]["motion_1"]
+    assert env.current_agent_ids == ["motion_1", "strategy_0", "motion_1"]
+
+
+def test_vector_env_matches_standalone_env(
+    env: VectorHierarchicalEnv, make_env: Callable[..., MazeEnv]
+) -> None:
+    standalone = make_env()
+    standalone.reset()
+    env.vector_reset()
+    actions = [
+        {"strategy_0": Direction.LEFT.value},
+        {"motion_0": 1},
+        {"strategy_0": Direction.DOWN.value},
+        {"motion_1": 1},
+    ]
+    for action_dict in actions:
+        expected = standalone.step(action_dict)
+        result = env.vector_step([action_dict] * env.num_envs)
+        for index in range(env.num_envs):
+            obs, reward, done, _ = (part[index] for part in result)
+            assert obs.keys() == expected[0].keys()
+            for agent_id, agent_obs in obs.items():
+                assert agent_obs.keys() == expected[0][agent_id].keys()
+                for key, value in agent_obs.items():
+                    assert np.array_equal(value, expected[0][agent_id][key])
+            assert reward == expected[1]
+            assert done == expected[2]
+
+
+def test_vector_env_poll_and_send_actions(env: VectorHierarchicalEnv) -> None:
+    obs, _, dones, _, _ = env.poll()
+    assert set(obs) == {0, 1, 2}
+    assert all(not done["__all__"] for done in dones.values())
+
+    env.send_actions({1: {"strategy_0": Direction.UP.value}})
+    obs, rewards, _, _, _ = env.poll()
+    assert set(obs) == {1}
+    assert set(obs[1]) == {"motion_0"}
+
+    obs, _, _, _, _ = env.poll()
+    assert obs == {}
+
+
+def test_vector_env_validates_all_actions_before_stepping(
+    env: VectorHierarchicalEnv,
+) -> None:
+    env.vector_reset()
+    with pytest.raises(DirectionNonWalkable):
+        env.vector_step(
+            [
+                {"strategy_0": Direction.LEFT.value},
+                {"strategy_0": Direction.RIGHT.value},
+                {"strategy_0": Direction.LEFT.value},
+            ]
+        )
+    # None of the sub-environments was stepped.
+    for sub_env in env.get_sub_environments():
+        assert sub_env._last_action is None
+        assert sub_env._agents[StrategyAgent.NAME]._elapsed_steps == 0
+    assert env.current_agent_ids == ["strategy_0"] * 3
+
+    env.vector_step([{"strategy_0": Direction.LEFT.value}] * 3)
+    assert env.current_agent_ids == ["motion_0"] * 3
+
+
+def test_vector_env_batches_outputs_per_agent_name(
+    env: VectorHierarchicalEnv,
+) -> None:
+    obs = env.batch_reset()
+    assert list(obs) == ["strategy"]
+    assert obs["strategy"]["position"].shape == (3, 2)
+
+    batches, episode_dones, obs = env.batch_step(
+        {"strategy": np.full(3, Direction.LEFT.value)}
+    )
+    assert not episode_dones.any()
+    motion = batches["motion"]
+    assert motion.env_indices.tolist() == [0, 1, 2]
+    assert motion.agent_ids == ["motion_0"] * 3
+    assert motion.obs["directions_mask"].tolist() == [[0.0, 1.0]] * 3
+    assert motion.rewards.dtype == np.float32
+    assert np.array_equal(obs["motion"]["position"], motion.obs["position"])
+
+    env.batch_step({"motion": np.ones(3, dtype=np.int64)})
+    env.batch_step(
+        {
+            "strategy": np.array(
+                [Direction.DOWN.value, Direction.LEFT.value, Direction.DOWN.value]
+            )
+        }
+    )
+    batches, _, obs = env.batch_step({"motion": np.ones(3, dtype=np.int64)})
+    # Sub-environment 1 hit a wall, so its motion agent is done.
+    assert batches["motion"].env_indices.tolist() == [0, 1, 2]
+    assert batches["motion"].dones.tolist() == [False, True, False]
+    assert batches["strategy"].env_indices.tolist() == [1]
+    assert env.current_env_indices("motion").tolist() == [0, 2]
+    assert env.current_env_indices("strategy").tolist() == [1]
+    assert len(obs["motion"]["position"]) == 2
+    assert len(obs["strategy"]["position"]) == 1
+
+
+def test_vector_env_batch_step_resets_done_episodes(
+    agent_configs: Dict[str, Any],
+) -> None:
+    env = VectorHierarchicalEnv.from_env_class(
+        MazeEnv,
+        DEFAULTS | {},
+        agent_configs | {StrategyAgent.NAME: StrategyAgent.DEFAULTS | {"max_steps": 1}},
+        num_envs=2,
+    )
+    env.batch_reset()
+    env.batch_step({"strategy": np.full(2, Direction.LEFT.value)})
+    _, episode_dones, obs = env.batch_step({"motion": np.ones(2, dtype=np.int64)})
+    assert episode_dones.tolist() == [True, True]
+    # The observations come from the new episodes.
+    assert list(obs) == ["strategy"]
+    assert env.current_agent_ids == ["strategy_0"] * 2
+    start = env.get_sub_environments()[0]._maze.start
+    assert obs["strategy"]["position"].tolist() == [list(start)] * 2
+
+
+@pytest.mark.parametrize("observation_buffers", [False, True])
+def test_vector_env_batch_step_keeps_terminal_observations(
+    observation_buffers: bool,
+    agent_configs: Dict[str, Any],
+    make_env: Callable[..., MazeEnv],
+) -> None:
+    short_configs = agent_configs | {
+        StrategyAgent.NAME: StrategyAgent.DEFAULTS | {"max_steps": 1}
+    }
+    # Only the episode of the first sub-environment ends after a single strategy step.
+    env = VectorHierarchicalEnv(
+        lambda index: make_env(
+            index,
+            short_configs if index == 0 else agent_configs,
+            {"observation_buffers": observation_buffers},
+        ),
+        num_envs=2,
+    )
+    standalone = make_env(agent_configs=short_configs)
+    standalone.reset()
+    standalone.step({"strategy_0": Direction.LEFT.value})
+    expected_obs, *_ = standalone.step({"motion_0": 1})
+
+    env.batch_reset()
+    env.batch_step({"strategy": np.full(2, Direction.LEFT.value)})
+    batches, episode_dones, _ = env.batch_step({"motion": np.ones(2, dtype=np.int64)})
+    assert episode_dones.tolist() == [True, False]
+    strategy = batches["strategy"]
+    assert strategy.env_indices.tolist() == [0, 1]
+    for key, value in expected_obs["strategy_0"].items():
+        np.testing.assert_array_equal(strategy.obs[key][0], value)
@@ -4,7 +4,7 @@ from maze.agent.strategy import StrategyAgent, StrategyAgentConfig
 from maze.env import MazeEnv
 from maze.env_config import DEFAULTS
 from maze.maze import Direction
-from maze.model import MazeModel
+from maze.model import ConvMazeModel, MazeModel
 from ray import tune
 from ray.rllib.models import ModelCatalog
 from ray.tune import register_env
@@ -14,12 +14,15 @@ from ray.tune.integration.wandb import WandbLoggerCallback
 def register_envs():
     register_env(
         "MazeEnv",
-        lambda env_config: MazeEnv(env_config["common"], env_config["agents"]),
+        lambda env_config: MazeEnv(
+            env_config["common"], env_config["agents"], env_config.get("options")
+        ),
     )
 
 
 def register_models():
     ModelCatalog.register_custom_model("MazeModel", MazeModel)
+    ModelCatalog.register_custom_model("ConvMazeModel", ConvMazeModel)
 
 
 def train(log_to_wandb: bool):
@@ -2,7 +2,7 @@ import ray
 from maze.agent.strategy import StrategyAgent, StrategyAgentConfig
 from maze.env_config import DEFAULTS
 from maze.maze import Direction
-from maze.model import MazeModel
+from maze.model import ConvMazeModel, MazeModel
 from maze_procedure.env import MazeProcedureEnv
 from ray import tune
 from ray.rllib.models import ModelCatalog
@@ -13,12 +13,15 @@ from ray.tune.integration.wandb import WandbLoggerCallback
 def register_envs():
     register_env(
         "MazeProcedureEnv",
-        lambda env_config: MazeProcedureEnv(env_config["common"], env_config["agents"]),
+        lambda env_config: MazeProcedureEnv(
+            env_config["common"], env_config["agents"], env_config.get("options")
+        ),
     )
 
 
 def register_models():
     ModelCatalog.register_custom_model("MazeModel", MazeModel)
+    ModelCatalog.register_custom_model("ConvMazeModel", ConvMazeModel)
 
 
 def train(log_to_wandb: bool):
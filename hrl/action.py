@@ -1,5 +1,6 @@
 from abc import ABC
 from dataclasses import dataclass
+from typing import Any, Dict, Generic, Optional, Sequence, TypeVar
 
 from dataclasses_json import DataClassJsonMixin
 
@@ -22,3 +23,50 @@ class NoSwitchAction(SwitchAgent):
 @dataclass(frozen=True)
 class ProcedureRequest(Action):
     pass
+
+
+ActionType = TypeVar("ActionType", bound=Action)
+
+# Canonical instances of the interned actions.
+_interned: Dict[Action, Action] = {}
+
+
+def intern_action(action: ActionType) -> ActionType:
+    """
+    Returns the canonical instance of the `action`, equal to it. Actions are frozen,
+    so the instance can be shared by all agents and environments, which saves
+    constructing new actions on every step.
+    """
+    return _interned.setdefault(action, action)  # type: ignore
+
+
+class ActionTable(Generic[ActionType]):
+    """
+    Maps discrete raw actions (indices) of an agent to interned actions, so decoding
+    a raw action is just a lookup.
+
+    Examples:
+        >>> table = ActionTable([SetDirection(direction) for direction in Direction])
+        ... table.get(1)
+        SetDirection(direction=<Direction.RIGHT: 1>)
+    """
+
+    def __init__(self, actions: Sequence[ActionType]):
+        # A dict rather than a sequence, so the raw actions equal to the indices (e.g.
+        # NumPy integers or floats) are accepted, while any others aren't.
+        self._actions = {
+            index: intern_action(action) for index, action in enumerate(actions)
+        }
+
+    def __len__(self) -> int:
+        return len(self._actions)
+
+    def get(self, raw_action: Any) -> Optional[ActionType]:
+        """
+        Returns the action for the `raw_action` or `None` if there's no such action.
+        """
+        try:
+            return self._actions.get(raw_action)
+        except TypeError:
+            # Unhashable raw actions.
+            return None
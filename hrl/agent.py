@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Generic, Optional, Protocol, TypeVar
+from dataclasses import dataclass
+from typing import Any, Dict, Generic, Optional, Protocol, Type, TypeVar
 
 from gym import Space  # type: ignore
 
@@ -18,6 +19,22 @@ class AgentTrigger(Protocol[AgentAction_contra]):
         pass
 
 
+@dataclass(frozen=True)
+class ActionTrigger:
+    """
+    A declarative trigger, which fires when the agent called `agent` outputs
+    an action of the `action` type (or its subclass). Unlike arbitrary callables,
+    these triggers are compiled by the environment into a lookup table, so matching
+    them doesn't depend on the number of defined triggers.
+    """
+
+    agent: AgentName
+    action: Type[Action]
+
+    def __call__(self, name: AgentName, action: Action) -> bool:
+        return name == self.agent and isinstance(action, self.action)
+
+
 AgentState = TypeVar("AgentState")
 AgentObs = TypeVar("AgentObs")
 AgentRawAction = TypeVar("AgentRawAction")
@@ -43,6 +60,10 @@ class Agent(
     def __init__(self, config: AgentConfig, env_config: EnvConfig):
         self.config = config
         self.env_config = env_config
+        # Whether `decode_action` should check the legality of actions. It's turned
+        # off by the environment in the "trusted" step mode, when the policy is
+        # known to output legal actions only (e.g. it applies action masks).
+        self.validate_actions = True
 
     @staticmethod
     @abstractmethod
@@ -59,6 +80,9 @@ class Agent(
         """
         Translates the environment state into the agent state. You can use it to narrow
         down what is visible to the agent.
+
+        It should depend only on the `state`, as the environment reuses
+        the translation of the same state object within and across consecutive steps.
         """
         pass
 
@@ -69,6 +93,26 @@ class Agent(
         """
         pass
 
+    def encode_observation_into(self, state: AgentState, observation: AgentObs) -> None:
+        """
+        Encodes the agent state into the preallocated `observation` in place. Its
+        structure matches the observation space (see `hrl.spaces.Layout`) and it's
+        reused between steps, so anything that doesn't change (e.g. a static map)
+        doesn't have to be written again.
+
+        Optional, used instead of `encode_observation` when the environment is created
+        with the `observation_buffers` option.
+        """
+        raise NotImplementedError
+
+    def action_mask(self, state: AgentState) -> Optional[Any]:
+        """
+        Flags of the legal raw actions in the `state`, indexed by the raw actions
+        (e.g. the mask encoded in the observation). Optional, used by the `autopilot`
+        option to execute the only legal action without asking the policy.
+        """
+        return None
+
     @abstractmethod
     def decode_action(self, state: AgentState, action: AgentRawAction) -> AgentAction:
         """
@@ -102,6 +146,11 @@ class Agent(
         """
         Anything the agent wants to store in `info` structure. This will be stored under
         the agent ID's key.
+
+        With the `lazy_info` option, it's evaluated only when the info is accessed
+        (possibly after later steps), so it should depend on its arguments only. It's
+        not called at all, when the environment is created with the "none" `info`
+        option.
         """
         return {}
 
@@ -136,3 +185,22 @@ class Agent(
         an agent switch action).
         """
         pass
+
+    def snapshot(self) -> Any:
+        """
+        Captures the mutable state of the agent kept between the callbacks (e.g. step
+        counters), so the episode can be forked (see `HierarchicalEnv.get_snapshot`).
+        The same snapshot may be restored many times, so it mustn't be modified
+        by `restore`.
+
+        The default is a shallow copy of the instance attributes. Agents holding
+        mutable containers or keeping lots of static data should override both
+        methods with something more specific and cheaper.
+        """
+        return dict(self.__dict__)
+
+    def restore(self, snapshot: Any) -> None:
+        """
+        Restores the state captured by `snapshot`.
+        """
+        self.__dict__.update(snapshot)
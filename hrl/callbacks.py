@@ -0,0 +1,50 @@
+from typing import Any, Dict, List, Optional
+
+from ray.rllib.agents.callbacks import DefaultCallbacks
+from ray.rllib.env import BaseEnv
+from ray.rllib.evaluation import MultiAgentEpisode, RolloutWorker
+from ray.rllib.policy import Policy
+from ray.rllib.utils.typing import PolicyID
+
+from hrl.env import HierarchicalEnv
+
+
+class ProfilingCallbacks(DefaultCallbacks):
+    """
+    Reports the callback stats of environments created with the `profile` option
+    as custom metrics, e.g. `profile/agents/strategy/decode_action/mean_time_ms`.
+    The stats are reset after each episode, so the metrics describe single episodes.
+    """
+
+    def on_episode_end(
+        self,
+        *,
+        worker: RolloutWorker,
+        base_env: BaseEnv,
+        policies: Dict[PolicyID, Policy],
+        episode: MultiAgentEpisode,
+        env_index: Optional[int] = None,
+        **kwargs: Any,
+    ) -> None:
+        env = _sub_environments(base_env)[env_index or 0]
+        if not isinstance(env, HierarchicalEnv):
+            return
+        for kind, owners in env.stats().items():
+            for owner, callbacks in owners.items():
+                for name, stats in callbacks.items():
+                    prefix = f"profile/{kind}/{owner}/{name}"
+                    episode.custom_metrics[f"{prefix}/calls"] = stats.calls
+                    episode.custom_metrics[f"{prefix}/total_time_ms"] = (
+                        stats.total_time * 1000
+                    )
+                    episode.custom_metrics[f"{prefix}/mean_time_ms"] = (
+                        stats.mean_time * 1000
+                    )
+        env.reset_stats()
+
+
+def _sub_environments(base_env: BaseEnv) -> List[Any]:
+    # `get_unwrapped` was renamed to `get_sub_environments` in newer Ray versions.
+    if hasattr(base_env, "get_sub_environments"):
+        return base_env.get_sub_environments()
+    return base_env.get_unwrapped()
@@ -1,30 +1,170 @@
 import logging
 from abc import ABC, abstractmethod
 from collections import defaultdict
-from functools import cached_property
-from typing import Any, Dict, Generic, List, Optional, Tuple, Type
+from copy import deepcopy
+from dataclasses import dataclass, field
+from functools import cached_property, partial
+from typing import Any, Dict, Generic, List, Optional, Tuple, Type, TypeVar
 
+import numpy as np
 from gym import Space  # type: ignore
 from ray.rllib import MultiAgentEnv
 from ray.rllib.utils.typing import MultiAgentDict
 
 from hrl.action import Action, ProcedureRequest, SwitchAgent
-from hrl.agent import Agent, AgentName, AgentTrigger
+from hrl.agent import ActionTrigger, Agent, AgentName, AgentTrigger
+from hrl.env_options import (
+    DEFAULTS,
+    INFO_FULL,
+    INFO_MODES,
+    INFO_NONE,
+    STEP_CHECKED,
+    STEP_MODES,
+    EnvOptions,
+)
 from hrl.env_types import EnvConfig, EnvState, EnvCommonInfo
 from hrl.exceptions import MissingNextAgent, MissingProcedure
+from hrl.info import LazyInfo
 from hrl.procedure import Procedure, ProcedureName
+from hrl.profiling import AGENTS, ENV, PROCEDURES, Profiler, Stats
+from hrl.spaces import Layout
 
 LOG = logging.getLogger(__name__)
 
 AgentId = str
 
 
+def agent_name(agent_id: AgentId) -> AgentName:
+    """
+    The name of the agent with the `agent_id` (e.g. "motion" for "motion_0"). Only
+    the counter after the last underscore is stripped, so names may contain
+    underscores too.
+    """
+    name, _ = agent_id.rsplit("_", 1)
+    return name
+
+
+PROFILED_AGENT_CALLBACKS = (
+    "translate_state",
+    "encode_observation",
+    "encode_observation_into",
+    "action_mask",
+    "decode_action",
+    "has_done",
+    "calculate_reward",
+    "info",
+    "on_reset",
+    "on_takes_control",
+    "on_step",
+    "on_gives_control",
+)
+# The key of the number of automatic actions of the `autopilot` option in agent infos.
+AUTOPILOT_STEPS = "autopilot_steps"
+
+PROFILED_PROCEDURE_CALLBACKS = ("execute", "execute_batch")
+PROFILED_ENV_CALLBACKS = ("initial_state", "env_step", "common_info")
+
+Target = TypeVar("Target")
+
+
+def _with_autopilot_steps(info: Dict[str, Any], steps: int) -> Dict[str, Any]:
+    # Adds the number of automatic actions to the info of an agent without evaluating
+    # it and without modifying the dict returned by `Agent.info`.
+    if isinstance(info, LazyInfo) and not info.computed:
+        return LazyInfo(partial(_merge_info, info, {AUTOPILOT_STEPS: steps}))
+    return _merge_info(info, {AUTOPILOT_STEPS: steps})
+
+
+def _merge_info(info: Dict[str, Any], extra: Dict[str, Any]) -> Dict[str, Any]:
+    return {**info, **extra}
+
+
+class _TriggerTable(Generic[Target]):
+    """
+    Matches triggers in the order they were defined. `ActionTrigger`s are looked up
+    in a dict keyed by (agent name, action type), while any other callables are
+    evaluated one by one as a fallback.
+    """
+
+    def __init__(self, triggers: List[Tuple[AgentTrigger[Action], Target]]):
+        self._table: Dict[Tuple[AgentName, Type[Action]], Tuple[int, Target]] = {}
+        self._callables: List[Tuple[int, AgentTrigger[Action], Target]] = []
+        for index, (trigger, target) in enumerate(triggers):
+            if isinstance(trigger, ActionTrigger):
+                self._table.setdefault((trigger.agent, trigger.action), (index, target))
+            else:
+                self._callables.append((index, trigger, target))
+        # Table matches resolved against the whole action class hierarchy.
+        self._resolved: Dict[
+            Tuple[AgentName, Type[Action]], Optional[Tuple[int, Target]]
+        ] = {}
+
+    def match(self, name: AgentName, action: Action) -> Optional[Target]:
+        key = (name, type(action))
+        try:
+            match = self._resolved[key]
+        except KeyError:
+            match = self._resolved[key] = self._resolve(name, type(action))
+
+        for index, trigger, target in self._callables:
+            if match is not None and index > match[0]:
+                break
+            if trigger(name, action):
+                return target
+        return match[1] if match is not None else None
+
+    def _resolve(
+        self, name: AgentName, action_type: Type[Action]
+    ) -> Optional[Tuple[int, Target]]:
+        matches = [
+            self._table[(name, cls)]
+            for cls in action_type.__mro__
+            if (name, cls) in self._table
+        ]
+        return min(matches, key=lambda match: match[0], default=None)
+
+
+@dataclass(frozen=True)
+class EnvSnapshot(Generic[EnvState]):
+    """
+    The state of an episode of a hierarchical environment captured by
+    `HierarchicalEnv.get_snapshot`. Environment states are kept by reference.
+    """
+
+    state: Optional[EnvState]
+    agent_counter: Dict[AgentName, int]
+    current_agent_name: Optional[AgentName]
+    current_agent_id: Optional[AgentId]
+    last_action: Optional[Action]
+    agents: Dict[AgentName, Any]
+    autopilot_rewards: Dict[AgentId, float] = field(default_factory=dict)
+    autopilot_steps: Dict[AgentId, int] = field(default_factory=dict)
+
+
 class HierarchicalEnv(MultiAgentEnv, ABC, Generic[EnvConfig, EnvState, EnvCommonInfo]):
-    def __init__(self, config: EnvConfig, agent_configs: Dict[AgentName, Any]):
+    def __init__(
+        self,
+        config: EnvConfig,
+        agent_configs: Dict[AgentName, Any],
+        options: Optional[EnvOptions] = None,
+    ):
         self._config = config
         self._agent_configs = agent_configs
+        self._options: EnvOptions = DEFAULTS | (options or {})  # type: ignore
+        assert (
+            self._options["info"] in INFO_MODES
+        ), f"The info mode should be one of {INFO_MODES}."
+        assert (
+            self._options["step_mode"] in STEP_MODES
+        ), f"The step mode should be one of {STEP_MODES}."
+        self._checked = self._options["step_mode"] == STEP_CHECKED
+        assert (
+            0.0 <= self._options["autopilot_discount"] <= 1.0
+        ), "The autopilot discount should be between 0 and 1."
 
         self._validate_transitions_on_done()
+        self._transitions_on_action_table = _TriggerTable(self.transitions_on_action)
+        self._procedures_on_action_table = _TriggerTable(self.procedures_on_action)
 
         self._agents = self._init_agents()
         # This dict holds the reference how many times a given agent was done, so
@@ -34,6 +174,27 @@ class HierarchicalEnv(MultiAgentEnv, ABC, Generic[EnvConfig, EnvState, EnvCommon
         self._current_agent_id: Optional[AgentId] = None
 
         self._prev_state: Optional[EnvState] = None
+        # The action decoded in the last step from the given action dict (i.e. not
+        # the automatic actions of the `autopilot` option).
+        self._last_action: Optional[Action] = None
+        # Agent states translated during the current step, keyed by the agent name and
+        # the identity of the environment state. The state is stored alongside, so
+        # its id can't be reused by another object while the entry is alive.
+        self._translated_states: Dict[Tuple[AgentName, int], Tuple[EnvState, Any]] = {}
+        # Rewards (discounted) and automatic actions of the agents since their last
+        # decisions, which are returned with their next observations.
+        self._autopilot_rewards: Dict[AgentId, float] = {}
+        self._autopilot_steps: Dict[AgentId, int] = {}
+
+        # Two buffers per agent used in turns, so the observations of two agents of
+        # the same name returned from a single step don't overwrite each other.
+        self._observation_buffers: Dict[AgentName, List[Any]] = {}
+        if self._options["observation_buffers"]:
+            self._observation_buffers = self._init_observation_buffers()
+
+        self._profiler: Optional[Profiler] = None
+        if self._options["profile"]:
+            self._profiler = self._init_profiler()
 
     @cached_property
     @abstractmethod
@@ -68,19 +229,28 @@ class HierarchicalEnv(MultiAgentEnv, ABC, Generic[EnvConfig, EnvState, EnvCommon
         Defines triggers, which allow changing the current agent when it outputs
         a specific action. The new agent will receive this action.
 
+        Prefer `ActionTrigger`s, which are compiled into a lookup table. Any other
+        callable is still supported, but it's evaluated on every agent switch.
+        The first matching trigger wins.
+
         Examples:
             >>> HIGH_LEVEL_AGENT = "high_level"
             ... LOW_LEVEL_AGENT = "low_level"
-            ... GO_RIGHT = 2
-            ... [(lambda name, action: (
-            ...     name == HIGH_LEVEL_AGENT and action == GO_RIGHT
+            ... [(ActionTrigger(HIGH_LEVEL_AGENT, GoRight), LOW_LEVEL_AGENT)]
+
+            >>> [(lambda name, action: (
+            ...     name == HIGH_LEVEL_AGENT and action == GoRight()
             ... ), LOW_LEVEL_AGENT)]
         """
         return []
 
     @cached_property
     def procedures_on_action(self) -> List[Tuple[AgentTrigger[Action], ProcedureName]]:
-        """ """
+        """
+        Defines triggers, which select the procedure executing a `ProcedureRequest`
+        output by the current agent. The triggers follow the same rules as
+        `transitions_on_action`.
+        """
         return []
 
     @abstractmethod
@@ -92,6 +262,10 @@ class HierarchicalEnv(MultiAgentEnv, ABC, Generic[EnvConfig, EnvState, EnvCommon
         pass
 
     def common_info(self, state: EnvState) -> EnvCommonInfo:
+        """
+        Info concerning all agents, stored under the "__common__" key. Evaluated like
+        `Agent.info`, and only in the "full" `info` mode.
+        """
         return {}  # type: ignore
 
     @property
@@ -112,9 +286,66 @@ class HierarchicalEnv(MultiAgentEnv, ABC, Generic[EnvConfig, EnvState, EnvCommon
         agent_config = self._agent_configs[agent.NAME]
         return agent.action_space(agent_config, self._config)
 
+    def stats(self) -> Stats:
+        """
+        Wall time and call counts of the callbacks, grouped by the kind of the owner
+        ("agents", "procedures" or "env"), its name and the callback name. It's only
+        available, when the environment was created with the `profile` option.
+        """
+        if self._profiler is None:
+            return {}
+        return self._profiler.stats()
+
+    def reset_stats(self) -> None:
+        if self._profiler is not None:
+            self._profiler.reset()
+
+    def get_snapshot(self) -> EnvSnapshot[EnvState]:
+        """
+        Captures the current episode, so it can be continued later from this point
+        (possibly many times) with `restore_snapshot`, e.g. for lookahead planning.
+
+        Environment states are stored by reference, so they mustn't be modified
+        in place by `env_step`, procedures and agent callbacks (which is already
+        required by the caching of `Agent.translate_state`). Agents capture their own
+        state with `Agent.snapshot`. Other attributes of the environment subclasses
+        aren't included, so they should stay constant during an episode.
+        """
+        return EnvSnapshot(
+            state=self._prev_state,
+            agent_counter=dict(self._agent_counter),
+            current_agent_name=self._current_agent_name,
+            current_agent_id=self._current_agent_id,
+            last_action=self._last_action,
+            agents={name: agent.snapshot() for name, agent in self._agents.items()},
+            autopilot_rewards=dict(self._autopilot_rewards),
+            autopilot_steps=dict(self._autopilot_steps),
+        )
+
+    def restore_snapshot(self, snapshot: EnvSnapshot[EnvState]) -> None:
+        """
+        Continues the episode from the `snapshot`. The next call to `step` expects
+        an action of the agent, which was the current one when the snapshot was taken.
+        """
+        self._prev_state = snapshot.state
+        self._agent_counter = defaultdict(int, snapshot.agent_counter)
+        self._current_agent_name = snapshot.current_agent_name
+        self._current_agent_id = snapshot.current_agent_id
+        self._last_action = snapshot.last_action
+        self._translated_states = {}
+        self._autopilot_rewards = dict(snapshot.autopilot_rewards)
+        self._autopilot_steps = dict(snapshot.autopilot_steps)
+        for name, agent_snapshot in snapshot.agents.items():
+            self._agents[name].restore(agent_snapshot)
+
     def reset(self) -> MultiAgentDict:
         self._agent_counter = defaultdict(int)
 
+        self._translated_states = {}
+        self._last_action = None
+        self._autopilot_rewards = {}
+        self._autopilot_steps = {}
+
         for agent in self._agents.values():
             agent.on_reset()
 
@@ -122,42 +353,91 @@ class HierarchicalEnv(MultiAgentEnv, ABC, Generic[EnvConfig, EnvState, EnvCommon
         state = self._switch_agent(self.initial_agent, state)
 
         obs = {
-            self._current_agent_id: self._current_agent.encode_observation(
-                self._current_agent.translate_state(state)
+            self._current_agent_id: self._encode_observation(
+                self._translate_state(state)
             )
         }
+        if self._options["autopilot"]:
+            # There are no rewards for actions taken before the first decision.
+            done = {self._current_agent_id: False, "__all__": False}
+            obs, *_ = self._run_autopilot((obs, {}, done, {}))
         return obs
 
     def step(
         self, action_dict: MultiAgentDict
     ) -> Tuple[MultiAgentDict, MultiAgentDict, MultiAgentDict, MultiAgentDict]:
-        assert (
-            self._prev_state
-        ), "The episode is not initialized. Did you forget to call `reset` first?"
-        assert self._current_agent, "There should be a single current agent set."
-        assert len(action_dict) == 1, (
-            "This environment follows a hierarchical reinforcement learning approach "
-            "and always expects an action for only one agent."
-        )
-        assert (
-            self._current_agent_id in action_dict
-        ), f"Expected an action for agent `{self._current_agent_name}`."
+        action = self._start_step(action_dict)
+        return self._finish_step(self._execute(action), action)
+
+    def _start_step(self, action_dict: MultiAgentDict) -> Action:
+        """
+        The first phase of `step`, which decodes the action of the current agent.
+        """
+        action = self._decode_step(action_dict)
+        self._begin_step(action)
+        return action
+
+    def _decode_step(self, action_dict: MultiAgentDict) -> Action:
+        """
+        Decodes (and validates) the action of the current agent without changing
+        the episode, so the caller can still give up the step.
+        """
+        if self._checked:
+            assert (
+                self._prev_state
+            ), "The episode is not initialized. Did you forget to call `reset` first?"
+            assert self._current_agent, "There should be a single current agent set."
+            assert len(action_dict) == 1, (
+                "This environment follows a hierarchical reinforcement learning "
+                "approach and always expects an action for only one agent."
+            )
+            assert (
+                self._current_agent_id in action_dict
+            ), f"Expected an action for agent `{self._current_agent_name}`."
+
+        self._forget_translated_states(keep=self._prev_state)
 
         agent_action = action_dict[self._current_agent_id]
-        action = self._current_agent.decode_action(
-            self._current_agent.translate_state(self._prev_state), agent_action
+        return self._current_agent.decode_action(
+            self._translate_state(self._prev_state), agent_action
         )
+
+    def _begin_step(self, action: Action) -> None:
         self._current_agent.on_step(action)
+        self._last_action = action
+
+    def _execute(self, action: Action) -> EnvState:
+        if isinstance(action, ProcedureRequest):
+            procedure = self._get_procedure(action)
+            return procedure.execute(self._prev_state, action)
+        return self._execute_action(action)
 
+    def _execute_action(self, action: Action) -> EnvState:
+        """
+        The second phase of `step` for actions other than procedure requests, which
+        are executed by the caller (so they can be batched across environments).
+        """
         if isinstance(action, SwitchAgent):
             next_agent = self._get_next_agent(action)
-            state = self._switch_agent(next_agent, self._prev_state, action)
-        elif isinstance(action, ProcedureRequest):
-            procedure = self._get_procedure(action)
-            state = procedure.execute(self._prev_state, action)
-        else:
-            state = self.env_step(self._prev_state, action)
+            return self._switch_agent(next_agent, self._prev_state, action)
+        return self.env_step(self._prev_state, action)  # type: ignore
+
+    def _finish_step(
+        self, state: EnvState, action: Action
+    ) -> Tuple[MultiAgentDict, MultiAgentDict, MultiAgentDict, MultiAgentDict]:
+        """
+        The last phase of `step`, which collects the agents' outputs for the new
+        `state` and switches the agents on done. With the `autopilot` option, it also
+        runs the following automatic steps.
+        """
+        result = self._finish_agent_step(state, action)
+        if self._options["autopilot"]:
+            result = self._run_autopilot(result)
+        return result
 
+    def _finish_agent_step(
+        self, state: EnvState, action: Action
+    ) -> Tuple[MultiAgentDict, MultiAgentDict, MultiAgentDict, MultiAgentDict]:
         result: Tuple[
             MultiAgentDict, MultiAgentDict, MultiAgentDict, MultiAgentDict
         ] = ({}, {}, {}, {})
@@ -181,6 +461,71 @@ class HierarchicalEnv(MultiAgentEnv, ABC, Generic[EnvConfig, EnvState, EnvCommon
 
         return result
 
+    def _run_autopilot(
+        self,
+        result: Tuple[MultiAgentDict, MultiAgentDict, MultiAgentDict, MultiAgentDict],
+    ) -> Tuple[MultiAgentDict, MultiAgentDict, MultiAgentDict, MultiAgentDict]:
+        """
+        Executes the only legal actions of the current agents, until an agent has
+        a choice or the episode ends, and merges the results of the steps. The
+        observations consumed by the automatic actions aren't returned, their rewards
+        are accumulated until the next returned observation of the agent.
+        """
+        discount = self._options["autopilot_discount"]
+        decision = self._last_action
+        merged: Tuple[
+            MultiAgentDict, MultiAgentDict, MultiAgentDict, MultiAgentDict
+        ] = ({}, {}, {}, {})
+        obs, rewards, done, info = merged
+        while True:
+            step_obs, step_rewards, step_done, step_info = result
+            for agent_id, reward in step_rewards.items():
+                steps = self._autopilot_steps.get(agent_id, 0)
+                self._autopilot_rewards[agent_id] = (
+                    self._autopilot_rewards.get(agent_id, 0.0)
+                    + discount**steps * reward
+                )
+            obs.update(step_obs)
+            done.update(step_done)
+            info.update(step_info)
+            if step_done["__all__"]:
+                break
+            raw_action = self._only_legal_action()
+            if raw_action is None:
+                break
+
+            agent_id = self._current_agent_id
+            for values in (obs, done, info):
+                values.pop(agent_id, None)
+            self._autopilot_steps[agent_id] = self._autopilot_steps.get(agent_id, 0) + 1
+            if self._observation_buffers:
+                # The observations of done agents are kept, while the buffers are
+                # reused by the next steps.
+                for other_id in step_obs.keys() - {agent_id}:
+                    obs[other_id] = deepcopy(obs[other_id])
+
+            action = self._start_step({agent_id: raw_action})
+            result = self._finish_agent_step(self._execute(action), action)
+
+        self._last_action = decision
+        for agent_id in obs:
+            rewards[agent_id] = self._autopilot_rewards.pop(agent_id, 0.0)
+            steps = self._autopilot_steps.pop(agent_id, 0)
+            if agent_id in info:
+                info[agent_id] = _with_autopilot_steps(info[agent_id], steps)
+        return merged
+
+    def _only_legal_action(self) -> Optional[int]:
+        mask = self._current_agent.action_mask(
+            self._translate_state(self._prev_state)  # type: ignore
+        )
+        if mask is None:
+            return None
+        legal_actions = np.flatnonzero(mask)
+        if len(legal_actions) != 1:
+            return None
+        return int(legal_actions[0])
+
     @property
     def _current_agent(
         self,
@@ -198,8 +543,32 @@ class HierarchicalEnv(MultiAgentEnv, ABC, Generic[EnvConfig, EnvState, EnvCommon
         for agent_name, agent_cls in self.agents.items():
             agent_config = self._agent_configs[agent_name]
             agents[agent_name] = agent_cls(agent_config, self._config)
+            agents[agent_name].validate_actions = self._checked
         return agents
 
+    def _init_observation_buffers(self) -> Dict[AgentName, List[Any]]:
+        buffers = {}
+        for name, agent in self._agents.items():
+            if type(agent).encode_observation_into is Agent.encode_observation_into:
+                continue
+            space = agent.observation_space(self._agent_configs[name], self._config)
+            layout = Layout(space)
+            buffers[name] = [layout.allocate(), layout.allocate()]
+        return buffers
+
+    def _init_profiler(self) -> Profiler:
+        # Callbacks are replaced on the instances, so there's no overhead at all
+        # when profiling is disabled.
+        profiler = Profiler()
+        for agent in self._agents.values():
+            profiler.instrument(AGENTS, agent.NAME, agent, *PROFILED_AGENT_CALLBACKS)
+        for procedure in self.procedures.values():
+            profiler.instrument(
+                PROCEDURES, procedure.NAME, procedure, *PROFILED_PROCEDURE_CALLBACKS
+            )
+        profiler.instrument(ENV, type(self).__name__, self, *PROFILED_ENV_CALLBACKS)
+        return profiler
+
     def _switch_agent(
         self,
         new_agent: AgentName,
@@ -220,40 +589,87 @@ class HierarchicalEnv(MultiAgentEnv, ABC, Generic[EnvConfig, EnvState, EnvCommon
         return new_state
 
     def _get_next_agent(self, action: SwitchAgent) -> AgentName:
-        for trigger, agent in self.transitions_on_action:
-            if trigger(self._current_agent_name, action):  # type: ignore
-                return agent
-        raise MissingNextAgent(self._current_agent, action)
+        agent = self._transitions_on_action_table.match(
+            self._current_agent_name, action  # type: ignore
+        )
+        if agent is None:
+            raise MissingNextAgent(self._current_agent, action)
+        return agent
 
     def _get_procedure(self, action: ProcedureRequest) -> Procedure[EnvState, Any]:
-        for trigger, procedure in self.procedures_on_action:
-            if trigger(self._current_agent_name, action):  # type: ignore
-                return self.procedures[procedure]
-        raise MissingProcedure(self._current_agent, action)
+        procedure = self._procedures_on_action_table.match(
+            self._current_agent_name, action  # type: ignore
+        )
+        if procedure is None:
+            raise MissingProcedure(self._current_agent, action)
+        return self.procedures[procedure]
+
+    def _translate_state(self, state: EnvState) -> Any:
+        """
+        Translates the `state` for the current agent, reusing the translation if it was
+        already done for the very same state object.
+        """
+        key = (self._current_agent_name, id(state))
+        try:
+            translated_state, agent_state = self._translated_states[key]
+            if translated_state is state:
+                return agent_state
+        except KeyError:
+            pass
+        agent_state = self._current_agent.translate_state(state)
+        self._translated_states[key] = (state, agent_state)  # type: ignore
+        return agent_state
+
+    def _encode_observation(self, agent_state: Any) -> Any:
+        buffers = self._observation_buffers.get(self._current_agent_name)  # type: ignore
+        if buffers is None:
+            return self._current_agent.encode_observation(agent_state)
+        buffers.reverse()
+        observation = buffers[0]
+        self._current_agent.encode_observation_into(agent_state, observation)
+        return observation
+
+    def _forget_translated_states(self, keep: EnvState) -> None:
+        self._translated_states = {
+            key: entry
+            for key, entry in self._translated_states.items()
+            if entry[0] is keep
+        }
 
     def _agent_id(self, name: AgentName) -> AgentId:
         return f"{name}_{self._agent_counter[name]}"
 
+    @staticmethod
+    def _agent_name(agent_id: AgentId) -> AgentName:
+        return agent_name(agent_id)
+
     def _populate_result_with_agent_output(
         self,
         result: Tuple[MultiAgentDict, MultiAgentDict, MultiAgentDict, MultiAgentDict],
         state: EnvState,
         action: Action,
     ) -> None:
-        agent_state = self._current_agent.translate_state(state)
-        agent_prev_state = self._current_agent.translate_state(
-            self._prev_state  # type: ignore
-        )
+        agent_state = self._translate_state(state)
+        agent_prev_state = self._translate_state(self._prev_state)  # type: ignore
 
         obs, reward, done, info = result
-        obs[self._current_agent_id] = self._current_agent.encode_observation(
-            agent_state
-        )
+        obs[self._current_agent_id] = self._encode_observation(agent_state)
         reward[self._current_agent_id] = self._current_agent.calculate_reward(
             agent_prev_state, action, agent_state
         )
         done[self._current_agent_id] = self._current_agent.has_done(agent_state)
-        info[self._current_agent_id] = self._current_agent.info(
-            agent_prev_state, action, agent_state
+        info_mode = self._options["info"]
+        if info_mode == INFO_NONE:
+            return
+        agent_info = partial(
+            self._current_agent.info, agent_prev_state, action, agent_state
         )
-        info["__common__"] = self.common_info(state)
+        common_info = partial(self.common_info, state)
+        if self._options["lazy_info"]:
+            info[self._current_agent_id] = LazyInfo(agent_info)
+            if info_mode == INFO_FULL:
+                info["__common__"] = LazyInfo(common_info)
+        else:
+            info[self._current_agent_id] = agent_info()
+            if info_mode == INFO_FULL:
+                info["__common__"] = common_info()
@@ -0,0 +1,65 @@
+from typing import Literal, TypedDict
+
+# Which parts of `info` are returned from `step`. They're computed during the step,
+# unless the `lazy_info` option is set.
+InfoMode = Literal["none", "agents", "full"]
+# No info at all.
+INFO_NONE: InfoMode = "none"
+# Infos of the agents, i.e. the results of `Agent.info`.
+INFO_AGENTS: InfoMode = "agents"
+# Infos of the agents and the common info under the "__common__" key.
+INFO_FULL: InfoMode = "full"
+INFO_MODES = (INFO_NONE, INFO_AGENTS, INFO_FULL)
+
+# How much `step` validates its inputs.
+StepMode = Literal["checked", "trusted"]
+# All assertions of the protocol and the legality checks of the agents are run.
+STEP_CHECKED: StepMode = "checked"
+# For policies known to output only legal actions. Skips the assertions and tells
+# the agents not to validate actions (see `Agent.validate_actions`). Environments
+# may skip their own legality checks in `env_step` too.
+STEP_TRUSTED: StepMode = "trusted"
+STEP_MODES = (STEP_CHECKED, STEP_TRUSTED)
+
+
+class EnvOptions(TypedDict, total=False):
+    # Records wall time and call counts of the agent, procedure and environment
+    # callbacks. See `HierarchicalEnv.stats`.
+    profile: bool
+    # Agents implementing `Agent.encode_observation_into` fill preallocated buffers
+    # instead of allocating new observations. Returned observations are then only
+    # valid until the next call to `step` or `reset`.
+    observation_buffers: bool
+    # See `InfoMode`.
+    info: InfoMode
+    # Infos are only computed once they're accessed (see `hrl.info.LazyInfo`), e.g.
+    # for sampling, which rarely reads them. `Agent.info` and `common_info` are then
+    # called after the step (possibly after later steps), so they must depend on
+    # their arguments only, and the infos keep the states alive until they're
+    # evaluated or dropped.
+    lazy_info: bool
+    # See `StepMode`.
+    step_mode: StepMode
+    # When the current agent has a single legal action (see `Agent.action_mask`),
+    # the environment executes it by itself and continues until an agent has
+    # a choice or the episode ends, so `step` returns only at decision points.
+    # Agents whose only legal action is always available must eventually be done.
+    autopilot: bool
+    # The discount of the rewards an agent receives after each of its automatic
+    # actions, usually the discount factor of its policy. The reward returned with
+    # the next observation of an agent is the discounted sum of the rewards since
+    # its last decision and the number of its automatic actions is added to its info
+    # under the "autopilot_steps" key, so the bootstrapped value can be discounted
+    # too (it's not reported in the "none" `info` mode).
+    autopilot_discount: float
+
+
+DEFAULTS: EnvOptions = {
+    "profile": False,
+    "observation_buffers": False,
+    "info": INFO_FULL,
+    "lazy_info": False,
+    "step_mode": STEP_CHECKED,
+    "autopilot": False,
+    "autopilot_discount": 1.0,
+}
@@ -38,3 +38,29 @@ class MissingProcedure(Exception):
             f"Cannot find any matching procedure for the agent `{agent.NAME}` "
             f"and the action `{action}`."
         )
+
+
+class UnsupportedSpace(Exception):
+    def __init__(self, space: Any):
+        super().__init__(f"The space `{space}` is not supported.")
+
+
+class EnvWorkerError(Exception):
+    def __init__(self, index: int, traceback: str):
+        super().__init__(
+            f"The environment in the worker {index} raised an exception:\n{traceback}"
+        )
+
+
+class UnsupportedRawAction(Exception):
+    def __init__(self, action: Any):
+        super().__init__(f"Only scalar raw actions can be recorded, got `{action}`.")
+
+
+class ReplayDivergence(Exception):
+    def __init__(self, episode: int, step: int, expected: str, actual: Any):
+        super().__init__(
+            f"The replay of the episode {episode} diverged at the step {step}: "
+            f"expected an action for agent `{expected}`, but the current agent "
+            f"is `{actual}`."
+        )
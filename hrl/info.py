@@ -0,0 +1,74 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class LazyInfo(Dict[str, Any]):
+    """
+    An info dict computed on the first access. Callbacks producing infos are often
+    expensive and the infos are mostly never read, e.g. when sampling.
+
+    It's pickled as a plain dict, so it doesn't keep any state of the environment alive
+    when sent to another process. Code reading the dict storage directly bypasses
+    the evaluation (e.g. `json.dumps` sees an empty dict), so convert it with
+    `dict(info)` first.
+    """
+
+    __slots__ = ("_compute",)
+
+    def __init__(self, compute: Callable[[], Dict[str, Any]]):
+        super().__init__()
+        self._compute: Optional[Callable[[], Dict[str, Any]]] = compute
+
+    @property
+    def computed(self) -> bool:
+        return self._compute is None
+
+    def _evaluate(self) -> None:
+        if self._compute is not None:
+            compute, self._compute = self._compute, None
+            dict.update(self, compute())
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        self._evaluate()
+        return dict, (dict(self.items()),)
+
+
+def _evaluating(name: str) -> Callable[..., Any]:
+    method = getattr(dict, name)
+
+    def evaluating(self: LazyInfo, *args: Any, **kwargs: Any) -> Any:
+        self._evaluate()
+        return method(self, *args, **kwargs)
+
+    evaluating.__name__ = name
+    evaluating.__doc__ = method.__doc__
+    return evaluating
+
+
+# All reads and writes evaluate the info first. Overriding `__iter__` also makes
+# `dict(info)` and `{**info}` go through these methods instead of reading the (still
+# empty) dict storage directly.
+for _name in (
+    "__getitem__",
+    "__iter__",
+    "__len__",
+    "__contains__",
+    "__eq__",
+    "__ne__",
+    "__or__",
+    "__repr__",
+    "__reversed__",
+    "__setitem__",
+    "__delitem__",
+    "__ior__",
+    "get",
+    "keys",
+    "items",
+    "values",
+    "copy",
+    "pop",
+    "popitem",
+    "setdefault",
+    "update",
+    "clear",
+):
+    setattr(LazyInfo, _name, _evaluating(_name))
@@ -0,0 +1,284 @@
+import multiprocessing as mp
+import traceback
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from gym import Space  # type: ignore
+from ray.rllib.utils.typing import MultiAgentDict
+
+from hrl import spaces
+from hrl.agent import AgentName
+from hrl.env import AgentId, HierarchicalEnv, agent_name
+from hrl.exceptions import EnvWorkerError
+from hrl.vector_env import EnvIndex, VectorStepResult
+
+EnvCreator = Callable[[EnvIndex], HierarchicalEnv[Any, Any, Any]]
+
+# Observations written into shared memory are sent as `AgentName`s, the remaining
+# ones (e.g. a second observation of the same agent within a step) are sent as is.
+ObsRefs = Dict[AgentId, AgentName]
+ObsFallback = MultiAgentDict
+
+_RESET = "reset"
+_STEP = "step"
+_CLOSE = "close"
+_ERROR = "error"
+
+
+class SubprocessEnvPool:
+    """
+    Hosts hierarchical environments in worker processes, one environment per process,
+    so many of them can be stepped in parallel without being bound by the GIL.
+
+    Observations are written by the workers into shared memory buffers shaped from
+    the agents' observation spaces (one buffer per agent per environment), so they're
+    never pickled. Only actions, rewards, dones and infos travel over the pipes.
+
+    The observations returned by `vector_reset` and `vector_step` are views into the
+    shared memory. They stay valid only until the next call for the same environment,
+    so copy them if they need to be kept around. They must be released before
+    the pool is closed.
+
+    The `env_creator` has to be picklable, if a start method other than "fork" is used.
+
+    When an environment raises, its worker stops and `EnvWorkerError` is raised once
+    the replies of all the other workers have been received, so they stay in sync.
+    Any later call involving the failed worker raises the same error.
+    """
+
+    def __init__(
+        self,
+        env_creator: EnvCreator,
+        num_envs: int,
+        start_method: Optional[str] = None,
+    ):
+        assert num_envs > 0, "There should be at least one sub-environment."
+        context = mp.get_context(start_method)
+        self._connections: List[Connection] = []
+        self._processes: List[mp.process.BaseProcess] = []
+        self._memories: List[SharedMemory] = []
+        self._observations: List[Dict[AgentName, Any]] = []
+        self._current_agent_ids: List[Optional[AgentId]] = [None] * num_envs
+        # Errors of the workers, which have stopped.
+        self._errors: Dict[EnvIndex, EnvWorkerError] = {}
+        self._closed = False
+        try:
+            self._start_workers(context, env_creator, num_envs)
+        except BaseException:
+            self._abort()
+            raise
+
+    def _start_workers(
+        self, context: Any, env_creator: EnvCreator, num_envs: int
+    ) -> None:
+        for index in range(num_envs):
+            parent_connection, worker_connection = context.Pipe()
+            process = context.Process(
+                target=_worker,
+                args=(index, env_creator, worker_connection),
+                daemon=True,
+            )
+            process.start()
+            worker_connection.close()
+            self._connections.append(parent_connection)
+            self._processes.append(process)
+
+        for index, connection in enumerate(self._connections):
+            observation_spaces: Dict[AgentName, Space] = self._receive(index)
+            self._raise_errors([index])
+            memories = {
+                name: SharedMemory(create=True, size=max(spaces.nbytes(space), 1))
+                for name, space in observation_spaces.items()
+            }
+            self._memories += memories.values()
+            self._observations.append(
+                {
+                    name: spaces.allocate(space, memories[name].buf)
+                    for name, space in observation_spaces.items()
+                }
+            )
+            connection.send({name: memory.name for name, memory in memories.items()})
+
+    @property
+    def num_envs(self) -> int:
+        return len(self._connections)
+
+    @property
+    def current_agent_ids(self) -> List[Optional[AgentId]]:
+        return list(self._current_agent_ids)
+
+    def vector_reset(self) -> List[MultiAgentDict]:
+        indices = range(self.num_envs)
+        self._send(indices, [(_RESET, None)] * self.num_envs)
+        messages = [self._receive(index) for index in indices]
+        obs = [
+            self._reset_result(index, message)
+            for index, message in zip(indices, messages)
+            if index not in self._errors
+        ]
+        self._raise_errors(indices)
+        return obs
+
+    def reset_at(self, index: EnvIndex) -> MultiAgentDict:
+        self._send([index], [(_RESET, None)])
+        message = self._receive(index)
+        self._raise_errors([index])
+        return self._reset_result(index, message)
+
+    def step_async(self, actions: Sequence[MultiAgentDict]) -> None:
+        assert (
+            len(actions) == self.num_envs
+        ), f"Expected actions for all {self.num_envs} sub-environments."
+        self._send(
+            range(self.num_envs), [(_STEP, action_dict) for action_dict in actions]
+        )
+
+    def step_wait(self) -> VectorStepResult:
+        obs, rewards, dones, infos = [], [], [], []
+        indices = range(self.num_envs)
+        # All the replies are received before an error is raised, so none of them is
+        # left to be mistaken for the reply to a later command.
+        messages = [self._receive(index) for index in indices]
+        for index, message in zip(indices, messages):
+            if index in self._errors:
+                continue
+            refs, fallback, reward, done, info, agent_id = message
+            obs.append(self._observations_from_refs(index, refs, fallback))
+            rewards.append(reward)
+            dones.append(done)
+            infos.append(info)
+            self._current_agent_ids[index] = agent_id
+        self._raise_errors(indices)
+        return obs, rewards, dones, infos
+
+    def vector_step(self, actions: Sequence[MultiAgentDict]) -> VectorStepResult:
+        self.step_async(actions)
+        return self.step_wait()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        for connection in self._connections:
+            try:
+                connection.send((_CLOSE, None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join()
+        self._release_memories()
+
+    def __enter__(self) -> "SubprocessEnvPool":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _abort(self) -> None:
+        # Cleans up after a failed start, when the workers may not be able to
+        # respond to the close command.
+        self._closed = True
+        for connection in self._connections:
+            connection.close()
+        for process in self._processes:
+            process.terminate()
+            process.join()
+        self._release_memories()
+
+    def _release_memories(self) -> None:
+        # Views into the memory have to be released before it's closed.
+        self._observations = []
+        for memory in self._memories:
+            memory.close()
+            memory.unlink()
+        self._memories = []
+
+    def _reset_result(self, index: EnvIndex, message: Any) -> MultiAgentDict:
+        refs, fallback, agent_id = message
+        self._current_agent_ids[index] = agent_id
+        return self._observations_from_refs(index, refs, fallback)
+
+    def _send(self, indices: Sequence[EnvIndex], messages: Sequence[Any]) -> None:
+        self._raise_errors(indices)
+        for index, message in zip(indices, messages):
+            self._connections[index].send(message)
+
+    def _raise_errors(self, indices: Sequence[EnvIndex]) -> None:
+        for index in indices:
+            if index in self._errors:
+                raise self._errors[index]
+
+    def _receive(self, index: EnvIndex) -> Any:
+        message = self._connections[index].recv()
+        if isinstance(message, tuple) and message and message[0] == _ERROR:
+            self._errors[index] = EnvWorkerError(index, message[1])
+        return message
+
+    def _observations_from_refs(
+        self, index: EnvIndex, refs: ObsRefs, fallback: ObsFallback
+    ) -> MultiAgentDict:
+        observations = self._observations[index]
+        obs = {agent_id: observations[name] for agent_id, name in refs.items()}
+        obs.update(fallback)
+        return obs
+
+
+def _worker(index: EnvIndex, env_creator: EnvCreator, connection: Connection) -> None:
+    memories: List[SharedMemory] = []
+    observations: Dict[AgentName, Any] = {}
+    try:
+        env = env_creator(index)
+        observation_spaces = {
+            name: agent.observation_space(env._agent_configs[name], env._config)
+            for name, agent in env._agents.items()
+        }
+        connection.send(observation_spaces)
+        memory_names: Dict[AgentName, str] = connection.recv()
+        for name, space in observation_spaces.items():
+            # The worker shares the resource tracker with the parent process, which
+            # owns the memory and unlinks it on `close`.
+            memory = SharedMemory(name=memory_names[name])
+            memories.append(memory)
+            observations[name] = spaces.allocate(space, memory.buf)
+
+        while True:
+            command, data = connection.recv()
+            if command == _RESET:
+                refs, fallback = _write_observations(env, observations, env.reset())
+                connection.send((refs, fallback, env._current_agent_id))
+            elif command == _STEP:
+                obs, reward, done, info = env.step(data)
+                refs, fallback = _write_observations(env, observations, obs)
+                connection.send(
+                    (refs, fallback, reward, done, info, env._current_agent_id)
+                )
+            elif command == _CLOSE:
+                break
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        connection.send((_ERROR, traceback.format_exc()))
+    finally:
+        # Views into the memory have to be released before it's closed.
+        observations.clear()
+        for memory in memories:
+            memory.close()
+        connection.close()
+
+
+def _write_observations(
+    env: HierarchicalEnv[Any, Any, Any],
+    observations: Dict[AgentName, Any],
+    obs: MultiAgentDict,
+) -> Tuple[ObsRefs, ObsFallback]:
+    refs: ObsRefs = {}
+    fallback: ObsFallback = {}
+    for agent_id, agent_obs in obs.items():
+        name = agent_name(agent_id)
+        if name in refs.values():
+            fallback[agent_id] = agent_obs
+        else:
+            spaces.write(observations[name], agent_obs)
+            refs[agent_id] = name
+    return refs, fallback
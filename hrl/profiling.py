@@ -0,0 +1,89 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Dict, TypeVar
+
+Callback = TypeVar("Callback", bound=Callable[..., Any])
+
+OwnerKind = str
+OwnerName = str
+CallbackName = str
+
+AGENTS: OwnerKind = "agents"
+PROCEDURES: OwnerKind = "procedures"
+ENV: OwnerKind = "env"
+
+
+@dataclass
+class CallbackStats:
+    calls: int = 0
+    total_time: float = 0.0
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+Stats = Dict[OwnerKind, Dict[OwnerName, Dict[CallbackName, CallbackStats]]]
+
+
+class Profiler:
+    """
+    Collects wall time and call counts of wrapped callbacks, grouped by the kind of
+    the callback owner (an agent, a procedure or the environment itself), its name
+    and the callback name.
+    """
+
+    def __init__(self) -> None:
+        self._stats: Stats = defaultdict(
+            lambda: defaultdict(lambda: defaultdict(CallbackStats))
+        )
+
+    def wrap(
+        self,
+        kind: OwnerKind,
+        owner: OwnerName,
+        name: CallbackName,
+        callback: Callback,
+    ) -> Callback:
+        stats = self._stats[kind][owner][name]
+
+        @wraps(callback)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = perf_counter()
+            try:
+                return callback(*args, **kwargs)
+            finally:
+                stats.total_time += perf_counter() - start
+                stats.calls += 1
+
+        return wrapper  # type: ignore
+
+    def instrument(
+        self, kind: OwnerKind, owner: OwnerName, obj: Any, *names: CallbackName
+    ) -> None:
+        """
+        Replaces the given methods of `obj` with their profiled versions.
+        """
+        for name in names:
+            setattr(obj, name, self.wrap(kind, owner, name, getattr(obj, name)))
+
+    def stats(self) -> Stats:
+        return {
+            kind: {
+                owner: {
+                    name: CallbackStats(stats.calls, stats.total_time)
+                    for name, stats in callbacks.items()
+                }
+                for owner, callbacks in owners.items()
+            }
+            for kind, owners in self._stats.items()
+        }
+
+    def reset(self) -> None:
+        for owners in self._stats.values():
+            for callbacks in owners.values():
+                for stats in callbacks.values():
+                    stats.calls = 0
+                    stats.total_time = 0.0
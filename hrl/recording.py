@@ -0,0 +1,362 @@
+import json
+import math
+import os
+from bisect import bisect_right
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple
+
+import numpy as np
+from gym.spaces import Discrete, MultiBinary, MultiDiscrete  # type: ignore
+from ray.rllib.utils.typing import MultiAgentDict
+
+from hrl.action import ProcedureRequest, SwitchAgent
+from hrl.agent import ActionTrigger, AgentName
+from hrl.env import AgentId, HierarchicalEnv, agent_name
+from hrl.exceptions import ReplayDivergence, UnsupportedRawAction
+
+FORMAT_VERSION = 2
+
+# One row per step. Each column is stored in its own append-only file per shard, so
+# it can be memory-mapped independently.
+COLUMNS: Dict[str, np.dtype] = {
+    # Index of the name of the acting agent in the `agents` list of the metadata.
+    "agent": np.dtype(np.uint16),
+    # The counter of the acting agent, i.e. the number in its agent ID.
+    "agent_index": np.dtype(np.uint32),
+    # The raw action of the acting agent.
+    "action": np.dtype(np.float64),
+    # The reward of the acting agent, or NaN if it switched to another agent.
+    "reward": np.dtype(np.float32),
+    # The reward of the agent which took control in the step, or NaN.
+    "next_reward": np.dtype(np.float32),
+    # Index of the executed procedure in the `procedures` list, or `NO_PROCEDURE`.
+    "procedure": np.dtype(np.uint16),
+    "flags": np.dtype(np.uint8),
+}
+# The rows are buffered as records, one store per step.
+ROW_DTYPE = np.dtype(list(COLUMNS.items()))
+# Start rows of the episodes within a shard.
+EPISODES = "episodes"
+EPISODES_DTYPE = np.dtype(np.uint64)
+
+NO_PROCEDURE = np.iinfo(np.uint16).max
+
+AGENT_DONE = 1
+EPISODE_DONE = 2
+AGENT_SWITCH = 4
+PROCEDURE_CALL = 8
+
+# Options of the environment stored in the metadata, which affect the recorded steps
+# (e.g. `autopilot` skips the steps with a single legal action).
+RECORDED_OPTIONS = ("autopilot", "autopilot_discount", "info", "step_mode")
+
+META_FILE = "meta.json"
+SHARD_PREFIX = "shard_"
+
+StepResult = Tuple[MultiAgentDict, MultiAgentDict, MultiAgentDict, MultiAgentDict]
+
+
+class EpisodeRecorder:
+    """
+    Wraps a hierarchical environment and records its episodes (raw actions per agent,
+    agent switches, procedure calls and rewards) into binary shards stored in
+    the `directory`. Each shard contains at most `steps_per_shard` steps (rounded up
+    to a whole episode) and stores each column in a separate append-only file.
+
+    Rows are collected in a preallocated buffer and written out every `buffer_size`
+    steps. The codes of the agent IDs and of the procedures triggered by the action
+    types are cached, so recording adds only a little overhead to stepping
+    the environment (see the `EpisodeRecorder` benchmark).
+    Call `close` (or use the recorder as a context manager) to flush the buffers.
+    """
+
+    def __init__(
+        self,
+        env: HierarchicalEnv[Any, Any, Any],
+        directory: str,
+        steps_per_shard: int = 1_000_000,
+        buffer_size: int = 4096,
+    ):
+        self.env = env
+        self._directory = directory
+        self._steps_per_shard = steps_per_shard
+
+        self._agents = sorted(env.agents)
+        self._agent_codes = {name: code for code, name in enumerate(self._agents)}
+        self._procedures = sorted(env.procedures)
+        self._procedure_codes = {
+            name: code for code, name in enumerate(self._procedures)
+        }
+        # (agent code, agent index) per agent ID.
+        self._agent_id_codes: Dict[AgentId, Tuple[int, int]] = {}
+        # Procedure codes per (agent name, action type). Triggers other than
+        # `ActionTrigger`s may depend on the action itself, so they aren't cached.
+        self._action_procedure_codes: Dict[Tuple[AgentName, type], int] = {}
+        self._cache_procedure_codes = all(
+            isinstance(trigger, ActionTrigger)
+            for trigger, _ in env.procedures_on_action
+        )
+        self._write_meta()
+
+        self._buffer = np.empty(buffer_size, dtype=ROW_DTYPE)
+        self._buffered_rows = 0
+        self._shard_rows = 0
+        self._shard = len(_shard_directories(directory))
+        self._files: Dict[str, BinaryIO] = {}
+        self._open_shard()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.env, name)
+
+    def reset(self) -> MultiAgentDict:
+        if self._shard_rows >= self._steps_per_shard:
+            self._close_shard()
+            self._shard += 1
+            self._open_shard()
+        self._files[EPISODES].write(
+            np.array(self._shard_rows, dtype=EPISODES_DTYPE).tobytes()
+        )
+        return self.env.reset()
+
+    def step(self, action_dict: MultiAgentDict) -> StepResult:
+        agent_id = self.env._current_agent_id
+        result = self.env.step(action_dict)
+        obs, reward, done, info = result
+
+        codes = self._agent_id_codes.get(agent_id)
+        if codes is None:
+            codes = self._agent_id_codes[agent_id] = self._agent_id_code(agent_id)
+        agent_code, agent_index = codes
+        try:
+            raw_action = float(action_dict[agent_id])
+        except TypeError:
+            raise UnsupportedRawAction(action_dict[agent_id])
+        # The action decoded from the `action_dict`, even if the `autopilot` option
+        # executed other actions after it.
+        action = self.env._last_action
+        flags = 0
+        if done.get(agent_id, False):
+            flags |= AGENT_DONE
+        if done["__all__"]:
+            flags |= EPISODE_DONE
+        if isinstance(action, SwitchAgent):
+            flags |= AGENT_SWITCH
+        procedure = NO_PROCEDURE
+        if isinstance(action, ProcedureRequest):
+            flags |= PROCEDURE_CALL
+            procedure = self._procedure_code(self._agents[agent_code], action)
+        next_reward = math.nan
+        for other_agent_id, other_reward in reward.items():
+            if other_agent_id != agent_id:
+                next_reward = other_reward
+
+        self._buffer[self._buffered_rows] = (
+            agent_code,
+            agent_index,
+            raw_action,
+            reward.get(agent_id, math.nan),
+            next_reward,
+            procedure,
+            flags,
+        )
+        self._buffered_rows += 1
+        self._shard_rows += 1
+        if self._buffered_rows == len(self._buffer):
+            self.flush()
+
+        return result
+
+    def flush(self) -> None:
+        rows = self._buffer[: self._buffered_rows]
+        for name in COLUMNS:
+            self._files[name].write(rows[name].tobytes())
+        self._buffered_rows = 0
+        for file in self._files.values():
+            file.flush()
+
+    def close(self) -> None:
+        if self._files:
+            self._close_shard()
+
+    def __enter__(self) -> "EpisodeRecorder":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _agent_id_code(self, agent_id: AgentId) -> Tuple[int, int]:
+        name = agent_name(agent_id)
+        return self._agent_codes[name], int(agent_id[len(name) + 1 :])  # type: ignore
+
+    def _procedure_code(self, name: AgentName, action: ProcedureRequest) -> int:
+        # Matched for the acting agent, the current one may have changed since.
+        key = name, type(action)
+        try:
+            return self._action_procedure_codes[key]
+        except KeyError:
+            pass
+        code = self._procedure_codes[
+            self.env._procedures_on_action_table.match(name, action)
+        ]
+        if self._cache_procedure_codes:
+            self._action_procedure_codes[key] = code
+        return code
+
+    def _write_meta(self) -> None:
+        agent_configs = self.env._agent_configs
+        meta = {
+            "version": FORMAT_VERSION,
+            "columns": {name: dtype.str for name, dtype in COLUMNS.items()},
+            "agents": self._agents,
+            "procedures": self._procedures,
+            "options": {key: self.env._options[key] for key in RECORDED_OPTIONS},
+            "integer_actions": {
+                name: isinstance(
+                    agent.action_space(agent_configs[name], self.env._config),
+                    (Discrete, MultiBinary, MultiDiscrete),
+                )
+                for name, agent in self.env._agents.items()
+            },
+        }
+        os.makedirs(self._directory, exist_ok=True)
+        path = os.path.join(self._directory, META_FILE)
+        if os.path.exists(path):
+            with open(path) as file:
+                assert json.load(file) == meta, (
+                    f"The directory `{self._directory}` contains recordings "
+                    "of a different environment."
+                )
+            return
+        with open(path, "w") as file:
+            json.dump(meta, file, indent=2)
+
+    def _open_shard(self) -> None:
+        directory = _shard_directory(self._directory, self._shard)
+        os.makedirs(directory)
+        self._files = {
+            name: open(os.path.join(directory, f"{name}.bin"), "ab")
+            for name in [*COLUMNS, EPISODES]
+        }
+        self._shard_rows = 0
+
+    def _close_shard(self) -> None:
+        self.flush()
+        for file in self._files.values():
+            file.close()
+        self._files = {}
+
+
+class EpisodeReplayer:
+    """
+    Reads episodes recorded by `EpisodeRecorder`. Columns are memory-mapped, so
+    seeking to an episode doesn't require reading any of the earlier ones.
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, META_FILE)) as file:
+            self._meta = json.load(file)
+        assert self._meta["version"] == FORMAT_VERSION
+        self._columns = {
+            name: np.dtype(dtype) for name, dtype in self._meta["columns"].items()
+        }
+        self._shards = _shard_directories(directory)
+        self._episodes = [
+            _memmap(os.path.join(shard, f"{EPISODES}.bin"), EPISODES_DTYPE)
+            for shard in self._shards
+        ]
+        self._first_episodes = np.cumsum(
+            [0] + [len(episodes) for episodes in self._episodes]
+        ).tolist()
+        self._shard_columns: Dict[int, Dict[str, np.ndarray]] = {}
+
+    @property
+    def num_episodes(self) -> int:
+        return self._first_episodes[-1]
+
+    @property
+    def agents(self) -> List[str]:
+        return self._meta["agents"]
+
+    @property
+    def procedures(self) -> List[str]:
+        return self._meta["procedures"]
+
+    @property
+    def options(self) -> Dict[str, Any]:
+        """
+        The options of the recording environment (see `RECORDED_OPTIONS`).
+        """
+        return self._meta["options"]
+
+    def episode(self, index: int) -> Dict[str, np.ndarray]:
+        """
+        Returns the (memory-mapped) columns of the episode with the given `index`.
+        """
+        if not 0 <= index < self.num_episodes:
+            raise IndexError(f"There is no episode {index}.")
+        shard = bisect_right(self._first_episodes, index) - 1
+        local_index = index - self._first_episodes[shard]
+        episodes = self._episodes[shard]
+        columns = self._columns_of_shard(shard)
+        start = int(episodes[local_index])
+        if local_index + 1 < len(episodes):
+            end = int(episodes[local_index + 1])
+        else:
+            end = len(columns["flags"])
+        return {name: column[start:end] for name, column in columns.items()}
+
+    def replay(
+        self, env: HierarchicalEnv[Any, Any, Any], index: int
+    ) -> Iterator[StepResult]:
+        """
+        Re-drives the `env` with the actions of the episode with the given `index`,
+        yielding the step results. The environment has to be deterministic and
+        created with the same `autopilot` option as the recording one.
+        """
+        assert env._options["autopilot"] == self.options["autopilot"], (
+            "The autopilot option of the environment doesn't match the recording, "
+            "so the agents wouldn't act in the same steps."
+        )
+        columns = self.episode(index)
+        integer_actions = self._meta["integer_actions"]
+        env.reset()
+        for step, (code, agent_index, raw_action) in enumerate(
+            zip(columns["agent"], columns["agent_index"], columns["action"])
+        ):
+            name = self.agents[code]
+            agent_id = f"{name}_{agent_index}"
+            if env._current_agent_id != agent_id:
+                raise ReplayDivergence(index, step, agent_id, env._current_agent_id)
+            action: Any = int(raw_action) if integer_actions[name] else raw_action
+            yield env.step({agent_id: action})
+
+    def _columns_of_shard(self, shard: int) -> Dict[str, np.ndarray]:
+        try:
+            return self._shard_columns[shard]
+        except KeyError:
+            pass
+        columns = self._shard_columns[shard] = {
+            name: _memmap(os.path.join(self._shards[shard], f"{name}.bin"), dtype)
+            for name, dtype in self._columns.items()
+        }
+        return columns
+
+
+def _shard_directory(directory: str, shard: int) -> str:
+    return os.path.join(directory, f"{SHARD_PREFIX}{shard:05d}")
+
+
+def _shard_directories(directory: str) -> List[str]:
+    if not os.path.isdir(directory):
+        return []
+    return [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.startswith(SHARD_PREFIX)
+    ]
+
+
+def _memmap(path: str, dtype: np.dtype) -> np.ndarray:
+    # Empty files can't be memory-mapped.
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
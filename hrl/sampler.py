@@ -0,0 +1,196 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from ray.rllib.utils.typing import MultiAgentDict
+
+from hrl.env import AgentId, agent_name
+from hrl.spaces import stack
+from hrl.vector_env import EnvCreator, EnvIndex, VectorHierarchicalEnv
+
+PolicyId = str
+# Takes a batch of observations (stacked along the first axis, keeping the structure
+# of a single observation) and returns a batch of raw actions.
+Policy = Callable[[Any], np.ndarray]
+PolicyMapping = Callable[[AgentId], PolicyId]
+
+
+@dataclass(frozen=True)
+class TrajectoryBatch:
+    """
+    Transitions of all agents mapped to a policy. Transitions of an agent are kept
+    in order, interleaved with the ones of other agents and environments.
+    """
+
+    # Observations stacked like the inputs of the policy.
+    obs: Any
+    actions: np.ndarray
+    # The rewards received after the actions, until the next action of the agent.
+    rewards: np.ndarray
+    # Whether the agent (or the whole episode) was done after the action.
+    dones: np.ndarray
+    # Unique ids of the episodes of the transitions.
+    episodes: np.ndarray
+    agent_ids: List[AgentId]
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+
+@dataclass
+class _Transition:
+    obs: Any
+    action: Any
+    episode: int
+    reward: float = 0.0
+
+
+class LocalSampler:
+    """
+    Collects experience from `num_envs` hierarchical environments stepped in the
+    current process, without Ray workers or serialization.
+
+    At every step, the environments whose current agents map to the same policy are
+    batched together, so each policy runs once per step (for all the environments).
+    Procedure requests are batched by `VectorHierarchicalEnv`.
+
+    By default, agents are mapped to the policies named like them (see
+    `hrl.env.agent_name`). Unlike the `agent_id.split("_")[0]` mapping of `train.py`,
+    it keeps the underscores within agent names, pass `policy_mapping` to map them
+    differently.
+
+    Examples:
+        >>> sampler = LocalSampler(
+        ...     lambda index: MazeEnv(common_config, agent_configs),
+        ...     num_envs=64,
+        ...     policies={"strategy": strategy_policy, "motion": motion_policy},
+        ... )
+        ... batches = sampler.sample(10_000)
+        ... batches["strategy"].rewards.mean()
+    """
+
+    def __init__(
+        self,
+        env_creator: EnvCreator,
+        num_envs: int,
+        policies: Dict[PolicyId, Policy],
+        policy_mapping: Optional[PolicyMapping] = None,
+    ):
+        self.env = VectorHierarchicalEnv(env_creator, num_envs)
+        self._policies = policies
+        self._policy_mapping = policy_mapping or agent_name
+        # The latest observations of the agents in each environment.
+        self._obs: List[MultiAgentDict] = []
+        self._episodes: List[int] = []
+        self._next_episode = 0
+        # Actions waiting for their rewards, keyed by the environment and the agent.
+        self._pending: Dict[Tuple[EnvIndex, AgentId], _Transition] = {}
+
+    def sample(self, num_steps: int) -> Dict[PolicyId, TrajectoryBatch]:
+        """
+        Steps all environments `num_steps` times in total (rounded up to a multiple
+        of `num_envs`) and returns the completed transitions per policy. Episodes
+        continue across calls, transitions still waiting for their rewards are
+        returned by later calls.
+        """
+        if not self._obs:
+            self._obs = self.env.vector_reset()
+            self._episodes = [self._new_episode() for _ in range(self.env.num_envs)]
+        completed: Dict[PolicyId, List[Tuple[AgentId, _Transition, bool]]] = {
+            policy_id: [] for policy_id in self._policies
+        }
+        for _ in range(-(-num_steps // self.env.num_envs)):
+            actions = self._compute_actions()
+            obs, rewards, dones, _ = self.env.vector_step(actions)
+            for index in range(self.env.num_envs):
+                for agent_id, transition, done in self._process_step(
+                    index, obs[index], rewards[index], dones[index]
+                ):
+                    completed[self._policy_mapping(agent_id)].append(
+                        (agent_id, transition, done)
+                    )
+        return {
+            policy_id: _to_batch(transitions)
+            for policy_id, transitions in completed.items()
+        }
+
+    def _compute_actions(self) -> List[MultiAgentDict]:
+        agent_ids = self.env.current_agent_ids
+        groups: Dict[PolicyId, List[EnvIndex]] = {}
+        for index, agent_id in enumerate(agent_ids):
+            groups.setdefault(self._policy_mapping(agent_id), []).append(index)
+        actions: List[MultiAgentDict] = [{} for _ in agent_ids]
+        for policy_id, indices in groups.items():
+            obs = stack([self._obs[index][agent_ids[index]] for index in indices])
+            policy_actions = self._policies[policy_id](obs)
+            for position, index in enumerate(indices):
+                agent_id = agent_ids[index]
+                action = policy_actions[position]
+                actions[index] = {agent_id: action}
+                self._pending[index, agent_id] = _Transition(
+                    _index(obs, position), action, self._episodes[index]
+                )
+        return actions
+
+    def _process_step(
+        self,
+        index: EnvIndex,
+        obs: MultiAgentDict,
+        rewards: MultiAgentDict,
+        dones: MultiAgentDict,
+    ) -> List[Tuple[AgentId, _Transition, bool]]:
+        # Returns the transitions completed by the step, i.e. the ones of agents
+        # which got their next observation or were done.
+        completed = []
+        episode_done = dones["__all__"]
+        for agent_id, reward in rewards.items():
+            transition = self._pending.get((index, agent_id))
+            if transition is not None:
+                transition.reward += reward
+        for agent_id in obs:
+            transition = self._pending.pop((index, agent_id), None)
+            if transition is not None:
+                done = episode_done or dones.get(agent_id, False)
+                completed.append((agent_id, transition, done))
+        if episode_done:
+            for key in [key for key in self._pending if key[0] == index]:
+                completed.append((key[1], self._pending.pop(key), True))
+            self._obs[index] = self.env.reset_at(index)
+            self._episodes[index] = self._new_episode()
+        else:
+            self._obs[index].update(obs)
+        return completed
+
+    def _new_episode(self) -> int:
+        self._next_episode += 1
+        return self._next_episode - 1
+
+
+def _index(stacked: Any, position: int) -> Any:
+    if isinstance(stacked, dict):
+        return {key: _index(value, position) for key, value in stacked.items()}
+    return stacked[position]
+
+
+def _to_batch(transitions: List[Tuple[AgentId, _Transition, bool]]) -> TrajectoryBatch:
+    if not transitions:
+        return TrajectoryBatch(
+            None,
+            np.empty(0),
+            np.empty(0, dtype=np.float32),
+            np.empty(0, dtype=np.bool_),
+            np.empty(0, dtype=np.int64),
+            [],
+        )
+    return TrajectoryBatch(
+        stack([transition.obs for _, transition, _ in transitions]),
+        np.array([transition.action for _, transition, _ in transitions]),
+        np.array(
+            [transition.reward for _, transition, _ in transitions], dtype=np.float32
+        ),
+        np.array([done for _, _, done in transitions], dtype=np.bool_),
+        np.array(
+            [transition.episode for _, transition, _ in transitions], dtype=np.int64
+        ),
+        [agent_id for agent_id, _, _ in transitions],
+    )
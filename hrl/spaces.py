@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from gym import Space  # type: ignore
+from gym.spaces import Box, Dict, Discrete, MultiBinary, MultiDiscrete  # type: ignore
+
+from hrl.exceptions import UnsupportedSpace
+
+# Offsets of the arrays are aligned, so each of them can be safely viewed with its
+# own dtype.
+ALIGNMENT = 8
+
+Leaf = Tuple[Tuple[str, ...], Tuple[int, ...], np.dtype]
+
+
+def leaves(space: Space) -> List[Leaf]:
+    """
+    Lists (key path, shape, dtype) of all arrays an observation of the `space` consists
+    of. Dict spaces are traversed in their keys order.
+    """
+    if isinstance(space, Dict):
+        return [
+            ((key, *path), shape, dtype)
+            for key, subspace in space.spaces.items()
+            for path, shape, dtype in leaves(subspace)
+        ]
+    if isinstance(space, (Box, MultiBinary, MultiDiscrete, Discrete)):
+        return [((), tuple(space.shape), np.dtype(space.dtype))]
+    raise UnsupportedSpace(space)
+
+
+class Layout:
+    """
+    Describes how observations of the `space` are laid out in memory, so arrays
+    matching it can be allocated repeatedly without inspecting the space again.
+    Dict spaces are represented by ordered dicts of arrays.
+    """
+
+    def __init__(self, space: Space):
+        self._leaves: List[Tuple[Tuple[str, ...], Tuple[int, ...], np.dtype, int]] = []
+        offset = 0
+        for path, shape, dtype in leaves(space):
+            offset = _align(offset)
+            self._leaves.append((path, shape, dtype, offset))
+            offset += int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        self.nbytes = offset
+
+    def allocate(self, buffer: Optional[memoryview] = None) -> Any:
+        """
+        Allocates arrays matching the space. If the `buffer` is given (e.g. a shared
+        memory), the arrays are views into it.
+        """
+        if buffer is not None:
+            assert len(buffer) >= self.nbytes, "The buffer is too small for the space."
+        result: Any = None
+        for path, shape, dtype, offset in self._leaves:
+            if buffer is None:
+                array = np.empty(shape, dtype=dtype)
+            else:
+                array = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            result = _insert(result, path, array)
+        return result
+
+
+def nbytes(space: Space) -> int:
+    return Layout(space).nbytes
+
+
+def allocate(space: Space, buffer: Optional[memoryview] = None) -> Any:
+    return Layout(space).allocate(buffer)
+
+
+def write(arrays: Any, value: Any) -> None:
+    """
+    Copies the `value` (an observation) into `arrays` created by `allocate`.
+    """
+    if isinstance(arrays, dict):
+        for key, array in arrays.items():
+            write(array, value[key])
+    else:
+        np.copyto(arrays, value, casting="unsafe")
+
+
+def stack(observations: Sequence[Any]) -> Any:
+    """
+    Stacks the `observations` along a new first axis, keeping the structure of (nested)
+    dicts.
+    """
+    if isinstance(observations[0], dict):
+        return OrderedDict(
+            (key, stack([observation[key] for observation in observations]))
+            for key in observations[0]
+        )
+    return np.stack(observations)
+
+
+def _insert(result: Any, path: Tuple[str, ...], array: np.ndarray) -> Any:
+    if not path:
+        return array
+    if result is None:
+        result = OrderedDict()
+    key, *rest = path
+    result[key] = _insert(result.get(key), tuple(rest), array)
+    return result
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
@@ -0,0 +1,315 @@
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+
+import numpy as np
+from ray.rllib.env import BaseEnv
+from ray.rllib.utils.typing import MultiAgentDict, MultiEnvDict
+
+from hrl.action import ProcedureRequest
+from hrl.agent import AgentName
+from hrl.env import AgentId, HierarchicalEnv, agent_name
+from hrl.env_types import EnvCommonInfo, EnvConfig, EnvState
+from hrl.procedure import Procedure
+from hrl.spaces import stack
+
+EnvIndex = int
+EnvCreator = Callable[[EnvIndex], HierarchicalEnv[EnvConfig, EnvState, EnvCommonInfo]]
+
+StepResult = Tuple[MultiAgentDict, MultiAgentDict, MultiAgentDict, MultiAgentDict]
+VectorStepResult = Tuple[
+    List[MultiAgentDict],
+    List[MultiAgentDict],
+    List[MultiAgentDict],
+    List[MultiAgentDict],
+]
+
+
+@dataclass(frozen=True)
+class AgentBatch:
+    """
+    Outputs of the agents of one name from all sub-environments stepped at once, one
+    row per agent which got an observation.
+    """
+
+    # Indices of the sub-environments of the rows.
+    env_indices: np.ndarray
+    agent_ids: List[AgentId]
+    # Observations stacked along the first axis (see `hrl.spaces.stack`).
+    obs: Any
+    rewards: np.ndarray
+    dones: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.env_indices)
+
+
+# Outputs batched per agent name, whether the episodes of the sub-environments are
+# done and the stacked observations of the current agents per agent name.
+BatchedStepResult = Tuple[Dict[AgentName, AgentBatch], np.ndarray, Dict[AgentName, Any]]
+
+
+class VectorHierarchicalEnv(BaseEnv, Generic[EnvConfig, EnvState, EnvCommonInfo]):
+    """
+    Owns `num_envs` independent episodes of a hierarchical environment and steps all
+    of them in a single call. Every sub-episode keeps its own agent switching and
+    `transitions_on_done` semantics, so the per-episode outputs are exactly the same
+    as the ones of a standalone `HierarchicalEnv`.
+
+    `batch_step` takes the actions and returns the outputs batched per agent name, so
+    a policy is called once for all sub-environments and its inputs are already
+    stacked. Procedure requests of all sub-environments are executed in batches
+    (see `Procedure.execute_batch`). The rest of a step is still run for each
+    sub-environment, so the gain comes from fewer policy calls and batched
+    procedures rather than from fewer environment callbacks.
+
+    `vector_step` returns lists of per-episode dicts aligned with the sub-environment
+    index instead (similarly to RLlib's `VectorEnv`). The class also implements
+    RLlib's `BaseEnv` interface, so it can be returned from an env creator and used
+    with `num_envs_per_worker` semantics handled here instead of by RLlib.
+
+    Examples:
+        >>> env = VectorHierarchicalEnv(
+        ...     lambda index: MazeEnv(common_config, agent_configs), num_envs=8
+        ... )
+        ... obs = env.vector_reset()
+        ... actions = [{agent_id: 0} for agent_id in env.current_agent_ids]
+        ... obs, rewards, dones, infos = env.vector_step(actions)
+
+        >>> obs = env.batch_reset()
+        ... actions = {name: policies[name](obs[name]) for name in obs}
+        ... batches, episode_dones, obs = env.batch_step(actions)
+    """
+
+    def __init__(self, env_creator: EnvCreator, num_envs: int):
+        assert num_envs > 0, "There should be at least one sub-environment."
+        self._envs = [env_creator(index) for index in range(num_envs)]
+        # Observations not yet consumed by `poll`, keyed by the sub-environment index.
+        self._pending: Dict[EnvIndex, StepResult] = {}
+
+    @classmethod
+    def from_env_class(
+        cls,
+        env_cls: Type[HierarchicalEnv[EnvConfig, EnvState, EnvCommonInfo]],
+        config: EnvConfig,
+        agent_configs: Dict[AgentName, Any],
+        num_envs: int,
+    ) -> "VectorHierarchicalEnv[EnvConfig, EnvState, EnvCommonInfo]":
+        return cls(lambda _: env_cls(config, agent_configs), num_envs)
+
+    @property
+    def num_envs(self) -> int:
+        return len(self._envs)
+
+    @property
+    def current_agent_ids(self) -> List[Optional[AgentId]]:
+        """
+        IDs of the agents expecting the next action, one per sub-environment.
+        """
+        return [env._current_agent_id for env in self._envs]
+
+    def vector_reset(self) -> List[MultiAgentDict]:
+        return [env.reset() for env in self._envs]
+
+    def reset_at(self, index: EnvIndex) -> MultiAgentDict:
+        return self._envs[index].reset()
+
+    def vector_step(self, actions: Sequence[MultiAgentDict]) -> VectorStepResult:
+        assert len(actions) == len(
+            self._envs
+        ), f"Expected actions for all {len(self._envs)} sub-environments."
+        obs, rewards, dones, infos = [], [], [], []
+        for env_obs, env_reward, env_done, env_info in self._step_envs(
+            range(len(self._envs)), actions
+        ):
+            obs.append(env_obs)
+            rewards.append(env_reward)
+            dones.append(env_done)
+            infos.append(env_info)
+        return obs, rewards, dones, infos
+
+    def current_env_indices(self, name: AgentName) -> np.ndarray:
+        """
+        Indices of the sub-environments whose current agents have the `name`, in
+        the order of their actions passed to `batch_step`.
+        """
+        return np.array(
+            [
+                index
+                for index, agent_id in enumerate(self.current_agent_ids)
+                if agent_name(agent_id) == name  # type: ignore
+            ],
+            dtype=np.int64,
+        )
+
+    def batch_reset(self) -> Dict[AgentName, Any]:
+        """
+        Resets all sub-environments and returns the observations of their current
+        agents stacked per agent name, in the order of `current_env_indices`.
+        """
+        return self._current_observations(self.vector_reset())
+
+    def batch_step(self, actions: Dict[AgentName, np.ndarray]) -> BatchedStepResult:
+        """
+        Steps all sub-environments with the raw actions of their current agents
+        batched per agent name, each batch in the order of `current_env_indices`.
+
+        Returns the outputs batched per agent name (without infos), whether
+        the episodes of the sub-environments are done and the stacked observations
+        of the current agents for the next call. Done sub-environments are reset,
+        so the latter come from the new episodes for them.
+        """
+        positions = dict.fromkeys(actions, 0)
+        action_dicts = []
+        for agent_id in self.current_agent_ids:
+            name = agent_name(agent_id)
+            action_dicts.append({agent_id: actions[name][positions[name]]})
+            positions[name] += 1
+        assert all(
+            position == len(actions[name]) for name, position in positions.items()
+        ), "Expected an action for each current agent."
+
+        results = self._step_envs(range(len(self._envs)), action_dicts)
+        # Batched before the resets, which may overwrite the observation buffers.
+        batches = _batch(results)
+        episode_dones = np.array(
+            [done["__all__"] for _, _, done, _ in results], dtype=np.bool_
+        )
+        next_obs = [
+            self.reset_at(index) if episode_done else obs
+            for index, ((obs, _, _, _), episode_done) in enumerate(
+                zip(results, episode_dones)
+            )
+        ]
+        return batches, episode_dones, self._current_observations(next_obs)
+
+    def _current_observations(
+        self, obs: Sequence[MultiAgentDict]
+    ) -> Dict[AgentName, Any]:
+        grouped: Dict[AgentName, List[Any]] = {}
+        for env, env_obs in zip(self._envs, obs):
+            agent_id = env._current_agent_id
+            name = agent_name(agent_id)
+            grouped.setdefault(name, []).append(env_obs[agent_id])
+        return {name: stack(values) for name, values in grouped.items()}
+
+    def get_sub_environments(
+        self,
+    ) -> List[HierarchicalEnv[EnvConfig, EnvState, EnvCommonInfo]]:
+        return self._envs
+
+    def get_unwrapped(
+        self,
+    ) -> List[HierarchicalEnv[EnvConfig, EnvState, EnvCommonInfo]]:
+        return self.get_sub_environments()
+
+    def poll(
+        self,
+    ) -> Tuple[MultiEnvDict, MultiEnvDict, MultiEnvDict, MultiEnvDict, MultiEnvDict]:
+        if not self._pending and all(env._prev_state is None for env in self._envs):
+            for index, env_obs in enumerate(self.vector_reset()):
+                self._pending[index] = (env_obs, {}, {"__all__": False}, {})
+
+        obs, rewards, dones, infos = {}, {}, {}, {}
+        for index, (env_obs, env_reward, env_done, env_info) in self._pending.items():
+            obs[index] = env_obs
+            rewards[index] = env_reward
+            dones[index] = env_done
+            infos[index] = env_info
+        self._pending = {}
+        return obs, rewards, dones, infos, {}
+
+    def send_actions(self, action_dict: MultiEnvDict) -> None:
+        indices = list(action_dict)
+        results = self._step_envs(indices, [action_dict[index] for index in indices])
+        self._pending.update(zip(indices, results))
+
+    def try_reset(self, env_id: Optional[EnvIndex] = None) -> Optional[MultiAgentDict]:
+        assert (
+            env_id is not None
+        ), "Only resetting a single sub-environment is supported."
+        obs = self.reset_at(env_id)
+        self._pending.pop(env_id, None)
+        return obs
+
+    def _step_envs(
+        self, indices: Sequence[EnvIndex], actions: Sequence[MultiAgentDict]
+    ) -> List[StepResult]:
+        """
+        Steps the sub-environments with the given `indices`. Procedure requests of all
+        of them are grouped by `Procedure.batch_key` and executed with a single
+        `Procedure.execute_batch` call per group. The automatic steps of the
+        `autopilot` option are run by each sub-environment on its own.
+
+        All actions are decoded (and validated) before any sub-environment is changed,
+        so an invalid action leaves all of them at their previous steps.
+        """
+        envs = [self._envs[index] for index in indices]
+        decoded = [
+            env._decode_step(action_dict) for env, action_dict in zip(envs, actions)
+        ]
+        procedures: List[Optional[Procedure[Any, Any]]] = [
+            env._get_procedure(action) if isinstance(action, ProcedureRequest) else None
+            for env, action in zip(envs, decoded)
+        ]
+        for env, action in zip(envs, decoded):
+            env._begin_step(action)
+
+        states: List[Any] = [None] * len(envs)
+        requests: Dict[Hashable, List[int]] = {}
+        executors: Dict[Hashable, Procedure[Any, Any]] = {}
+        for position, (env, action, procedure) in enumerate(
+            zip(envs, decoded, procedures)
+        ):
+            if procedure is not None:
+                key = procedure.batch_key
+                executors.setdefault(key, procedure)
+                requests.setdefault(key, []).append(position)
+            else:
+                states[position] = env._execute_action(action)
+        for key, positions in requests.items():
+            new_states = executors[key].execute_batch(
+                [envs[position]._prev_state for position in positions],
+                [decoded[position] for position in positions],
+            )
+            for position, state in zip(positions, new_states):
+                states[position] = state
+        return [
+            env._finish_step(state, action)
+            for env, state, action in zip(envs, states, decoded)
+        ]
+
+
+def _batch(results: Sequence[StepResult]) -> Dict[AgentName, AgentBatch]:
+    rows: Dict[AgentName, List[Tuple[EnvIndex, AgentId, Any, float, bool]]] = {}
+    for index, (obs, rewards, dones, _) in enumerate(results):
+        for agent_id, agent_obs in obs.items():
+            rows.setdefault(agent_name(agent_id), []).append(
+                (
+                    index,
+                    agent_id,
+                    agent_obs,
+                    rewards.get(agent_id, 0.0),
+                    dones.get(agent_id, False),
+                )
+            )
+    return {
+        name: AgentBatch(
+            env_indices=np.array([row[0] for row in name_rows], dtype=np.int64),
+            agent_ids=[row[1] for row in name_rows],
+            obs=stack([row[2] for row in name_rows]),
+            rewards=np.array([row[3] for row in name_rows], dtype=np.float32),
+            dones=np.array([row[4] for row in name_rows], dtype=np.bool_),
+        )
+        for name, name_rows in rows.items()
+    }